@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Compares the synchronous GraphQLView (WSGI) with AsyncGraphQLConsumer (ASGI)
+on a schema whose root fields block on simulated I/O, like a resolver that
+ends up calling the Drive API.
+
+    python benchmarks/asgi_vs_wsgi.py --requests 200 --concurrency 20 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERY = '{ perfil permissoes documento }'
+
+
+def build_schema(latency):
+    import graphene
+
+    def slow(value):
+        def resolver(root, info):
+            time.sleep(latency)
+            return value
+        return resolver
+
+    class Query(graphene.ObjectType):
+        perfil = graphene.String(resolver=slow('perfil'))
+        permissoes = graphene.String(resolver=slow('permissoes'))
+        documento = graphene.String(resolver=slow('documento'))
+
+    return graphene.Schema(query=Query)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[max(int(len(values) * pct) - 1, 0)]
+
+
+def run_wsgi(view_class, total, concurrency):
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+    view = view_class.as_view()
+
+    def one(_):
+        request = factory.post('/graphql/', json.dumps({'query': QUERY}), content_type='application/json')
+        inicio = time.perf_counter()
+        response = view(request)
+        assert response.status_code == 200, response.content
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as workers:
+        latencies = list(workers.map(one, range(total)))
+    return time.perf_counter() - inicio, latencies
+
+
+def run_asgi(consumer_class, total, concurrency):
+    from channels.testing import HttpCommunicator
+
+    async def one(semaphore):
+        async with semaphore:
+            communicator = HttpCommunicator(
+                consumer_class, 'POST', '/graphql/',
+                body=json.dumps({'query': QUERY}).encode(),
+                headers=[(b'content-type', b'application/json')],
+            )
+            inicio = time.perf_counter()
+            response = await communicator.get_response(timeout=60)
+            assert response['status'] == 200, response['body']
+            return time.perf_counter() - inicio
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*[one(semaphore) for _ in range(total)])
+
+    inicio = time.perf_counter()
+    latencies = asyncio.new_event_loop().run_until_complete(main())
+    return time.perf_counter() - inicio, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20, help='WSGI threads / in-flight ASGI requests')
+    parser.add_argument('--threads', type=int, default=20, help='ORM thread pool of the ASGI consumer')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds each root resolver blocks')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    settings.configure(
+        DEBUG=False,
+        INSTALLED_APPS=['django.contrib.auth', 'django.contrib.contenttypes', 'graphene_django'],
+        GRAPHENE={'SCHEMA': None},
+        GRAPHQL_ASYNC_MAX_THREADS=args.threads,
+        DATABASES={},
+    )
+    import django
+    django.setup()
+
+    from graphene_django.views import GraphQLView
+    from django_graphql_movies.consumers import AsyncGraphQLConsumer
+
+    class BenchView(GraphQLView):
+        schema = build_schema(args.latency)
+
+    class BenchConsumer(AsyncGraphQLConsumer):
+        view_class = BenchView
+
+    for nome, runner, alvo in (('wsgi', run_wsgi, BenchView), ('asgi', run_asgi, BenchConsumer)):
+        elapsed, latencies = runner(alvo, args.requests, args.concurrency)
+        print('{}: {:7.1f} req/s   p50 {:6.1f} ms   p99 {:6.1f} ms'.format(
+            nome,
+            args.requests / elapsed,
+            percentile(latencies, 0.50) * 1000,
+            percentile(latencies, 0.99) * 1000,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Page-load latency with and without GraphQL query batching.
+
+A "page" fires --queries small operations, several of them asking for the
+same entities. Without batching each one is its own POST to /graphql/
+(full middleware stack plus --rtt of simulated network round trip, with up
+to --connections requests in flight); with batching they go in a single
+POST. Each --connections value gets its own run.
+
+What batching saves depends on the client. With fewer connections than
+queries (HTTP/1.1 browsers open about 6 per host), unbatched pages wait for
+several round trips and batching cuts page time. When every query can be in
+flight at once (HTTP/2, or --connections >= --queries), both take about one
+round trip and page time barely moves. The lasting gains are fewer HTTP
+requests, fewer SQL queries and less server time per page ("ms servidor",
+time spent in the Django handler summed over the page's requests).
+
+    python benchmarks/batching.py --queries 8 --rtt 0.03 --connections 6 8
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+urlpatterns = []
+
+
+def build_schema():
+    import graphene
+    from django.contrib.auth.models import Group
+
+    class GroupType(graphene.ObjectType):
+        id = graphene.Int()
+        name = graphene.String()
+
+    class Query(graphene.ObjectType):
+        group = graphene.Field(GroupType, id=graphene.Int(required=True))
+        groups = graphene.List(GroupType)
+
+        def resolve_group(root, info, id):
+            return info.context.loaders.load(Group, id)
+
+        def resolve_groups(root, info):
+            return Group.objects.all()
+
+    return graphene.Schema(query=Query)
+
+
+def page_queries(count):
+    queries = []
+    for i in range(count):
+        if i % 3 == 0:
+            queries.append({'query': '{ groups { id name } }'})
+        else:
+            queries.append({'query': '{ group(id: %d) { id name } }' % (i % 4 + 1)})
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=8)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--rtt', type=float, default=0.03, help='Simulated network round trip, in seconds')
+    parser.add_argument('--connections', type=int, nargs='+', default=[6, 8],
+                        help='Parallel connections per page; one run per value')
+    args = parser.parse_args()
+
+    from django_graphql_movies import settings as project_settings
+    from django.conf import settings
+    settings.configure(
+        DEBUG=False,
+        SECRET_KEY='benchmark',
+        ALLOWED_HOSTS=['*'],
+        ROOT_URLCONF='__main__',
+        MIDDLEWARE=[m for m in project_settings.MIDDLEWARE if 'ReplicaRouting' not in m],
+        INSTALLED_APPS=['django.contrib.auth', 'django.contrib.contenttypes', 'django.contrib.sessions', 'graphene_django'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}},
+        GRAPHENE={'SCHEMA': None, 'MIDDLEWARE': project_settings.GRAPHENE['MIDDLEWARE']},
+        GRAPHQL_MAX_BATCH_SIZE=max(args.queries, 20),
+    )
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import Group
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import path
+    from django.views.decorators.csrf import csrf_exempt
+    from django_graphql_movies.views import GraphQLView
+
+    urlpatterns.append(path('graphql/', csrf_exempt(GraphQLView.as_view(schema=build_schema()))))
+    call_command('migrate', verbosity=0)
+    Group.objects.bulk_create([Group(name='grupo {}'.format(i)) for i in range(1, 21)])
+
+    queries = page_queries(args.queries)
+
+    def post(body):
+        time.sleep(args.rtt)
+        inicio = time.perf_counter()
+        response = Client().post('/graphql/', json.dumps(body), content_type='application/json')
+        assert response.status_code == 200, response.content
+        return time.perf_counter() - inicio
+
+    def unbatched(connections):
+        with ThreadPoolExecutor(max_workers=connections) as workers:
+            return sum(workers.map(post, queries))
+
+    def batched(connections):
+        return post(queries)
+
+    # Counted on a single connection so every request runs in this thread.
+    consultas = {}
+    for page, bodies in ((unbatched, queries), (batched, [queries])):
+        with CaptureQueriesContext(connection) as captured:
+            for body in bodies:
+                post(body)
+        consultas[page] = len(captured.captured_queries)
+
+    print('{:13} {:>9} {:>13} {:>13} {:>10} {:>9}'.format(
+        '', 'conexões', 'ms/página', 'ms servidor', 'req. HTTP', 'SQL'
+    ))
+    for connections in args.connections:
+        for nome, page in (('sem batching', unbatched), ('com batching', batched)):
+            tempos = []
+            servidor = []
+            for _ in range(args.pages):
+                inicio = time.perf_counter()
+                servidor.append(page(connections))
+                tempos.append(time.perf_counter() - inicio)
+            print('{:13} {:>9} {:>13.1f} {:>13.1f} {:>10} {:>9}'.format(
+                nome,
+                connections,
+                statistics.median(tempos) * 1000,
+                statistics.median(servidor) * 1000,
+                1 if page is batched else len(queries),
+                consultas[page],
+            ))
+
+
+if __name__ == '__main__':
+    main()
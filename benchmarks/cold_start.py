@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Cold start of the WSGI application: time to import ``wsgi.application`` in a
+fresh interpreter, and time to answer the first GraphQL request (which is
+when the schema is imported and built).
+
+    python benchmarks/cold_start.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import io, json, time
+inicio = time.perf_counter()
+from django_graphql_movies.wsgi import application
+importado = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/graphql/', 'QUERY_STRING': 'query=%7B__typename%7D',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'HTTP_ACCEPT': 'application/json', 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+}
+status = []
+b''.join(application(environ, lambda s, h, *a: status.append(s)))
+respondido = time.perf_counter()
+print(json.dumps({'import': importado - inicio, 'first_request': respondido - importado, 'status': status[0]}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'django_graphql_movies.settings')
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+
+    amostras = []
+    for _ in range(args.runs):
+        output = subprocess.check_output([sys.executable, '-c', PROBE], env=env, cwd=ROOT)
+        amostras.append(json.loads(output.decode('utf-8').strip().splitlines()[-1]))
+
+    print('status da primeira requisição: {}'.format(amostras[0]['status']))
+    for chave in ('import', 'first_request'):
+        valores = [amostra[chave] * 1000 for amostra in amostras]
+        print('{:14} mediana {:8.1f} ms   min {:8.1f} ms   max {:8.1f} ms'.format(
+            chave, statistics.median(valores), min(valores), max(valores)
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+Benchmark da distribuição automática de avaliadores.
+
+Uso:
+    python benchmarks/distribuicao.py --submissoes 5000 --avaliadores 200 --quantidade 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from example_app.distribuicao import distribuir  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissoes', type=int, default=5000)
+    parser.add_argument('--avaliadores', type=int, default=200)
+    parser.add_argument('--quantidade', type=int, default=3)
+    parser.add_argument('--membros', type=int, default=4, help='Membros (conflitos) por inscrição')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    submissoes = list(range(1, args.submissoes + 1))
+    avaliadores = list(range(1, args.avaliadores + 1))
+    conflitos = {s: set(rnd.sample(avaliadores, args.membros)) for s in submissoes}
+    carga = {a: rnd.randint(0, 20) for a in avaliadores}
+
+    tempos = []
+    for _ in range(args.repeticoes):
+        inicio = time.perf_counter()
+        pares = distribuir(submissoes, avaliadores, args.quantidade, conflitos=conflitos, carga=carga)
+        tempos.append(time.perf_counter() - inicio)
+
+    final = dict(carga)
+    for _, avaliador in pares:
+        final[avaliador] += 1
+
+    print('submissões: {}  avaliadores: {}  por PPC: {}'.format(
+        args.submissoes, args.avaliadores, args.quantidade))
+    print('pares gerados: {}'.format(len(pares)))
+    print('tempo: melhor {:.1f} ms, pior {:.1f} ms'.format(min(tempos) * 1000, max(tempos) * 1000))
+    print('carga final: min {} / max {}'.format(min(final.values()), max(final.values())))
+
+
+if __name__ == '__main__':
+    main()
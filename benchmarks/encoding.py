@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Encode time and bytes on the wire for a large allMovies-style response.
+
+    python benchmarks/encoding.py --movies 10000 --actors-per-movie 3
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_response(movies, actors_per_movie):
+    return {'data': {'allMovies': [
+        OrderedDict([
+            ('id', str(i)),
+            ('title', 'Filme número {}'.format(i)),
+            ('year', 1950 + i % 70),
+            ('actors', [
+                OrderedDict([('id', str(i * actors_per_movie + a)), ('name', 'Ator {}'.format(i * actors_per_movie + a))])
+                for a in range(actors_per_movie)
+            ]),
+        ])
+        for i in range(movies)
+    ]}}
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - inicio)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--actors-per-movie', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from django.conf import settings
+    settings.configure()
+
+    from django_graphql_movies import encoders
+
+    data = build_response(args.movies, args.actors_per_movie)
+    candidates = [
+        ('stdlib (pretty)', lambda: encoders.StdlibEncoder().encode(data, pretty=True)),
+        ('stdlib', lambda: encoders.StdlibEncoder().encode(data)),
+    ]
+    if encoders.orjson is not None:
+        candidates.append(('orjson', lambda: encoders.OrjsonEncoder().encode(data)))
+
+    print('{} filmes, {} atores por filme'.format(args.movies, args.actors_per_movie))
+    print('{:16} {:>10} {:>12}'.format('encoder', 'ms', 'bytes'))
+    content = None
+    for nome, func in candidates:
+        elapsed, content = measure(func, args.repeat)
+        print('{:16} {:10.1f} {:12d}'.format(nome, elapsed * 1000, len(content)))
+
+    print()
+    print('{:16} {:>10} {:>12}'.format('compressão', 'ms', 'bytes'))
+    compressors = [('gzip -6', lambda: gzip.compress(content, compresslevel=6))]
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        compressors.append(('brotli q4', lambda: brotli.compress(content, quality=4)))
+    for nome, func in compressors:
+        elapsed, compressed = measure(func, args.repeat)
+        print('{:16} {:10.1f} {:12d}'.format(nome, elapsed * 1000, len(compressed)))
+
+
+if __name__ == '__main__':
+    main()
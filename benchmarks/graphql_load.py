@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Load test for the /graphql/ endpoint, used to compare database profiles.
+
+Run once per profile and compare the requests/s:
+
+    DJANGO_DATABASE_PROFILE=development python benchmarks/graphql_load.py
+    DJANGO_DATABASE_PROFILE=production python benchmarks/graphql_load.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_graphql_movies.settings')
+
+READ_QUERY = '{ movies { id title actors { id name } } }'
+WRITE_QUERY = 'mutation { createActor(input: {name: "%s"}) { ok } }'
+
+
+def worker(deadline, write_ratio, results):
+    from django.db import connections
+    from django.test import Client
+
+    client = Client()
+    rnd = random.Random()
+    ok = errors = 0
+    latencies = []
+    while time.perf_counter() < deadline:
+        if rnd.random() < write_ratio:
+            query = WRITE_QUERY % 'load-test-{}'.format(rnd.randint(0, 10 ** 9))
+        else:
+            query = READ_QUERY
+        inicio = time.perf_counter()
+        response = client.post('/graphql/', json.dumps({'query': query}), content_type='application/json')
+        latencies.append(time.perf_counter() - inicio)
+        if response.status_code == 200 and 'errors' not in response.json():
+            ok += 1
+        else:
+            errors += 1
+    connections.close_all()
+    results.append((ok, errors, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds')
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+    django.setup()
+
+    results = []
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(deadline, args.write_ratio, results))
+        for _ in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ok = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    latencies = sorted(l for r in results for l in r[2])
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+
+    print('profile: {}  engine: {}'.format(settings.DATABASE_PROFILE, settings.DATABASES['default']['ENGINE']))
+    print('threads: {}  duration: {:.0f}s  write ratio: {:.0%}'.format(
+        args.threads, args.duration, args.write_ratio))
+    print('requests: {} ok, {} errors'.format(ok, errors))
+    print('throughput: {:.1f} req/s  p99: {:.1f} ms'.format((ok + errors) / args.duration, p99 * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Server cost of clients polling /graphql/ versus receiving pushed diffs.
+
+Simulates --window seconds of --clients idle clients, each watching one of
+--objects rows. Polling clients re-run their query every --interval seconds
+through GraphQLView; subscribed clients only cost something when one of the
+--changes-per-second updates hits the row they watch. Reports CPU time,
+executions and bytes sent for each strategy (WebSocket framing excluded).
+
+    python benchmarks/polling_vs_push.py --clients 1000 --interval 5 --changes-per-second 2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--objects', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=5.0, help='Polling interval, in seconds')
+    parser.add_argument('--changes-per-second', type=float, default=2.0)
+    parser.add_argument('--window', type=float, default=60.0, help='Simulated seconds')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    settings.configure(
+        DEBUG=False,
+        INSTALLED_APPS=['django.contrib.auth', 'django.contrib.contenttypes', 'graphene_django'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}},
+        GRAPHENE={'SCHEMA': None},
+    )
+    import django
+    django.setup()
+
+    import graphene
+    from django.contrib.auth.models import Group
+    from django.core.management import call_command
+    from django.test import RequestFactory
+    from django_graphql_movies import subscriptions
+    from django_graphql_movies.pubsub import InMemoryBroker, set_broker
+    from django_graphql_movies.subscriptions import ChangeEvent, observe
+    from django_graphql_movies.views import GraphQLView
+
+    class GroupType(graphene.ObjectType):
+        id = graphene.ID()
+        name = graphene.String()
+
+    class Query(graphene.ObjectType):
+        group = graphene.Field(GroupType, id=graphene.ID(required=True))
+
+        def resolve_group(root, info, id):
+            return Group.objects.get(pk=id)
+
+    class Subscription(graphene.ObjectType):
+        group_changed = graphene.Field(ChangeEvent, id=graphene.ID())
+
+        def resolve_group_changed(root, info, id=None):
+            return observe('auth.group', id=id)
+
+    schema = graphene.Schema(query=Query, subscription=Subscription)
+    call_command('migrate', verbosity=0)
+    Group.objects.bulk_create([Group(name='grupo {}'.format(i)) for i in range(args.objects)])
+    ids = list(Group.objects.values_list('id', flat=True))
+
+    subscriptions.TRACKED_MODELS['auth.Group'] = ()
+    subscriptions.connect_signals()
+    set_broker(InMemoryBroker())
+
+    rnd = random.Random(1)
+    watched = [rnd.choice(ids) for _ in range(args.clients)]
+    changes = [rnd.choice(ids) for _ in range(int(args.window * args.changes_per_second))]
+
+    # Polling
+    view = GraphQLView.as_view(schema=schema)
+    factory = RequestFactory()
+    polls = int(args.window / args.interval) * args.clients
+    sent = 0
+    inicio = time.process_time()
+    for i in range(polls):
+        body = json.dumps({'query': '{ group(id: %d) { id name } }' % watched[i % args.clients]})
+        response = view(factory.post('/graphql/', body, content_type='application/json'))
+        sent += len(response.content)
+    polling_cpu = time.process_time() - inicio
+    polling_bytes = sent
+
+    # Push
+    delivered = []
+    handles = []
+    for group_id in watched:
+        result = schema.execute(
+            'subscription { groupChanged(id: %d) { id action changes } }' % group_id,
+            allow_subscriptions=True,
+        )
+        handles.append(result.subscribe(lambda item: delivered.append(len(json.dumps({'data': item.data})))))
+    inicio = time.process_time()
+    for n, group_id in enumerate(changes):
+        group = Group.objects.get(pk=group_id)
+        group.name = 'alterado {}'.format(n)
+        group.save()
+    push_cpu = time.process_time() - inicio
+    for handle in handles:
+        handle.dispose()
+
+    print('{} clientes, {} s simulados, {:.1f} alterações/s'.format(args.clients, args.window, args.changes_per_second))
+    print('polling: {:8d} execuções  {:8.2f} s CPU  {:10d} bytes'.format(polls, polling_cpu, polling_bytes))
+    print('push:    {:8d} envios     {:8.2f} s CPU  {:10d} bytes'.format(len(delivered), push_cpu, sum(delivered)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+"""
+Replays a JSONL log of GraphQL operations against ``wsgi.application``.
+
+Each line is one request body: a ``{"query", "variables", "operationName"}``
+object, or a list of them for a batch. A line may also carry ``"method":
+"GET"`` to be sent as a query string. The log runs against a throwaway test
+database filled with a synthetic Movie/Actor catalog.
+
+    python benchmarks/replay.py benchmarks/traffic.jsonl --concurrency 8 \\
+        --movies 5000 --actors 20000 --actors-per-movie 4 --output results.json
+    python benchmarks/replay.py benchmarks/traffic.jsonl --compare results.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_graphql_movies.settings')
+
+
+def load_log(path):
+    entries = []
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+def operation_name(entry):
+    if isinstance(entry, list):
+        return 'batch[{}]'.format(len(entry))
+    if entry.get('operationName'):
+        return entry['operationName']
+    query = ' '.join(entry.get('query', '').split())
+    return query[:40] or '<empty>'
+
+
+def generate_catalog(movies, actors, actors_per_movie, seed=0):
+    """
+    Bulk inserts ``actors`` actors and ``movies`` movies, each linked to
+    ``actors_per_movie`` random actors.
+    """
+    from django.apps import apps
+
+    Movie = apps.get_model('example_app', 'Movie')
+    Actor = apps.get_model('example_app', 'Actor')
+    Through = Movie.actors.through
+    rnd = random.Random(seed)
+
+    Actor.objects.bulk_create([Actor(name='Ator {}'.format(i)) for i in range(actors)], batch_size=1000)
+    Movie.objects.bulk_create([
+        Movie(title='Filme {}'.format(i), year=1950 + rnd.randint(0, 70)) for i in range(movies)
+    ], batch_size=1000)
+
+    actor_ids = list(Actor.objects.values_list('id', flat=True))
+    fan_out = min(actors_per_movie, len(actor_ids))
+    Through.objects.bulk_create([
+        Through(movie_id=movie_id, actor_id=actor_id)
+        for movie_id in Movie.objects.values_list('id', flat=True)
+        for actor_id in rnd.sample(actor_ids, fan_out)
+    ], batch_size=1000)
+
+
+def build_environ(entry):
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+    if isinstance(entry, dict) and entry.get('method', 'POST').upper() == 'GET':
+        params = {'query': entry['query']}
+        if entry.get('variables'):
+            params['variables'] = json.dumps(entry['variables'])
+        if entry.get('operationName'):
+            params['operationName'] = entry['operationName']
+        return factory.get('/graphql/?' + urlencode(params), HTTP_ACCEPT='application/json').environ
+
+    if isinstance(entry, dict):
+        entry = {key: value for key, value in entry.items() if key != 'method'}
+    return factory.post('/graphql/', json.dumps(entry), content_type='application/json').environ
+
+
+def send(application, entry):
+    status = []
+    body = b''.join(application(build_environ(entry), lambda s, headers, exc_info=None: status.append(s)))
+    code = int(status[0].split()[0])
+    if code != 200:
+        return False
+    payload = json.loads(body.decode('utf-8'))
+    results = payload if isinstance(payload, list) else [payload]
+    return not any(result.get('errors') for result in results)
+
+
+def worker(application, jobs, lock, samples):
+    from django.db import connections
+    from django.test.utils import CaptureQueriesContext
+
+    while True:
+        with lock:
+            if not jobs:
+                break
+            entry = jobs.pop()
+
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in connections]
+        for context in contexts:
+            context.__enter__()
+        inicio = time.perf_counter()
+        error = None
+        try:
+            ok = send(application, entry)
+        except Exception as e:
+            ok = False
+            error = '{}: {}'.format(type(e).__name__, e)
+        elapsed = time.perf_counter() - inicio
+        for context in contexts:
+            context.__exit__(None, None, None)
+
+        queries = sum(len(context.captured_queries) for context in contexts)
+        samples.append((operation_name(entry), elapsed, ok, queries, error))
+    connections.close_all()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize(latencies, errors, queries, exceptions=()):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'exceptions': dict(Counter(exceptions)),
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p90_ms': percentile(latencies, 0.90) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_queries': sum(queries) / len(queries) if queries else 0.0,
+        'max_queries': max(queries) if queries else 0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results, baseline=None):
+    def delta(name, key):
+        if not baseline:
+            return ''
+        before = baseline['operations'].get(name, {}).get(key) if name else baseline['total'].get(key)
+        if not before:
+            return ''
+        current = results['operations'][name][key] if name else results['total'][key]
+        return ' ({:+.0%})'.format(current / before - 1)
+
+    total = results['total']
+    print('commit: {}  concurrency: {}  catalog: {movies} filmes, {actors} atores, {actors_per_movie} por filme'.format(
+        results['commit'], results['concurrency'], **results['catalog']
+    ))
+    print('requests: {} ({} errors)  throughput: {:.1f} req/s{}'.format(
+        total['requests'], total['errors'], total['throughput'], delta(None, 'throughput')
+    ))
+    print()
+    print('{:40} {:>7} {:>6} {:>18} {:>18} {:>10}'.format('operation', 'count', 'errors', 'p50 ms', 'p99 ms', 'queries'))
+    for name, stats in sorted(results['operations'].items()):
+        print('{:40} {:7d} {:6d} {:>18} {:>18} {:10.1f}'.format(
+            name[:40], stats['requests'], stats['errors'],
+            '{:.1f}{}'.format(stats['p50_ms'], delta(name, 'p50_ms')),
+            '{:.1f}{}'.format(stats['p99_ms'], delta(name, 'p99_ms')),
+            stats['mean_queries'],
+        ))
+
+    if total.get('exceptions'):
+        print(file=sys.stderr)
+        print('exceptions raised while replaying:', file=sys.stderr)
+        for exception, count in sorted(total['exceptions'].items(), key=lambda item: -item[1]):
+            print('{:7d}  {}'.format(count, exception), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('log', nargs='?', default=os.path.join(ROOT, 'benchmarks', 'traffic.jsonl'))
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=10, help='Times the whole log is replayed')
+    parser.add_argument('--movies', type=int, default=1000)
+    parser.add_argument('--actors', type=int, default=3000)
+    parser.add_argument('--actors-per-movie', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Results JSON from a previous run to compare against')
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+    from django_graphql_movies.wsgi import application
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        generate_catalog(args.movies, args.actors, args.actors_per_movie, args.seed)
+
+        entries = load_log(args.log)
+        jobs = list(reversed(entries * args.iterations))
+        lock = threading.Lock()
+        samples = []
+        threads = [
+            threading.Thread(target=worker, args=(application, jobs, lock, samples))
+            for _ in range(args.concurrency)
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - inicio
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    by_operation = defaultdict(list)
+    for sample in samples:
+        by_operation[sample[0]].append(sample)
+
+    def stats(group):
+        return summarize(
+            [s[1] for s in group], sum(1 for s in group if not s[2]), [s[3] for s in group],
+            [s[4] for s in group if s[4]],
+        )
+
+    total = stats(samples)
+    total['throughput'] = len(samples) / elapsed if elapsed else 0.0
+    total['elapsed_s'] = elapsed
+    results = {
+        'commit': git_revision(),
+        'log': os.path.relpath(args.log, ROOT),
+        'concurrency': args.concurrency,
+        'iterations': args.iterations,
+        'catalog': {'movies': args.movies, 'actors': args.actors, 'actors_per_movie': args.actors_per_movie},
+        'total': total,
+        'operations': {name: stats(group) for name, group in by_operation.items()},
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous:
+            baseline = json.load(previous)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Throughput and peak memory of a large file upload to object storage.
+
+Posts a --size MiB multipart form through a WSGIRequest whose body arrives
+at --client-bandwidth MiB/s, with the object store (example_app.fake_s3)
+taking --s3-latency per call and --s3-bandwidth MiB/s per connection:
+
+- default: Django's upload handlers spool the file (memory, then a temp
+  file), then the whole file is sent with a single put_object;
+- streaming: example_app.uploads.S3MultipartUploadHandler sends
+  --part-size MiB parts, --parallel at a time, while the body is arriving.
+
+Peak memory is what tracemalloc sees during the request (temp files on disk
+are reported separately).
+
+    python benchmarks/uploads.py --size 200 --client-bandwidth 100 --s3-bandwidth 40
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MiB = 2 ** 20
+
+
+class ThrottledInput(object):
+    """wsgi.input that delivers at most ``bandwidth`` bytes/s."""
+
+    def __init__(self, data, bandwidth):
+        self.stream = io.BytesIO(data)
+        self.bandwidth = bandwidth
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        if self.bandwidth:
+            time.sleep(len(chunk) / self.bandwidth)
+        return chunk
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=100, help='File size, in MiB')
+    parser.add_argument('--part-size', type=int, default=8, help='Multipart part size, in MiB (>= 5)')
+    parser.add_argument('--parallel', type=int, default=4, help='Parts uploaded at the same time')
+    parser.add_argument('--client-bandwidth', type=float, default=200.0, help='Client -> app, in MiB/s (0 = unlimited)')
+    parser.add_argument('--s3-bandwidth', type=float, default=50.0, help='App -> S3 per connection, in MiB/s')
+    parser.add_argument('--s3-latency', type=float, default=0.02, help='Seconds added to each S3 call')
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    from django.conf import settings
+    settings.configure(
+        DEBUG=False,
+        FILE_UPLOAD_TEMP_DIR=temp_dir,
+        UPLOADS_BUCKET='bench',
+        UPLOADS_PART_SIZE=args.part_size * MiB,
+        UPLOADS_PARALLEL_PARTS=args.parallel,
+    )
+    import django
+    django.setup()
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.core.handlers.wsgi import WSGIRequest
+    from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+    from example_app import uploads
+    from example_app.fake_s3 import FakeS3Client
+
+    body = encode_multipart(BOUNDARY, {
+        'nome': 'Edital 1/2024',
+        'arquivo': SimpleUploadedFile('edital.pdf', os.urandom(args.size * MiB), 'application/pdf'),
+    })
+
+    def request():
+        return WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'CONTENT_TYPE': MULTIPART_CONTENT,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': ThrottledInput(body, args.client_bandwidth * MiB),
+        })
+
+    def default(client):
+        arquivo = request().FILES['arquivo']
+        spooled = os.path.getsize(arquivo.temporary_file_path()) if hasattr(arquivo, 'temporary_file_path') else 0
+        arquivo.seek(0)
+        client.put_object(Bucket='bench', Key='editais_ppc/editais/edital.pdf', Body=arquivo)
+        arquivo.close()
+        return spooled
+
+    def streaming(client):
+        req = request()
+        req.upload_handlers = [uploads.S3MultipartUploadHandler(req, 'editais_ppc/editais')]
+        req.FILES['arquivo']
+        return 0
+
+    print('{:<10} {:>9} {:>10} {:>12} {:>11} {:>9}'.format(
+        'strategy', 'seconds', 'MiB/s', 'peak MiB', 'temp MiB', 'S3 calls'
+    ))
+    for name, strategy in (('default', default), ('streaming', streaming)):
+        client = FakeS3Client(latency=args.s3_latency, bandwidth=args.s3_bandwidth * MiB, keep_data=False)
+        uploads.set_client(client)
+        tracemalloc.start()
+        start = time.perf_counter()
+        spooled = strategy(client)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stored = sum(size for size in client.objects.values())
+        assert stored == args.size * MiB, (name, stored)
+        print('{:<10} {:>9.2f} {:>10.1f} {:>12.1f} {:>11.1f} {:>9}'.format(
+            name, elapsed, args.size / elapsed, peak / MiB, spooled / MiB, sum(client.calls.values())
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    name = 'django_graphql_movies'
+    verbose_name = 'Django GraphQL Movies'
+
+    def ready(self):
+        from django_graphql_movies import subscriptions, versions
+        from django_graphql_movies.db import signals
+
+        connection_created.connect(signals.apply_sqlite_pragmas, dispatch_uid='apply_sqlite_pragmas')
+        connection_created.connect(signals.install_write_recorder, dispatch_uid='install_write_recorder')
+        request_started.connect(signals.check_connections_health, dispatch_uid='check_connections_health')
+        subscriptions.connect_signals()
+        versions.connect_signals()
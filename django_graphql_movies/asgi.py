@@ -0,0 +1,21 @@
+"""
+ASGI config for django_graphql_movies project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+/graphql/ is served by ``AsyncGraphQLConsumer``; every other path falls back
+to the regular Django views.
+
+Run it with any ASGI server, e.g.::
+
+    daphne django_graphql_movies.asgi:application
+"""
+
+import os
+
+import django
+from channels.routing import get_default_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_graphql_movies.settings')
+django.setup()
+
+application = get_default_application()
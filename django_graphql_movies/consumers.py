@@ -0,0 +1,300 @@
+import asyncio
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from channels.db import database_sync_to_async
+from channels.generic.http import AsyncHttpConsumer
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.http import AsgiHandler, AsgiRequest
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Manager, Model, QuerySet
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.views import HttpError
+from graphql.execution.executors.asyncio import AsyncioExecutor
+from graphql.execution.middleware import MiddlewareManager
+from promise import is_thenable
+from rx import Observable
+
+from django_graphql_movies.db import routing
+from django_graphql_movies.middleware import CompressionMiddleware, ReplicaRoutingMiddleware
+from django_graphql_movies.views import GraphQLView
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_thread_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'GRAPHQL_ASYNC_MAX_THREADS', 10),
+                    thread_name_prefix='graphql-orm',
+                )
+    return _pool
+
+
+def evaluate(func, *args, **kwargs):
+    result = func(*args, **kwargs)
+    if isinstance(result, (Manager, QuerySet)):
+        result = list(result.all())
+    return result
+
+
+def run_blocking(func, routing_state=None):
+    """
+    Awaitable that calls ``func()`` in the bounded ORM thread pool through
+    ``database_sync_to_async``, with the request's replica routing state
+    (the primary when there is none).
+    """
+    routing_state = routing_state if routing_state is not None else routing.initial_state()
+
+    def call():
+        with routing.bound(routing_state):
+            return evaluate(func)
+
+    return database_sync_to_async(call, thread_sensitive=False, executor=get_thread_pool())()
+
+
+def loads_relation(root, info):
+    """
+    True when resolving the field on a model instance would query a related
+    object or manager that isn't cached on it yet.
+    """
+    if not isinstance(root, Model):
+        return False
+    try:
+        field = root._meta.get_field(to_snake_case(info.field_name))
+    except FieldDoesNotExist:
+        return False
+    if not field.is_relation:
+        return False
+    if field.many_to_one or field.one_to_one:
+        return not field.is_cached(root)
+    return True
+
+
+class ThreadPoolMiddleware(object):
+    """
+    Runs root field resolvers in the bounded ORM thread pool so independent
+    top-level fields resolve concurrently. Nested resolvers that load a
+    relation, and querysets returned by nested resolvers, are evaluated
+    there too instead of blocking the event loop.
+    """
+
+    def __init__(self, routing_state=None):
+        self.routing_state = routing_state
+
+    def resolve(self, next, root, info, **args):
+        if info.parent_type in (info.schema.get_query_type(), info.schema.get_mutation_type()):
+            return run_blocking(partial(next, root, info, **args), self.routing_state)
+        if loads_relation(root, info):
+            return run_blocking(partial(next, root, info, **args), self.routing_state)
+
+        result = next(root, info, **args)
+        if isinstance(result, (Manager, QuerySet)):
+            return run_blocking(result.all, self.routing_state)
+        return result
+
+
+class AsyncGraphQLConsumer(AsyncHttpConsumer):
+    """
+    Serves /graphql/ over ASGI. The consumer sits behind channels'
+    ``AuthMiddlewareStack`` (``info.context.user`` and the session come from
+    the scope) and applies ``ReplicaRoutingMiddleware`` and
+    ``CompressionMiddleware`` itself, since Django's MIDDLEWARE only runs
+    for requests served by ``AsgiHandler``.
+    """
+    view_class = GraphQLView
+
+    async def handle(self, body):
+        request = AsgiRequest(self.scope, io.BytesIO(body))
+        request.user = self.scope.get('user') or AnonymousUser()
+        if 'session' in self.scope:
+            request.session = self.scope['session']
+
+        replicas = ReplicaRoutingMiddleware(None)
+        replicas.process_request(request)
+        self.routing_state = routing.get_state()
+        routing.reset()
+
+        view = self.view_class()
+        try:
+            status, content = await self.get_response(view, request)
+        except HttpError as e:
+            status = e.response.status_code
+            content = view.json_encode(request, {'errors': [view.format_error(e)]})
+
+        response = HttpResponse(content, status=status, content_type='application/json')
+        with routing.bound(self.routing_state):
+            replicas.process_response(request, response)
+        response = CompressionMiddleware(lambda request: response)(request)
+        for message in AsgiHandler.encode_response(response):
+            await self.send(message)
+
+    async def get_response(self, view, request):
+        if request.method not in ('GET', 'POST'):
+            raise HttpError(HttpResponseNotAllowed(['GET', 'POST'], 'GraphQL only supports GET and POST requests.'))
+
+        data = view.parse_body(request)
+        if not isinstance(data, list):
+            status, response = await self.execute(view, request, data)
+            return status, view.json_encode(request, response)
+
+        responses = []
+        for entry in data:
+            status, response = await self.execute(view, request, entry)
+            response['id'] = entry.get('id')
+            response['status'] = status
+            responses.append(response)
+        return max(response['status'] for response in responses), view.json_encode(request, responses)
+
+    async def execute(self, view, request, data):
+        query, variables, operation_name, id = view.get_graphql_params(request, data)
+        if not query:
+            raise HttpError(HttpResponseBadRequest('Must provide query string.'))
+
+        try:
+            document = view.get_backend(request).document_from_string(view.schema, query)
+        except Exception as e:
+            return 400, {'errors': [view.format_error(e)]}
+
+        if request.method == 'GET':
+            operation_type = document.get_operation_type(operation_name)
+            if operation_type and operation_type != 'query':
+                raise HttpError(HttpResponseNotAllowed(
+                    ['POST'], 'Can only perform a {} operation from a POST request.'.format(operation_type)
+                ))
+
+        loop = asyncio.get_event_loop()
+        middleware = list(view.get_middleware(request) or []) + [ThreadPoolMiddleware(self.routing_state)]
+        result = document.execute(
+            root=view.get_root_value(request),
+            variables=variables,
+            operation_name=operation_name,
+            context=view.get_context(request),
+            middleware=MiddlewareManager(*middleware, wrap_in_promise=False),
+            executor=AsyncioExecutor(loop=loop),
+            return_promise=True,
+        )
+        if is_thenable(result):
+            result = await result
+
+        response = {}
+        if result.errors:
+            response['errors'] = [view.format_error(e) for e in result.errors]
+        if result.invalid:
+            return 400, response
+        response['data'] = result.data
+        return 200, response
+
+
+class WebsocketContext(object):
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.user = scope.get('user')
+
+
+class GraphQLSubscriptionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Serves GraphQL subscriptions using the graphql-ws protocol
+    (subscriptions-transport-ws). Queries and mutations sent over the socket
+    are answered once and completed.
+    """
+    view_class = GraphQLView
+
+    async def connect(self):
+        self.loop = asyncio.get_event_loop()
+        self.operations = {}
+        self.context = WebsocketContext(self.scope)
+        await self.accept(subprotocol='graphql-ws')
+
+    async def disconnect(self, code):
+        for operation_id in list(self.operations):
+            self.stop(operation_id)
+
+    @classmethod
+    async def encode_json(cls, content):
+        return json.dumps(content, cls=DjangoJSONEncoder)
+
+    async def receive_json(self, message, **kwargs):
+        message_type = message.get('type')
+        operation_id = message.get('id')
+
+        if message_type == 'connection_init':
+            await self.send_json({'type': 'connection_ack'})
+        elif message_type == 'start':
+            await self.start(operation_id, message.get('payload') or {})
+        elif message_type == 'stop':
+            self.stop(operation_id)
+            await self.send_json({'type': 'complete', 'id': operation_id})
+        elif message_type == 'connection_terminate':
+            await self.close()
+        else:
+            await self.send_json({
+                'type': 'error', 'id': operation_id,
+                'payload': {'message': 'Unknown message type: {}'.format(message_type)},
+            })
+
+    async def start(self, operation_id, payload):
+        self.stop(operation_id)
+        view = self.view_class()
+        operation_name = payload.get('operationName')
+        try:
+            document = view.get_backend(None).document_from_string(view.schema, payload.get('query') or '')
+        except Exception as e:
+            await self.send_json({'type': 'error', 'id': operation_id, 'payload': view.format_error(e)})
+            return
+
+        execute = partial(
+            document.execute,
+            root=view.get_root_value(None),
+            variables=payload.get('variables'),
+            operation_name=operation_name,
+            context=self.context,
+            middleware=MiddlewareManager(*(view.get_middleware(None) or []), wrap_in_promise=False),
+        )
+
+        if document.get_operation_type(operation_name) != 'subscription':
+            result = await run_blocking(execute)
+            await self.send_json(self.format_result(view, operation_id, result))
+            await self.send_json({'type': 'complete', 'id': operation_id})
+            return
+
+        result = execute(allow_subscriptions=True)
+        if not isinstance(result, Observable):
+            await self.send_json(self.format_result(view, operation_id, result))
+            await self.send_json({'type': 'complete', 'id': operation_id})
+            return
+
+        self.operations[operation_id] = result.subscribe(
+            on_next=lambda item: self.send_threadsafe(self.format_result(view, operation_id, item)),
+            on_error=lambda error: self.send_threadsafe({
+                'type': 'error', 'id': operation_id, 'payload': view.format_error(error),
+            }),
+            on_completed=lambda: self.send_threadsafe({'type': 'complete', 'id': operation_id}),
+        )
+
+    def stop(self, operation_id):
+        subscription = self.operations.pop(operation_id, None)
+        if subscription is not None:
+            subscription.dispose()
+
+    def send_threadsafe(self, message):
+        # Events are published from whichever thread saved the model.
+        asyncio.run_coroutine_threadsafe(self.send_json(message), self.loop)
+
+    def format_result(self, view, operation_id, result):
+        payload = {'data': result.data}
+        if result.errors:
+            payload['errors'] = [view.format_error(e) for e in result.errors]
+        return {'type': 'data', 'id': operation_id, 'payload': payload}
@@ -0,0 +1,136 @@
+"""
+PostgreSQL backend that hands out connections from a process-wide pool.
+
+The pool is configured through ``OPTIONS['POOL']``::
+
+    'OPTIONS': {
+        'POOL': {
+            'CLASS': 'psycopg2.pool.ThreadedConnectionPool',
+            'MIN_SIZE': 1,
+            'MAX_SIZE': 20,
+            'TIMEOUT': 5,
+        },
+    }
+
+``CLASS`` may point to any class with the psycopg2 pool interface
+(``getconn``/``putconn``/``closeall``).
+
+psycopg2's pools raise ``PoolError`` right away when all ``MAX_SIZE``
+connections are checked out. This backend retries for up to ``TIMEOUT``
+seconds before letting the error (a ``django.db.Error``) propagate, so
+short bursts above the pool size wait instead of failing.
+
+Connections must go back to the pool at the end of each request, so the
+production settings use ``CONN_MAX_AGE = 0`` with this backend; the pool
+itself keeps the connections open. Since a new connection is checked out
+for every request, the request_started health check never sees one:
+connections are validated on checkout instead (``closed``, plus a
+``SELECT 1`` with ``CONN_HEALTH_CHECKS``) and broken ones are discarded.
+"""
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from django.utils.module_loading import import_string
+from psycopg2.pool import PoolError
+
+DEFAULT_POOL = {
+    'CLASS': 'psycopg2.pool.ThreadedConnectionPool',
+    'MIN_SIZE': 1,
+    'MAX_SIZE': 20,
+    'TIMEOUT': 5,
+}
+
+POLL_INTERVAL = 0.05
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, pool_options, conn_params):
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                options = dict(DEFAULT_POOL, **pool_options)
+                pool_class = import_string(options['CLASS'])
+                pool = pool_class(options['MIN_SIZE'], options['MAX_SIZE'], **conn_params)
+                pool.timeout = options['TIMEOUT']
+                _pools[alias] = pool
+    return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        conn_params = super(DatabaseWrapper, self).get_connection_params()
+        conn_params.pop('POOL', None)
+        return conn_params
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias,
+            self.settings_dict['OPTIONS'].get('POOL', {}),
+            self.get_connection_params()
+        )
+
+    def get_pooled_connection(self):
+        pool = self.pool
+        deadline = time.monotonic() + getattr(pool, 'timeout', DEFAULT_POOL['TIMEOUT'])
+        while True:
+            try:
+                connection = pool.getconn()
+            except PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(POLL_INTERVAL)
+                continue
+            if self.is_pooled_connection_usable(connection):
+                return connection
+            pool.putconn(connection, close=True)
+            if time.monotonic() >= deadline:
+                raise base.Database.OperationalError('No usable connection in the pool')
+
+    def is_pooled_connection_usable(self, connection):
+        if connection.closed:
+            return False
+        if not self.settings_dict.get('CONN_HEALTH_CHECKS'):
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # Don't leave the check's transaction open for set_session().
+            connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pooled_connection()
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # putconn() rolls back any transaction left open and discards
+                # connections that are already closed.
+                return self.pool.putconn(self.connection, close=bool(self.connection.closed))
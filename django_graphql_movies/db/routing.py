@@ -0,0 +1,134 @@
+"""
+Primary/replica routing.
+
+Reads go to one of ``settings.DATABASE_REPLICAS`` only while the current
+request has been marked read-only by ``ReplicaRoutingMiddleware``; every
+other read, and every write, goes to the primary. The first write inside a
+request pins the rest of that request (and, through a cookie, the client's
+next ``REPLICA_STICKY_SECONDS``) to the primary.
+
+Writes are recorded by ``record_writes``, installed on every connection as
+an execute wrapper, when a data-modifying statement actually runs; asking
+the router for the write alias (``router.db_for_write``) records nothing.
+
+The state is thread-local. Code that hands work to other threads (the async
+GraphQL consumer) carries it along with ``get_state`` and ``bound``.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def replica_reads_enabled():
+    return getattr(_state, 'replica', None) is not None and not getattr(_state, 'pinned', False)
+
+
+def use_replica():
+    replicas = get_replicas()
+    _state.replica = random.choice(replicas) if replicas else None
+    _state.pinned = False
+    _state.wrote = False
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def record_write():
+    _state.wrote = True
+    _state.pinned = True
+
+
+def reset():
+    set_state(initial_state())
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def initial_state():
+    return {'replica': None, 'pinned': False, 'wrote': False}
+
+
+def get_state():
+    return {
+        'replica': getattr(_state, 'replica', None),
+        'pinned': getattr(_state, 'pinned', False),
+        'wrote': getattr(_state, 'wrote', False),
+    }
+
+
+def set_state(state):
+    _state.replica, _state.pinned, _state.wrote = state['replica'], state['pinned'], state['wrote']
+
+
+WRITE_STATEMENTS = frozenset(('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'MERGE', 'CREATE', 'ALTER', 'DROP', 'TRUNCATE'))
+
+
+def is_write(sql):
+    words = sql.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in WRITE_STATEMENTS
+
+
+def record_writes(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` that marks the request as having written."""
+    if is_write(sql):
+        record_write()
+    return execute(sql, params, many, context)
+
+
+def install_write_recorder(connection):
+    if record_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_writes)
+
+
+@contextmanager
+def bound(state):
+    """
+    Routes the block with ``state`` (from ``get_state``) and records writes
+    made inside it back into ``state``.
+    """
+    previous = get_state()
+    set_state(state)
+    try:
+        yield
+    finally:
+        state.update(get_state())
+        set_state(previous)
+
+
+@contextmanager
+def read_from_replica():
+    previous = (getattr(_state, 'replica', None), getattr(_state, 'pinned', False), getattr(_state, 'wrote', False))
+    use_replica()
+    try:
+        yield
+    finally:
+        _state.replica, _state.pinned, _state.wrote = previous
+
+
+class PrimaryReplicaRouter(object):
+
+    def db_for_read(self, model, **hints):
+        if replica_reads_enabled():
+            return _state.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
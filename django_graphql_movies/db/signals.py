@@ -0,0 +1,29 @@
+from django.db import connections
+
+from django_graphql_movies.db import routing
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA {}={}'.format(name, value))
+
+
+def install_write_recorder(sender, connection, **kwargs):
+    routing.install_write_recorder(connection)
+
+
+def check_connections_health(**kwargs):
+    # Backport of CONN_HEALTH_CHECKS (Django 4.1): drop persistent
+    # connections that went away while idle before the request uses them.
+    # The postgresql_pool backend checks its connections on checkout.
+    for connection in connections.all():
+        if not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,54 @@
+"""
+JSON encoders for GraphQL responses.
+
+``settings.GRAPHQL_RESPONSE_ENCODER`` selects one by dotted path; the default
+``'auto'`` uses orjson when it is installed and falls back to the standard
+library otherwise. Encoders return bytes, which ``HttpResponse`` stores as
+is, so the payload is never re-encoded on its way out.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdlibEncoder(object):
+
+    def encode(self, data, pretty=False):
+        if pretty:
+            content = json.dumps(data, sort_keys=True, indent=2, separators=(',', ': '), cls=DjangoJSONEncoder)
+        else:
+            content = json.dumps(data, separators=(',', ':'), ensure_ascii=False, cls=DjangoJSONEncoder)
+        return content.encode('utf-8')
+
+
+class OrjsonEncoder(object):
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('orjson is not installed')
+        self.default = DjangoJSONEncoder().default
+
+    def encode(self, data, pretty=False):
+        options = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS if pretty else 0
+        return orjson.dumps(data, default=self.default, option=options)
+
+
+_encoder = None
+
+
+def get_encoder():
+    global _encoder
+    if _encoder is None:
+        path = getattr(settings, 'GRAPHQL_RESPONSE_ENCODER', 'auto')
+        if path == 'auto':
+            _encoder = OrjsonEncoder() if orjson is not None else StdlibEncoder()
+        else:
+            _encoder = import_string(path)()
+    return _encoder
@@ -0,0 +1,75 @@
+"""
+Per-request data loading shared by every operation of a GraphQL request.
+
+``GraphQLView.get_context`` attaches a ``Loaders`` registry to the request,
+so all operations of a batch see the same DataLoaders and the same
+root-field cache. Resolvers load entities with::
+
+    info.context.loaders.load(Movie, movie_id)
+"""
+import json
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+
+class ModelLoader(DataLoader):
+
+    def __init__(self, model, *args, **kwargs):
+        super(ModelLoader, self).__init__(*args, **kwargs)
+        self.model = model
+
+    def batch_load_fn(self, keys):
+        objects = self.model._default_manager.in_bulk(keys)
+        return Promise.resolve([objects.get(key) for key in keys])
+
+
+class Loaders(object):
+
+    def __init__(self):
+        self._loaders = {}
+        self.root_fields = {}
+
+    def for_model(self, model):
+        loader = self._loaders.get(model)
+        if loader is None:
+            loader = self._loaders[model] = ModelLoader(model)
+        return loader
+
+    def load(self, model, pk):
+        return self.for_model(model).load(int(pk))
+
+    def load_many(self, model, pks):
+        return self.for_model(model).load_many([int(pk) for pk in pks])
+
+    def clear(self):
+        for loader in self._loaders.values():
+            loader.clear_all()
+        self.root_fields.clear()
+
+
+def get_loaders(context):
+    loaders = getattr(context, 'loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        context.loaders = loaders
+    return loaders
+
+
+class RootFieldCacheMiddleware(object):
+    """
+    Deduplicates identical root query fields (same name, same arguments)
+    across the operations of a request. Any mutation clears the cache.
+    """
+
+    def resolve(self, next, root, info, **args):
+        if info.parent_type is not info.schema.get_query_type():
+            if info.parent_type is info.schema.get_mutation_type():
+                get_loaders(info.context).clear()
+            return next(root, info, **args)
+
+        cache = get_loaders(info.context).root_fields
+        key = (info.field_name, json.dumps(args, sort_keys=True, default=str))
+        if key not in cache:
+            cache[key] = next(root, info, **args)
+        return cache[key]
@@ -0,0 +1,61 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def parse_importtime(output):
+    """
+    Parses ``python -X importtime`` output into
+    ``(module, self_us, cumulative_us, depth)`` tuples.
+    """
+    rows = []
+    for line in output.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Imports a module in a fresh interpreter with -X importtime and reports the slowest imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('module', nargs='?', default='django_graphql_movies.wsgi')
+        parser.add_argument('--limit', type=int, default=25)
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative')
+
+    def handle(self, module, limit, sort, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'django_graphql_movies.settings')
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, universal_newlines=True,
+        )
+        rows = parse_importtime(process.stderr)
+        if process.returncode != 0:
+            errors = [line for line in process.stderr.splitlines() if not LINE_RE.match(line)]
+            raise CommandError('Importing {} failed:\n{}'.format(module, '\n'.join(errors[-20:])))
+
+        total = sum(self_us for _, self_us, _, _ in rows)
+        self.stdout.write('{}: {} modules, {:.1f} ms'.format(module, len(rows), total / 1000))
+
+        index = 1 if sort == 'self' else 2
+        self.stdout.write('')
+        self.stdout.write('{:>10} {:>12}  {}'.format('self ms', 'cumul. ms', 'module'))
+        for module_name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: row[index], reverse=True)[:limit]:
+            self.stdout.write('{:10.1f} {:12.1f}  {}'.format(self_us / 1000, cumulative_us / 1000, module_name))
+
+        packages = defaultdict(int)
+        for module_name, self_us, _, _ in rows:
+            packages[module_name.split('.')[0]] += self_us
+        self.stdout.write('')
+        self.stdout.write('{:>10}  {}'.format('self ms', 'top-level package'))
+        for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            self.stdout.write('{:10.1f}  {}'.format(self_us / 1000, package))
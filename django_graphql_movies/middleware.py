@@ -0,0 +1,194 @@
+import gzip
+import json
+import time
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from graphql import parse
+from graphql.language import ast
+
+from django_graphql_movies.db import routing
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REPLICA_PIN_COOKIE = 'db_pinned_until'
+
+# Only GraphQL results are compressed: pages carrying CSRF tokens must not
+# be (BREACH).
+COMPRESSIBLE_TYPES = (
+    'application/json',
+)
+
+
+def graphql_operation_types(request):
+    """
+    Returns the set of operation types ('query', 'mutation', ...) requested
+    in a GraphQL HTTP request, or None when it can't be determined.
+    """
+    if request.method == 'GET':
+        operations = [request.GET]
+    else:
+        content_type = request.META.get('CONTENT_TYPE', '').split(';', 1)[0].lower()
+        if content_type == 'application/graphql':
+            operations = [{'query': request.body.decode('utf-8')}]
+        elif content_type == 'application/json':
+            try:
+                operations = json.loads(request.body.decode('utf-8'))
+            except ValueError:
+                return None
+            if isinstance(operations, dict):
+                operations = [operations]
+            elif not isinstance(operations, list):
+                return None
+        else:
+            operations = [request.POST]
+
+    types = set()
+    for operation in operations:
+        if not hasattr(operation, 'get'):
+            return None
+        query = operation.get('query')
+        operation_name = operation.get('operationName')
+        if not query:
+            return None
+        try:
+            document = parse(query)
+        except Exception:
+            return None
+        for definition in document.definitions:
+            if not isinstance(definition, ast.OperationDefinition):
+                continue
+            if operation_name and (not definition.name or definition.name.value != operation_name):
+                continue
+            types.add(definition.operation)
+    return types or None
+
+
+class ReplicaRoutingMiddleware(object):
+    """
+    Sends GraphQL queries and admin changelists to a read replica, keeping
+    mutations, everything else and any client that wrote recently on the
+    primary database.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        self.process_request(request)
+        try:
+            response = self.process_response(request, self.get_response(request))
+        finally:
+            routing.reset()
+        return response
+
+    def process_request(self, request):
+        routing.reset()
+        if routing.get_replicas() and not self.is_pinned(request) and self.is_read_only(request):
+            routing.use_replica()
+
+    def process_response(self, request, response):
+        if routing.has_written():
+            sticky = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+            response.set_cookie(REPLICA_PIN_COOKIE, str(int(time.time() + sticky)), max_age=sticky)
+        return response
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(REPLICA_PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def is_read_only(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+
+        if match.url_name == 'graphql':
+            return graphql_operation_types(request) == {'query'}
+
+        if match.app_name == 'admin' and request.method == 'GET':
+            return (match.url_name or '').endswith('_changelist')
+
+        return False
+
+
+class CompressionMiddleware(object):
+    """
+    Compresses /graphql/ responses with brotli (when installed) or gzip,
+    following the client's Accept-Encoding, once they reach
+    COMPRESSION_MIN_SIZE bytes. Strong ETags get the coding appended so each
+    representation keeps its own validator.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if not self.is_graphql(request):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+        content_type = response.get('Content-Type', '').split(';', 1)[0]
+        if content_type not in getattr(settings, 'COMPRESSION_CONTENT_TYPES', COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if coding == 'br':
+            compressed = brotli.compress(response.content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+        else:
+            compressed = gzip.compress(response.content, compresslevel=getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6))
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = '{}-{}"'.format(etag[:-1], coding)
+        return response
+
+    def is_graphql(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return False
+        return match.url_name == 'graphql'
+
+    def negotiate(self, accept_encoding):
+        accepted = {}
+        for item in accept_encoding.split(','):
+            parts = item.strip().split(';')
+            quality = 1.0
+            for param in parts[1:]:
+                name, _, value = param.strip().partition('=')
+                if name == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if parts[0]:
+                accepted[parts[0].strip().lower()] = quality
+
+        for coding in ('br', 'gzip'):
+            if coding == 'br' and brotli is None:
+                continue
+            if accepted.get(coding, accepted.get('*', 0)) > 0:
+                return coding
+        return None
@@ -0,0 +1,105 @@
+"""
+In-process publish/subscribe used to feed GraphQL subscriptions.
+
+The backend is chosen with ``settings.GRAPHQL_PUBSUB_BACKEND``:
+
+* ``django_graphql_movies.pubsub.InMemoryBroker`` (default) delivers events
+  to subscribers of the same process; enough for a single ASGI worker and
+  for tests.
+* ``django_graphql_movies.pubsub.RedisBroker`` fans events out through Redis
+  pub/sub so every worker sees writes made by any other process.
+"""
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+from rx import Observable
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Broker(object):
+
+    def publish(self, topic, payload):
+        raise NotImplementedError
+
+    def subscribe(self, topic, callback):
+        """
+        Calls ``callback(payload)`` for every event published on ``topic``
+        and returns a function that cancels the subscription.
+        """
+        raise NotImplementedError
+
+    def observable(self, topic):
+        def on_subscribe(observer):
+            return self.subscribe(topic, observer.on_next)
+        return Observable.create(on_subscribe)
+
+
+class InMemoryBroker(Broker):
+
+    def __init__(self, **options):
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def publish(self, topic, payload):
+        with self._lock:
+            callbacks = list(self._subscribers.get(topic, ()))
+        for callback in callbacks:
+            callback(payload)
+
+    def subscribe(self, topic, callback):
+        with self._lock:
+            self._subscribers[topic].append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers.get(topic, ()):
+                    self._subscribers[topic].remove(callback)
+                    if not self._subscribers[topic]:
+                        del self._subscribers[topic]
+        return unsubscribe
+
+    def subscriber_count(self, topic):
+        with self._lock:
+            return len(self._subscribers.get(topic, ()))
+
+
+class RedisBroker(InMemoryBroker):
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='graphql:', **options):
+        super(RedisBroker, self).__init__(**options)
+        import redis
+
+        self.prefix = prefix
+        self.redis = redis.Redis.from_url(url)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.psubscribe(**{prefix + '*': self._on_message})
+        self.thread = self.pubsub.run_in_thread(sleep_time=0.1, daemon=True)
+
+    def _on_message(self, message):
+        topic = message['channel'].decode('utf-8')[len(self.prefix):]
+        super(RedisBroker, self).publish(topic, json.loads(message['data']))
+
+    def publish(self, topic, payload):
+        self.redis.publish(self.prefix + topic, json.dumps(payload, cls=DjangoJSONEncoder))
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'GRAPHQL_PUBSUB_BACKEND', 'django_graphql_movies.pubsub.InMemoryBroker')
+                options = getattr(settings, 'GRAPHQL_PUBSUB_OPTIONS', {})
+                _broker = import_string(backend)(**options)
+    return _broker
+
+
+def set_broker(broker):
+    global _broker
+    _broker = broker
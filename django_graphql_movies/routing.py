@@ -0,0 +1,16 @@
+from channels.auth import AuthMiddlewareStack
+from channels.http import AsgiHandler
+from channels.routing import ProtocolTypeRouter, URLRouter
+from django.urls import path, re_path
+
+from django_graphql_movies.consumers import AsyncGraphQLConsumer, GraphQLSubscriptionConsumer
+
+application = ProtocolTypeRouter({
+    'http': URLRouter([
+        path('graphql/', AuthMiddlewareStack(AsyncGraphQLConsumer)),
+        re_path(r'', AsgiHandler),
+    ]),
+    'websocket': AuthMiddlewareStack(URLRouter([
+        path('graphql/', GraphQLSubscriptionConsumer),
+    ])),
+})
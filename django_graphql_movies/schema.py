@@ -1,5 +1,6 @@
 import graphene
 import example_app.schema
+from django_graphql_movies.subscriptions import ChangeEvent, observe
 
 class Query(example_app.schema.Query, graphene.ObjectType):
     # This class will inherit from multiple Queries
@@ -11,4 +12,23 @@ class Mutation(example_app.schema.Mutation, graphene.ObjectType):
     # as we begin to add more apps to our project
     pass
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+class Subscription(graphene.ObjectType):
+    # Served over WebSockets (graphql-ws protocol) at /graphql/
+    movie_changed = graphene.Field(ChangeEvent, id=graphene.ID())
+    actor_changed = graphene.Field(ChangeEvent, id=graphene.ID())
+    avaliacao_changed = graphene.Field(ChangeEvent, id=graphene.ID(), submissao=graphene.ID(), avaliador=graphene.ID())
+    resultado_changed = graphene.Field(ChangeEvent, id=graphene.ID(), submissao=graphene.ID())
+
+    def resolve_movie_changed(root, info, id=None):
+        return observe('example_app.movie', id=id)
+
+    def resolve_actor_changed(root, info, id=None):
+        return observe('example_app.actor', id=id)
+
+    def resolve_avaliacao_changed(root, info, id=None, submissao=None, avaliador=None):
+        return observe('example_app.avaliacao', id=id, submissao=submissao, avaliador=avaliador)
+
+    def resolve_resultado_changed(root, info, id=None, submissao=None):
+        return observe('example_app.resultado', id=id, submissao=submissao)
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
@@ -37,22 +37,59 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django_graphql_movies.apps.CoreConfig',
     'example_app',
     'graphene_django',
+    'channels',
 ]
 
 GRAPHENE = {
-    'SCHEMA': 'django_graphql_movies.schema.schema'
+    'SCHEMA': 'django_graphql_movies.schema.schema',
+    'MIDDLEWARE': [
+        'django_graphql_movies.loaders.RootFieldCacheMiddleware',
+    ],
 }
 
+# Maximum number of operations accepted in a single batched /graphql/ request.
+GRAPHQL_MAX_BATCH_SIZE = 20
+
+# Encoder for GraphQL responses: 'auto' uses orjson when installed and the
+# standard library otherwise.
+GRAPHQL_RESPONSE_ENCODER = 'auto'
+
+# Only /graphql/ JSON responses are compressed, and those smaller than this
+# are not worth it. Brotli is used when the 'brotli' package is installed,
+# gzip otherwise.
+COMPRESSION_MIN_SIZE = 1024
+
+# Cache-Control for GraphQL GET queries, by operationName. The None entry
+# applies to every other operation. Responses always carry an ETag, so
+# 'no_cache' clients revalidate with a cheap 304.
+GRAPHQL_CACHE_CONTROL = {
+    None: {'private': True, 'no_cache': True},
+}
+
+# Pub/sub backend feeding GraphQL subscriptions. The in-memory broker only
+# reaches subscribers of the same process; use RedisBroker with more than
+# one worker.
+GRAPHQL_PUBSUB_BACKEND = os.environ.get('GRAPHQL_PUBSUB_BACKEND', 'django_graphql_movies.pubsub.InMemoryBroker')
+
+GRAPHQL_PUBSUB_OPTIONS = {}
+
+if os.environ.get('GRAPHQL_PUBSUB_REDIS_URL'):
+    GRAPHQL_PUBSUB_OPTIONS['url'] = os.environ['GRAPHQL_PUBSUB_REDIS_URL']
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django_graphql_movies.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'django_graphql_movies.middleware.ReplicaRoutingMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'example_app.middleware.OrcamentoGoogleMiddleware',
 ]
 
 ROOT_URLCONF = 'django_graphql_movies.urls'
@@ -75,6 +112,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'django_graphql_movies.wsgi.application'
 
+ASGI_APPLICATION = 'django_graphql_movies.routing.application'
+
+# Size of the thread pool the async GraphQL consumer uses for blocking
+# (ORM) resolvers.
+GRAPHQL_ASYNC_MAX_THREADS = int(os.environ.get('GRAPHQL_ASYNC_MAX_THREADS', 10))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -86,6 +129,79 @@ DATABASES = {
     }
 }
 
+# The default cache holds the model version counters behind GraphQL ETags
+# (django_graphql_movies.versions), so it has to be shared by every worker,
+# e.g. DJANGO_CACHE_BACKEND=django.core.cache.backends.memcached.PyLibMCCache
+# and DJANGO_CACHE_LOCATION=127.0.0.1:11211. With the per-process default,
+# ETags and 304 responses are turned off.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
+# Database profile: 'development' keeps the defaults above, 'production'
+# enables a connection pool for PostgreSQL (connections are returned to it
+# after each request and a checkout waits up to DJANGO_DATABASE_POOL_TIMEOUT
+# seconds when it is exhausted) and, for SQLite, persistent connections
+# with WAL/mmap pragmas.
+
+DATABASE_PROFILE = os.environ.get('DJANGO_DATABASE_PROFILE', 'development')
+
+if DATABASE_PROFILE == 'production':
+    if os.environ.get('DJANGO_DATABASE_ENGINE') == 'postgresql':
+        DATABASES['default'] = {
+            'ENGINE': 'django_graphql_movies.db.backends.postgresql_pool',
+            'NAME': os.environ.get('DJANGO_DATABASE_NAME', 'django_graphql_movies'),
+            'USER': os.environ.get('DJANGO_DATABASE_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DATABASE_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DATABASE_PORT', ''),
+            'OPTIONS': {
+                'POOL': {
+                    'CLASS': os.environ.get('DJANGO_DATABASE_POOL', 'psycopg2.pool.ThreadedConnectionPool'),
+                    'MIN_SIZE': int(os.environ.get('DJANGO_DATABASE_POOL_MIN', 1)),
+                    'MAX_SIZE': int(os.environ.get('DJANGO_DATABASE_POOL_MAX', 20)),
+                    'TIMEOUT': float(os.environ.get('DJANGO_DATABASE_POOL_TIMEOUT', 5)),
+                },
+            },
+            # Give the connection back to the pool at the end of every
+            # request; the pool keeps it open.
+            'CONN_MAX_AGE': 0,
+        }
+    else:
+        DATABASES['default']['PRAGMAS'] = {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 268435456,
+            'busy_timeout': 5000,
+        }
+
+    DATABASES['default'].setdefault('CONN_MAX_AGE', int(os.environ.get('DJANGO_DATABASE_CONN_MAX_AGE', 600)))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas: a comma-separated list of database names (SQLite) or hosts
+# (PostgreSQL) that mirror the primary. GraphQL queries and admin changelists
+# read from them; clients stay on the primary for REPLICA_STICKY_SECONDS
+# after a write.
+
+DATABASE_REPLICAS = []
+
+for index, replica in enumerate(filter(None, os.environ.get('DJANGO_DATABASE_REPLICAS', '').split(','))):
+    alias = 'replica{}'.format(index + 1)
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        DATABASES[alias]['NAME'] = replica.strip()
+    else:
+        DATABASES[alias]['HOST'] = replica.strip()
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['django_graphql_movies.db.routing.PrimaryReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.environ.get('DJANGO_REPLICA_STICKY_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -124,3 +240,52 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Google APIs
+# Base URL that replaces https://www.googleapis.com/ for the Drive and Docs
+# clients, e.g. example_app.fake_drive_server during performance tests.
+
+GOOGLE_API_ENDPOINT = os.environ.get('GOOGLE_API_ENDPOINT') or None
+
+# Outbound Drive/Docs calls allowed per web request before a warning is
+# logged (or, with GOOGLE_API_CALL_BUDGET_STRICT, before the request fails).
+# None (an empty GOOGLE_API_CALL_BUDGET variable) disables the budget. See
+# example_app.instrumentacao.
+
+GOOGLE_API_CALL_BUDGET = os.environ.get('GOOGLE_API_CALL_BUDGET', '20')
+GOOGLE_API_CALL_BUDGET = int(GOOGLE_API_CALL_BUDGET) if GOOGLE_API_CALL_BUDGET.strip() else None
+
+GOOGLE_API_CALL_BUDGET_STRICT = False
+
+
+# Background jobs (example_app.jobs)
+# Run with `manage.py processar_jobs`. JOBS_ALWAYS_EAGER runs jobs inline
+# when they are enqueued; JOBS_LOCK_TIMEOUT is how long a claimed job may
+# run before it is considered abandoned and goes back to the queue.
+
+JOBS_ALWAYS_EAGER = False
+
+JOBS_LOCK_TIMEOUT = int(os.environ.get('JOBS_LOCK_TIMEOUT', 600))
+
+
+# Streaming uploads to MinIO (example_app.uploads)
+# Edital and Documento files are sent as S3 multipart uploads of
+# UPLOADS_PART_SIZE bytes (at least 5 MiB), UPLOADS_PARALLEL_PARTS at a time.
+# UPLOADS_S3_CLIENT is a dotted path to a callable returning a boto3-style
+# client; by default the media storage's client and bucket are used.
+
+UPLOADS_PART_SIZE = int(os.environ.get('UPLOADS_PART_SIZE', 8 * 2 ** 20))
+
+UPLOADS_PARALLEL_PARTS = int(os.environ.get('UPLOADS_PARALLEL_PARTS', 4))
+
+UPLOADS_S3_CLIENT = None
+
+UPLOADS_BUCKET = os.environ.get('UPLOADS_BUCKET') or None
+
+
+# Metrics (django_graphql_movies.metrics)
+# /metrics/ serves this process's metrics in the Prometheus text format to
+# these addresses and to staff users.
+
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
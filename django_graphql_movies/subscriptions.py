@@ -0,0 +1,138 @@
+"""
+Publishes model changes to the pub/sub broker for GraphQL subscriptions.
+
+Each tracked model keeps a snapshot of the field values loaded with it, so
+on save only the fields that actually changed are published. Deferred
+fields are left out of the snapshot (reading them would query the
+database); if one is saved later it is reported as changed. Events are
+published once the transaction that saved the row commits, and look
+like::
+
+    {'id': 1, 'action': 'updated', 'changes': {'title': 'Creed II'},
+     'keys': {'submissao': 7}}
+
+``keys`` carries the foreign keys subscriptions can filter on, whether they
+changed or not.
+"""
+import functools
+
+import graphene
+from django.db import transaction
+from django.db.models import signals
+from graphene.types.generic import GenericScalar
+
+from django_graphql_movies.pubsub import get_broker
+
+# model label -> foreign keys that subscribers may filter on
+TRACKED_MODELS = {
+    'example_app.Movie': (),
+    'example_app.Actor': (),
+    'example_app.Avaliacao': ('submissao', 'avaliador'),
+    'example_app.Resultado': ('submissao',),
+}
+
+SNAPSHOT_ATTR = '_subscription_snapshot'
+
+
+def topic_for(model):
+    return model._meta.label_lower
+
+
+@functools.lru_cache(maxsize=None)
+def concrete_attnames(model):
+    return tuple(field.attname for field in model._meta.concrete_fields)
+
+
+def snapshot(instance):
+    values = instance.__dict__
+    return {name: values[name] for name in concrete_attnames(type(instance)) if name in values}
+
+
+def serialize(instance, attnames):
+    changes = {}
+    for field in instance._meta.concrete_fields:
+        if field.attname in attnames:
+            changes[field.name] = field.value_to_string(instance)
+    return changes
+
+
+def event_keys(instance):
+    keys = {}
+    for name in TRACKED_MODELS.get(instance._meta.label, ()):
+        keys[name] = str(getattr(instance, instance._meta.get_field(name).attname))
+    return keys
+
+
+def on_post_init(sender, instance, **kwargs):
+    setattr(instance, SNAPSHOT_ATTR, snapshot(instance))
+
+
+def publish_on_commit(topic, event, using):
+    transaction.on_commit(lambda: get_broker().publish(topic, event), using=using)
+
+
+def on_post_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    current = snapshot(instance)
+    if created:
+        changed = set(current)
+    else:
+        previous = getattr(instance, SNAPSHOT_ATTR, {})
+        changed = {name for name, value in current.items() if name not in previous or previous[name] != value}
+        if not changed:
+            return
+    setattr(instance, SNAPSHOT_ATTR, current)
+
+    publish_on_commit(topic_for(sender), {
+        'id': str(instance.pk),
+        'action': 'created' if created else 'updated',
+        'changes': serialize(instance, changed),
+        'keys': event_keys(instance),
+    }, using)
+
+
+def on_post_delete(sender, instance, using=None, **kwargs):
+    publish_on_commit(topic_for(sender), {
+        'id': str(instance.pk),
+        'action': 'deleted',
+        'changes': {},
+        'keys': event_keys(instance),
+    }, using)
+
+
+def connect_signals():
+    for label in TRACKED_MODELS:
+        uid = 'subscriptions:{}'.format(label)
+        signals.post_init.connect(on_post_init, sender=label, dispatch_uid=uid, weak=False)
+        signals.post_save.connect(on_post_save, sender=label, dispatch_uid=uid, weak=False)
+        signals.post_delete.connect(on_post_delete, sender=label, dispatch_uid=uid, weak=False)
+
+
+def disconnect_signals():
+    for label in TRACKED_MODELS:
+        uid = 'subscriptions:{}'.format(label)
+        signals.post_init.disconnect(sender=label, dispatch_uid=uid)
+        signals.post_save.disconnect(sender=label, dispatch_uid=uid)
+        signals.post_delete.disconnect(sender=label, dispatch_uid=uid)
+
+
+def observe(topic, id=None, **keys):
+    """
+    Observable of the events published on ``topic`` that match ``id`` and
+    the given foreign keys; ``None`` filters are ignored.
+    """
+    keys = {name: str(value) for name, value in keys.items() if value is not None}
+
+    def matches(event):
+        if id is not None and event['id'] != str(id):
+            return False
+        return all(event['keys'].get(name) == value for name, value in keys.items())
+
+    return get_broker().observable(topic).filter(matches)
+
+
+class ChangeEvent(graphene.ObjectType):
+    id = graphene.ID()
+    action = graphene.String()
+    changes = GenericScalar()
@@ -0,0 +1,15 @@
+"""
+Settings for the test suite. ``manage.py test`` uses them by default; other
+runners need ``DJANGO_SETTINGS_MODULE=django_graphql_movies.test_settings``.
+"""
+import os
+
+from django_graphql_movies.settings import *  # noqa: F401,F403
+from django_graphql_movies.settings import BASE_DIR, DATABASES
+
+# A real, separately migrated SQLite database to route reads to; it only
+# becomes a replica inside the tests that list it in DATABASE_REPLICAS.
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+}
@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path
-from graphene_django.views import GraphQLView
-from django_graphql_movies.schema import schema
+from django.urls import include, path
 from django.views.decorators.csrf import csrf_exempt # New library
+from django_graphql_movies.metrics import metrics_view
+from django_graphql_movies.views import GraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path('uploads/', include('example_app.urls')),
+    path('metrics/', metrics_view, name='metrics'),
+    path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=settings.DEBUG)), name='graphql'),
 ]
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Per-model version counters used to build ETags for GraphQL GET queries.
+
+Saving or deleting a versioned model (or changing one of its M2M relations)
+bumps its counter, which changes the ETag of every cached query and makes
+the next conditional GET re-execute.
+
+Counters live in the default cache, which must be shared between workers
+(memcached/redis, see CACHES in settings). With a per-process
+LocMemCache a bump would only reach the worker that saved, so ``enabled()``
+is false and GraphQLView sends no ETags.
+"""
+import hashlib
+import json
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import signals
+
+VERSIONED_MODELS = (
+    'example_app.Movie',
+    'example_app.Actor',
+)
+
+CACHE_PREFIX = 'graphql:version:'
+
+
+def enabled():
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def version_key(label):
+    return CACHE_PREFIX + label.lower()
+
+
+def bump(label):
+    key = version_key(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Never reuse a number the cache may have evicted.
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def get_versions():
+    keys = [version_key(label) for label in VERSIONED_MODELS]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        value = int(time.time() * 1000)
+        cache.add(key, value, None)
+        versions[key] = cache.get(key, value)
+    return [versions[key] for key in keys]
+
+
+def compute_etag(query, variables, operation_name):
+    payload = json.dumps([query, variables, operation_name, get_versions()], sort_keys=True, default=str)
+    return '"{}"'.format(hashlib.sha256(payload.encode('utf-8')).hexdigest())
+
+
+def parse_if_none_match(header):
+    # CompressionMiddleware tags compressed representations as "<etag>-<coding>".
+    tags = set()
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        for coding in ('-gzip"', '-br"'):
+            if tag.endswith(coding):
+                tag = tag[:-len(coding)] + '"'
+        tags.add(tag)
+    return tags
+
+
+def on_change(sender, **kwargs):
+    bump(sender._meta.label)
+
+
+def on_m2m_change(sender, action, model, instance, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    for label in (instance._meta.label, model._meta.label):
+        if label in VERSIONED_MODELS:
+            bump(label)
+
+
+def connect_signals():
+    for label in VERSIONED_MODELS:
+        uid = 'versions:{}'.format(label)
+        signals.post_save.connect(on_change, sender=label, dispatch_uid=uid, weak=False)
+        signals.post_delete.connect(on_change, sender=label, dispatch_uid=uid, weak=False)
+    signals.m2m_changed.connect(on_m2m_change, dispatch_uid='versions:m2m', weak=False)
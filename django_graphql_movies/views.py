@@ -0,0 +1,128 @@
+import json
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import ensure_csrf_cookie
+from graphene_django import views
+
+from django_graphql_movies import versions
+from django_graphql_movies.encoders import get_encoder
+from django_graphql_movies.loaders import get_loaders
+
+
+class GraphQLView(views.GraphQLView):
+    """
+    GraphQLView that also accepts a JSON array of operations. They are run
+    in order within the same request, sharing one ``Loaders`` context, and
+    answered with an array of results in the same order. graphene's own
+    ``batch`` flag stays off; a list body is what marks a batch.
+
+    GET queries carry an ETag built from the query and the model versions in
+    ``django_graphql_movies.versions`` (when they live in a shared cache); a
+    matching ``If-None-Match`` gets a 304 without executing anything.
+
+    Responses are encoded to bytes by ``django_graphql_movies.encoders``.
+    """
+
+    @method_decorator(ensure_csrf_cookie)
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_conditional_get(request):
+            return super(GraphQLView, self).dispatch(request, *args, **kwargs)
+
+        try:
+            query, variables, operation_name, id = self.get_graphql_params(request, {})
+        except views.HttpError:
+            return super(GraphQLView, self).dispatch(request, *args, **kwargs)
+
+        etag = versions.compute_etag(query, variables, operation_name)
+        if etag in versions.parse_if_none_match(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = super(GraphQLView, self).dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        patch_cache_control(response, **self.get_cache_control(operation_name))
+        return response
+
+    def get_response(self, request, data, show_graphiql=False):
+        # graphene joins per-operation strings for batches; encode the whole
+        # batch as one document instead.
+        if isinstance(data, list):
+            results = [self.get_result(request, entry, batch=True) for entry in data]
+            status_code = max(status_code for result, status_code in results)
+            return self.json_encode(request, [result for result, status_code in results]), status_code
+
+        result, status_code = self.get_result(request, data, show_graphiql)
+        if result is not None:
+            result = self.json_encode(request, result, pretty=show_graphiql)
+        return result, status_code
+
+    def get_result(self, request, data, show_graphiql=False, batch=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        status_code = 200
+        result = None
+        if execution_result:
+            result = {}
+            if execution_result.errors:
+                result['errors'] = [self.format_error(e) for e in execution_result.errors]
+            if execution_result.invalid:
+                status_code = 400
+            else:
+                result['data'] = execution_result.data
+            if batch:
+                result['id'] = id
+                result['status'] = status_code
+        return result, status_code
+
+    def json_encode(self, request, d, pretty=False):
+        # Pretty output is a debugging aid only; production always gets the
+        # compact encoding.
+        pretty = settings.DEBUG and bool(self.pretty or pretty or request.GET.get('pretty'))
+        return get_encoder().encode(d, pretty=pretty)
+
+    def is_conditional_get(self, request):
+        if request.method != 'GET' or not request.GET.get('query') or not versions.enabled():
+            return False
+        return not (self.graphiql and self.can_display_graphiql(request, {}))
+
+    def get_cache_control(self, operation_name):
+        policies = getattr(settings, 'GRAPHQL_CACHE_CONTROL', {})
+        return policies.get(operation_name, policies.get(None, {'private': True, 'no_cache': True}))
+
+    def get_max_batch_size(self):
+        return getattr(settings, 'GRAPHQL_MAX_BATCH_SIZE', 20)
+
+    def get_context(self, request):
+        get_loaders(request)
+        return request
+
+    def parse_body(self, request):
+        if self.get_content_type(request) != 'application/json':
+            return super(GraphQLView, self).parse_body(request)
+
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+        except (TypeError, ValueError):
+            raise views.HttpError(HttpResponseBadRequest('POST body sent invalid JSON.'))
+
+        if isinstance(data, list):
+            if not data:
+                raise views.HttpError(HttpResponseBadRequest('Received an empty list in the batch request.'))
+            if len(data) > self.get_max_batch_size():
+                raise views.HttpError(HttpResponseBadRequest(
+                    'Batch requests are limited to {} operations.'.format(self.get_max_batch_size())
+                ))
+            if not all(isinstance(entry, dict) for entry in data):
+                raise views.HttpError(HttpResponseBadRequest('Every batch entry must be a JSON query.'))
+            self.graphiql = False
+        elif not isinstance(data, dict):
+            raise views.HttpError(HttpResponseBadRequest('The received data is not a valid JSON query.'))
+
+        return data
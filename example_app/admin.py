@@ -1,19 +1,152 @@
+import operator
+from functools import reduce
+
 from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path, lookup_needs_distinct
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections, models as db_models
+from django.utils.functional import cached_property
+
 from example_app import models, tasks
+from example_app.uploads import StreamingUploadsAdminMixin
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate instead of ``COUNT(*)`` for unfiltered
+    lists of big tables. Filtered lists, small tables and backends without
+    an estimate get the exact count.
+    """
+    exact_count_below = 10000
 
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, db_models.QuerySet) and not queryset.query.has_filters():
+            estimate = self.estimated_count(queryset)
+            if estimate is not None and estimate >= self.exact_count_below:
+                return estimate
+        return super(EstimatedCountPaginator, self).count
 
+    def estimated_count(self, queryset):
+        connection = connections[queryset.db]
+        table = queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'mysql':
+                cursor.execute(
+                    'SELECT table_rows FROM information_schema.tables '
+                    'WHERE table_schema = DATABASE() AND table_name = %s', [table]
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
 
 
+class ChangeListPlus(ChangeList):
 
+    def apply_select_related(self, qs):
+        qs = super(ChangeListPlus, self).apply_select_related(qs)
+        prefetch = self.model_admin.get_list_prefetch_related(self.request)
+        return qs.prefetch_related(*prefetch) if prefetch else qs
 
+    def get_queryset(self, request):
+        self.request = request
+        return super(ChangeListPlus, self).get_queryset(request)
 
 
+class ModelAdminPlus(admin.ModelAdmin):
+    """
+    ModelAdmin tuned for big tables:
 
-class ModelAdminPlus(object):
-    def save_model(self, request, obj, form, change):
-        pass
+    - ``list_select_related`` is derived from ``list_display`` when left False:
+      foreign keys shown as columns, plus whatever display methods declare in
+      ``select_related``/``prefetch_related`` attributes (or imply with an
+      ``admin_order_field`` that follows relations);
+    - pagination uses ``EstimatedCountPaginator`` and skips the full count;
+    - in ``search_fields``, ``^field`` is Django's case-insensitive prefix
+      match (index it with ``UpperPrefixIndex``) and ``=field`` an exact
+      match (integers only for numeric fields) that a plain b-tree index
+      answers.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return ChangeListPlus
+
+    def get_list_select_related(self, request):
+        if self.list_select_related:
+            return self.list_select_related
+
+        related = []
+        for name in self.get_list_display(request):
+            attr = getattr(self, name, None) if isinstance(name, str) else name
+            if attr is None and isinstance(name, str):
+                try:
+                    field = self.opts.get_field(name)
+                except Exception:
+                    continue
+                if (field.many_to_one or field.one_to_one) and field.name == name:
+                    related.append(name)
+                continue
+            related.extend(self._hint(attr, 'select_related'))
+            order_field = getattr(attr, 'admin_order_field', None)
+            if isinstance(order_field, str) and '__' in order_field.lstrip('-'):
+                path = order_field.lstrip('-').rsplit('__', 1)[0]
+                if self._is_single_valued(path):
+                    related.append(path)
+        return tuple(dict.fromkeys(related))
+
+    def get_list_prefetch_related(self, request):
+        prefetch = []
+        for name in self.get_list_display(request):
+            attr = getattr(self, name, None) if isinstance(name, str) else name
+            prefetch.extend(self._hint(attr, 'prefetch_related'))
+        return tuple(dict.fromkeys(prefetch))
+
+    def _hint(self, attr, name):
+        value = getattr(attr, name, ())
+        return (value,) if isinstance(value, str) else tuple(value)
+
+    def _is_single_valued(self, path):
+        try:
+            fields = get_fields_from_path(self.model, path)
+        except Exception:
+            return False
+        return all(field.is_relation and (field.many_to_one or field.one_to_one) for field in fields)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if not search_fields or not search_term:
+            return queryset, False
+
+        lookups = []
+        for search_field in map(str, search_fields):
+            if search_field[0] in '^=':
+                name = search_field[1:]
+                field = get_fields_from_path(self.model, name)[-1]
+                numeric = isinstance(field.target_field if field.is_relation else field, (
+                    db_models.AutoField, db_models.IntegerField
+                ))
+                lookups.append((name if search_field[0] == '=' else name + '__istartswith', numeric))
+            else:
+                lookups.append((search_field + '__icontains', False))
+
+        for bit in search_term.split():
+            or_queries = [
+                db_models.Q(**{lookup: int(bit) if numeric else bit})
+                for lookup, numeric in lookups if not numeric or bit.isdigit()
+            ]
+            if not or_queries:
+                return queryset.none(), False
+            queryset = queryset.filter(reduce(operator.or_, or_queries))
+
+        use_distinct = any(lookup_needs_distinct(self.opts, lookup) for lookup, _ in lookups)
+        return queryset, use_distinct
 
 
 @admin.register(models.ModeloPPC)
@@ -29,3 +162,69 @@ class ModeloPPCAdmin(ModelAdminPlus):
         if not change:
             tasks.criar_documento.delay(obj.id)
 
+
+@admin.register(models.Documento)
+class DocumentoAdmin(StreamingUploadsAdminMixin, ModelAdminPlus):
+    list_display = ('nome', 'url', 'arquivo')
+    search_fields = ('nome',)
+    upload_prefixo = 'editais_ppc/documentos'
+
+
+@admin.register(models.Edital)
+class EditalAdmin(StreamingUploadsAdminMixin, ModelAdminPlus):
+    list_display = ('id', 'nome', 'numero', 'ano', 'tipo')
+    search_fields = ('=id', '^nome')
+    list_filter = ('ano', 'tipo')
+    raw_id_fields = ('avaliadores', 'modelo_ppc')
+    upload_prefixo = 'editais_ppc/editais'
+
+
+@admin.register(models.Inscricao)
+class InscricaoAdmin(ModelAdminPlus):
+    list_display = ('id', 'edital', 'get_portaria', 'ppc', 'data_criacao')
+    search_fields = ('=id', '=portaria', '^edital__nome')
+    list_filter = ('data_criacao',)
+    raw_id_fields = ('edital', 'portaria', 'ppc', 'membros')
+
+    def get_portaria(self, obj):
+        return obj.portaria_id
+    get_portaria.short_description = 'Portaria'
+    get_portaria.admin_order_field = 'portaria'
+
+
+@admin.register(models.Submissao)
+class SubmissaoAdmin(ModelAdminPlus):
+    list_display = ('id', 'get_inscricao', 'usuario', 'data')
+    search_fields = ('=id', '=inscricao', '^inscricao__edital__nome')
+    list_filter = ('data',)
+    raw_id_fields = ('usuario', 'inscricao', 'avaliadores')
+
+    def get_inscricao(self, obj):
+        return obj.inscricao
+    get_inscricao.short_description = 'Inscrição'
+    get_inscricao.admin_order_field = 'inscricao__edital__nome'
+
+
+@admin.register(models.Avaliacao)
+class AvaliacaoAdmin(ModelAdminPlus):
+    list_display = ('id', 'avaliador', 'submissao', 'situacao', 'cadastrada_em')
+    search_fields = ('=id', '=submissao', '=avaliador')
+    list_filter = ('situacao', 'cadastrada_em')
+    raw_id_fields = ('avaliador', 'submissao')
+
+
+@admin.register(models.Job)
+class JobAdmin(ModelAdminPlus):
+    list_display = ('id', 'nome', 'status', 'prioridade', 'tentativas', 'executar_em', 'reservado_por')
+    search_fields = ('=id', '^nome', '=chave')
+    list_filter = ('status', 'nome')
+    readonly_fields = ('reservado_por', 'reservado_em', 'criado_em', 'concluido_em', 'ultimo_erro')
+
+
+@admin.register(models.UploadMultipart)
+class UploadMultipartAdmin(ModelAdminPlus):
+    list_display = ('id', 'nome_original', 'destino', 'usuario', 'status', 'tamanho', 'criado_em')
+    search_fields = ('=id', '=identificador', '^nome_original')
+    list_filter = ('status', 'destino')
+    readonly_fields = ('identificador', 'chave', 'upload_id', 'tamanho', 'criado_em', 'concluido_em')
+    raw_id_fields = ('usuario',)
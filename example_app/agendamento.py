@@ -0,0 +1,100 @@
+"""
+Agenda as mudanças de permissão ligadas às fases de cada edital.
+
+Cada transição vira um ``Job`` com ``executar_em`` na meia-noite do dia em
+que a fase começa, então a fila de jobs (ordenada por data) é a fila de
+transições: quando nenhum edital muda de fase, o worker não tem nada a
+fazer, e em cada transição só as submissões daquele edital são processadas.
+
+Salvar um edital com alguma dessas datas alterada refaz a agenda dele e
+reaplica as permissões da fase em que ele está, a menos que ela já tenha
+sido aplicada depois de começar. Salvar sem mudar as datas não enfileira
+nada.
+"""
+import datetime
+
+from django.utils import timezone
+
+# fase -> (campo de data, dias depois da data, método do Edital)
+TRANSICOES = (
+    ('analise', 'inicio_analise', 0, 'aplicar_permissoes_analise'),
+    ('pre_ajuste', 'fim_analise', 1, 'aplicar_permissoes_pre_ajuste'),
+    ('ajuste', 'inicio_ajuste', 0, 'aplicar_permissoes_ajuste'),
+    ('pos_ajuste', 'fim_ajuste', 1, 'aplicar_permissoes_pos_ajuste'),
+)
+
+METODOS = {fase: metodo for fase, _, _, metodo in TRANSICOES}
+CAMPOS = tuple(campo for _, campo, _, _ in TRANSICOES)
+
+
+def chave(edital_id, fase=''):
+    return 'transicao:{}:{}'.format(edital_id, fase)
+
+
+def transicoes(edital):
+    """Lista ``(quando, fase)`` das transições do edital, em ordem."""
+    resultado = []
+    for fase, campo, dias, _ in TRANSICOES:
+        data = getattr(edital, campo)
+        if data is None:
+            continue
+        inicio = datetime.datetime.combine(data + datetime.timedelta(days=dias), datetime.time.min)
+        resultado.append((timezone.make_aware(inicio) if timezone.is_naive(inicio) else inicio, fase))
+    return sorted(resultado)
+
+
+def datas(edital):
+    return tuple(getattr(edital, campo) for campo in CAMPOS)
+
+
+def guardar_datas(edital, update_fields=None):
+    """Guarda em ``edital`` as datas gravadas no banco antes do ``save()``."""
+    from example_app.models import Edital
+
+    edital._datas_salvas = None
+    if edital.pk is not None and (update_fields is None or set(CAMPOS) & set(update_fields)):
+        edital._datas_salvas = Edital.objects.filter(pk=edital.pk).values_list(*CAMPOS).first()
+
+
+def aplicada(edital_id, fase, desde):
+    from example_app.models import Job
+    return Job.objects.filter(
+        chave=chave(edital_id, fase), status=Job.CONCLUIDO, concluido_em__gte=desde
+    ).exists()
+
+
+def cancelar(edital_id):
+    from example_app.models import Job
+    return Job.objects.filter(status=Job.PENDENTE, chave__startswith=chave(edital_id)).delete()
+
+
+def agendar(edital, update_fields=None):
+    """
+    Se as datas das fases mudaram desde ``guardar_datas``, substitui as
+    transições pendentes do edital pelas calculadas a partir das datas
+    atuais e enfileira a fase corrente para execução imediata, caso ela
+    ainda não tenha sido aplicada desde que começou.
+    """
+    from example_app import tasks
+
+    if update_fields is not None and not set(CAMPOS) & set(update_fields):
+        return
+    if getattr(edital, '_datas_salvas', None) == datas(edital):
+        return
+
+    cancelar(edital.pk)
+    agora = timezone.now()
+    atual = None
+    for quando, fase in transicoes(edital):
+        if quando <= agora:
+            atual = (quando, fase)
+            continue
+        tasks.transicao_fase.apply_async(args=[edital.pk, fase], eta=quando, chave=chave(edital.pk, fase))
+    if atual is not None and not aplicada(edital.pk, atual[1], atual[0]):
+        tasks.transicao_fase.apply_async(args=[edital.pk, atual[1]], chave=chave(edital.pk, atual[1]))
+
+
+def executar(edital, fase):
+    if fase not in METODOS:
+        raise ValueError('Fase desconhecida: {}'.format(fase))
+    getattr(edital, METODOS[fase])()
@@ -0,0 +1,160 @@
+"""
+Credenciais do Google decifradas uma vez por processo e renovadas uma vez
+por token no sistema inteiro.
+
+``obter`` devolve o mesmo objeto ``Credentials`` para todas as instâncias
+de ``GoogleCloudCredential`` do processo enquanto o token não estiver perto
+de expirar (``MARGEM``). Toda renovação, inclusive a que o transporte HTTP
+faz sozinho ao receber 401, passa por ``renovar``: um lock por credencial
+serializa as threads do processo e ``SELECT ... FOR UPDATE`` na linha
+serializa os processos. Quem chega depois encontra no banco o token que o
+primeiro gravou e o reutiliza em vez de renovar de novo.
+
+Se a renovação acontecer dentro de uma transação maior, o lock da linha só
+é liberado (e o token novo só fica visível) quando ela terminar.
+"""
+import datetime
+import functools
+import json
+import logging
+import threading
+
+from django.db import router, transaction
+
+from django_graphql_movies import metrics
+
+logger = logging.getLogger(__name__)
+
+MARGEM = datetime.timedelta(seconds=60)
+FORMATO_EXPIRY = '%Y-%m-%dT%H:%M:%S'
+
+_cache = {}
+_locks = {}
+_cache_lock = threading.Lock()
+
+consultas = metrics.counter(
+    'google_credentials_cache_total', 'Consultas ao cache de credenciais decifradas', ['result']
+)
+renovacoes = metrics.counter(
+    'google_credentials_refresh_total', 'Renovações de token OAuth por resultado', ['service', 'result']
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _classe():
+    from google.oauth2.credentials import Credentials
+
+    class CredenciaisGerenciadas(Credentials):
+        credencial_id = None
+
+        def refresh(self, request):
+            renovar(self, request)
+
+        def renovar_no_google(self, request):
+            super(CredenciaisGerenciadas, self).refresh(request)
+
+    return CredenciaisGerenciadas
+
+
+def carregar(info, credencial_id=None):
+    info = dict(info)
+    expiry = info.pop('expiry', None)
+    credenciais = _classe()(**info)
+    credenciais.credencial_id = credencial_id
+    if expiry:
+        # google-auth compara expiry com utcnow() sem fuso horário.
+        credenciais.expiry = datetime.datetime.strptime(expiry, FORMATO_EXPIRY)
+    return credenciais
+
+
+def serializar(credenciais):
+    return json.dumps({
+        'token': credenciais.token,
+        'refresh_token': credenciais.refresh_token,
+        'token_uri': credenciais.token_uri,
+        'client_id': credenciais.client_id,
+        'client_secret': credenciais.client_secret,
+        'scopes': list(credenciais.scopes) if credenciais.scopes else credenciais.scopes,
+        'expiry': credenciais.expiry.strftime(FORMATO_EXPIRY) if credenciais.expiry else None,
+    })
+
+
+def utilizavel(credenciais):
+    if not credenciais.token:
+        return False
+    return credenciais.expiry is None or credenciais.expiry - MARGEM > datetime.datetime.utcnow()
+
+
+def _lock(credencial_id):
+    with _cache_lock:
+        return _locks.setdefault(credencial_id, threading.Lock())
+
+
+def obter(credencial):
+    """Credenciais prontas para uso da ``GoogleCloudCredential``."""
+    from example_app.models import CredentialsError
+
+    with _cache_lock:
+        credenciais = _cache.get(credencial.pk)
+    if credenciais is not None and utilizavel(credenciais):
+        consultas.inc(result='hit')
+        return credenciais
+    consultas.inc(result='miss')
+
+    if not credencial.credentials_content:
+        raise CredentialsError()
+    credenciais = carregar(json.loads(credencial.credentials_content), credencial.pk)
+    if not utilizavel(credenciais):
+        if not credenciais.refresh_token:
+            raise CredentialsError()
+        from google.auth.transport.requests import Request
+        credenciais.refresh(Request())
+
+    with _cache_lock:
+        _cache[credencial.pk] = credenciais
+    return credenciais
+
+
+def renovar(credenciais, request):
+    """
+    Renova o token de ``credenciais`` (no próprio objeto) e grava o novo
+    cifrado, a menos que outro worker já tenha feito isso.
+    """
+    from example_app.models import GoogleCloudCredential
+
+    if credenciais.credencial_id is None:
+        credenciais.renovar_no_google(request)
+        return
+
+    with _lock(credenciais.credencial_id):
+        alias = router.db_for_write(GoogleCloudCredential)
+        with transaction.atomic(using=alias):
+            linha = GoogleCloudCredential.objects.using(alias).select_for_update().get(pk=credenciais.credencial_id)
+            info = json.loads(linha.credentials_content) if linha.credentials_content else {'token': None}
+            salvas = carregar(info, linha.pk)
+            if salvas.token != credenciais.token and utilizavel(salvas):
+                credenciais.token = salvas.token
+                credenciais.expiry = salvas.expiry
+                renovacoes.inc(service=linha.service_name, result='reused')
+                return
+
+            try:
+                credenciais.renovar_no_google(request)
+            except Exception:
+                renovacoes.inc(service=linha.service_name, result='failed')
+                raise
+            # update() não dispara post_save, que invalidaria o cache.
+            GoogleCloudCredential.objects.using(alias).filter(pk=linha.pk).update(
+                credentials_content=serializar(credenciais)
+            )
+    renovacoes.inc(service=linha.service_name, result='refreshed')
+    logger.info('Token do Google renovado para %s', linha.service_name)
+
+
+def invalidar(credencial_id=None):
+    """Descarta do cache uma credencial (ou todas)."""
+    with _cache_lock:
+        if credencial_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(credencial_id, None)
@@ -0,0 +1,108 @@
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+
+class AvaliadoresInsuficientesError(Exception):
+    pass
+
+
+def distribuir(submissoes, avaliadores, quantidade, conflitos=None, carga=None, atuais=None):
+    """
+    Distribui ``quantidade`` avaliadores para cada submissão escolhendo sempre
+    o avaliador menos carregado que não esteja em conflito com ela.
+
+    ``conflitos`` e ``atuais`` mapeiam id da submissão -> ids de servidores;
+    ``carga`` mapeia id do servidor -> número de avaliações já atribuídas.
+    Retorna a lista de pares (submissao_id, servidor_id) a serem criados.
+    """
+    conflitos = conflitos or {}
+    carga = carga or {}
+    atuais = atuais or {}
+
+    heap = [(carga.get(avaliador, 0), avaliador) for avaliador in set(avaliadores)]
+    heapq.heapify(heap)
+
+    pares = []
+    for submissao in submissoes:
+        ja_atribuidos = atuais.get(submissao, ())
+        faltam = quantidade - len(ja_atribuidos)
+        if faltam <= 0:
+            continue
+
+        impedidos = conflitos.get(submissao, ())
+        escolhidos = []
+        descartados = []
+        while heap and len(escolhidos) < faltam:
+            item = heapq.heappop(heap)
+            if item[1] in impedidos or item[1] in ja_atribuidos:
+                descartados.append(item)
+            else:
+                escolhidos.append(item)
+
+        for item in descartados:
+            heapq.heappush(heap, item)
+        for total, avaliador in escolhidos:
+            heapq.heappush(heap, (total + 1, avaliador))
+            pares.append((submissao, avaliador))
+
+        if len(escolhidos) < faltam:
+            raise AvaliadoresInsuficientesError(
+                'Submissão {} precisa de {} avaliador(es), mas só há {} disponível(is)'.format(
+                    submissao, faltam, len(escolhidos)
+                )
+            )
+
+    return pares
+
+
+def distribuir_avaliadores(edital):
+    from example_app.models import Inscricao, Submissao
+
+    AvaliadoresSubmissao = Submissao.avaliadores.through
+    MembrosInscricao = Inscricao.membros.through
+
+    avaliadores = list(edital.avaliadores.values_list('id', flat=True))
+    submissoes = list(
+        Submissao.objects.filter(inscricao__edital=edital).order_by('id').values_list('id', 'inscricao_id')
+    )
+
+    conflitos = defaultdict(set)
+    por_inscricao = defaultdict(list)
+    for submissao_id, inscricao_id in submissoes:
+        por_inscricao[inscricao_id].append(submissao_id)
+    membros = MembrosInscricao.objects.filter(inscricao__edital=edital).values_list('inscricao_id', 'servidor_id')
+    for inscricao_id, servidor_id in membros:
+        for submissao_id in por_inscricao[inscricao_id]:
+            conflitos[submissao_id].add(servidor_id)
+
+    atuais = defaultdict(set)
+    existentes = AvaliadoresSubmissao.objects.filter(
+        submissao__inscricao__edital=edital
+    ).values_list('submissao_id', 'servidor_id')
+    for submissao_id, servidor_id in existentes:
+        atuais[submissao_id].add(servidor_id)
+
+    carga = dict(
+        AvaliadoresSubmissao.objects.filter(servidor_id__in=avaliadores).values('servidor_id').annotate(
+            total=Count('id')
+        ).values_list('servidor_id', 'total')
+    )
+
+    pares = distribuir(
+        [submissao_id for submissao_id, _ in submissoes],
+        avaliadores,
+        edital.quantidade_avaliadores,
+        conflitos=conflitos,
+        carga=carga,
+        atuais=atuais,
+    )
+
+    with transaction.atomic():
+        AvaliadoresSubmissao.objects.bulk_create(
+            [AvaliadoresSubmissao(submissao_id=s, servidor_id=a) for s, a in pares],
+            batch_size=1000
+        )
+    return len(pares)
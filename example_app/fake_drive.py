@@ -0,0 +1,199 @@
+"""
+In-memory stand-in for the parts of the Drive v3 and Docs v1 clients used
+by ``example_app.models``: ``files().copy/get/create/delete``,
+``permissions().create/update/delete/list`` and
+``documents().create/get/batchUpdate``.
+
+    drive = FakeDrive()
+    with drive.instalar():
+        inscricao.save()  # clones the PPC without touching the network
+    drive.calls['files.copy']
+"""
+import contextlib
+import copy
+import itertools
+from collections import Counter
+
+DONO = 'editais-ppc@example.com'
+
+
+class FakeDriveError(Exception):
+
+    def __init__(self, status, message):
+        super(FakeDriveError, self).__init__('{} {}'.format(status, message))
+        self.status = status
+
+
+class FakeRequest(object):
+
+    def __init__(self, drive, method, func):
+        self.drive = drive
+        self.method = method
+        self.func = func
+
+    def execute(self, http=None, num_retries=0):
+        self.drive.calls[self.method] += 1
+        return self.func()
+
+
+class FakeFiles(object):
+
+    def __init__(self, drive):
+        self.drive = drive
+
+    def create(self, body=None, fields=None, **kwargs):
+        return FakeRequest(self.drive, 'files.create', lambda: self.drive.criar_arquivo((body or {}).get('name', '')))
+
+    def copy(self, fileId, body=None, fields=None, **kwargs):
+        def copiar():
+            self.drive.arquivo(fileId)
+            return self.drive.criar_arquivo((body or {}).get('name', ''))
+        return FakeRequest(self.drive, 'files.copy', copiar)
+
+    def get(self, fileId, fields=None, **kwargs):
+        return FakeRequest(self.drive, 'files.get', lambda: copy.deepcopy(self.drive.arquivo(fileId)['metadata']))
+
+    def delete(self, fileId, **kwargs):
+        def remover():
+            self.drive.arquivo(fileId)
+            del self.drive.arquivos[fileId]
+        return FakeRequest(self.drive, 'files.delete', remover)
+
+    def export_media(self, fileId, mimeType, **kwargs):
+        def exportar():
+            self.drive.arquivo(fileId)
+            return '%PDF-1.4 {}'.format(fileId).encode('ascii')
+        return FakeRequest(self.drive, 'files.export', exportar)
+
+
+class FakePermissions(object):
+
+    def __init__(self, drive):
+        self.drive = drive
+
+    def create(self, fileId, body, fields=None, **kwargs):
+        def criar():
+            permissoes = self.drive.arquivo(fileId)['permissions']
+            permissao = {
+                'id': str(next(self.drive.ids)),
+                'type': body.get('type', 'user'),
+                'emailAddress': body['emailAddress'],
+                'role': body['role'],
+            }
+            permissoes.append(permissao)
+            return dict(permissao)
+        return FakeRequest(self.drive, 'permissions.create', criar)
+
+    def update(self, fileId, permissionId, body, fields=None, **kwargs):
+        def atualizar():
+            permissao = self.drive.permissao(fileId, permissionId)
+            permissao['role'] = body['role']
+            return dict(permissao)
+        return FakeRequest(self.drive, 'permissions.update', atualizar)
+
+    def delete(self, fileId, permissionId, **kwargs):
+        def remover():
+            permissao = self.drive.permissao(fileId, permissionId)
+            self.drive.arquivo(fileId)['permissions'].remove(permissao)
+        return FakeRequest(self.drive, 'permissions.delete', remover)
+
+    def list(self, fileId, fields=None, pageSize=None, pageToken=None, **kwargs):
+        def listar():
+            permissoes = self.drive.arquivo(fileId)['permissions']
+            inicio = int(pageToken or 0)
+            fim = inicio + min(pageSize or self.drive.page_size, self.drive.page_size)
+            resultado = {'permissions': [dict(permissao) for permissao in permissoes[inicio:fim]]}
+            if fim < len(permissoes):
+                resultado['nextPageToken'] = str(fim)
+            return resultado
+        return FakeRequest(self.drive, 'permissions.list', listar)
+
+
+class FakeDocuments(object):
+
+    def __init__(self, drive):
+        self.drive = drive
+
+    def create(self, body=None, **kwargs):
+        def criar():
+            return _documento(self.drive.criar_arquivo((body or {}).get('title', '')))
+        return FakeRequest(self.drive, 'documents.create', criar)
+
+    def get(self, documentId, **kwargs):
+        return FakeRequest(self.drive, 'documents.get', lambda: _documento(self.drive.arquivo(documentId)['metadata']))
+
+    def batchUpdate(self, documentId, body=None, **kwargs):
+        def atualizar():
+            self.drive.arquivo(documentId)
+            return {'documentId': documentId, 'replies': [{} for _ in (body or {}).get('requests', [])]}
+        return FakeRequest(self.drive, 'documents.batchUpdate', atualizar)
+
+
+def _documento(metadata):
+    return {'documentId': metadata['id'], 'title': metadata['name'], 'body': {'content': []}}
+
+
+class FakeGoogleCloud(object):
+    """Takes the place of ``GoogleCloudCredential`` on ``ArquivoGoogleDocs``."""
+
+    def __init__(self, drive):
+        self.service_drive = drive
+        self.service = drive
+
+
+class FakeDrive(object):
+
+    def __init__(self, page_size=100):
+        self.page_size = page_size
+        self.arquivos = {}
+        self.calls = Counter()
+        self.ids = itertools.count(1)
+
+    def files(self):
+        return FakeFiles(self)
+
+    def permissions(self):
+        return FakePermissions(self)
+
+    def documents(self):
+        return FakeDocuments(self)
+
+    def criar_arquivo(self, nome):
+        google_id = 'fake-{}'.format(next(self.ids))
+        self.arquivos[google_id] = {
+            'metadata': {'id': google_id, 'name': nome, 'mimeType': 'application/vnd.google-apps.document'},
+            'permissions': [{'id': 'owner', 'type': 'user', 'emailAddress': DONO, 'role': 'owner'}],
+        }
+        return dict(self.arquivos[google_id]['metadata'])
+
+    def arquivo(self, google_id):
+        try:
+            return self.arquivos[google_id]
+        except KeyError:
+            raise FakeDriveError(404, 'File not found: {}'.format(google_id))
+
+    def permissao(self, google_id, permission_id):
+        for permissao in self.arquivo(google_id)['permissions']:
+            if permissao['id'] == permission_id:
+                return permissao
+        raise FakeDriveError(404, 'Permission not found: {}'.format(permission_id))
+
+    def permissoes(self, google_id):
+        """Maps e-mail -> role for every permission on the file."""
+        return {p['emailAddress']: p['role'] for p in self.arquivo(google_id)['permissions']}
+
+    @contextlib.contextmanager
+    def instalar(self):
+        """
+        Makes every ``ArquivoGoogleDocs`` (and subclasses) use this fake
+        instead of the ``GoogleCloudCredential`` stored in the database.
+        """
+        from example_app.models import ArquivoGoogleDocs
+
+        original = ArquivoGoogleDocs.__dict__['google_cloud']
+        google_cloud = FakeGoogleCloud(self)
+        ArquivoGoogleDocs.google_cloud = property(lambda arquivo: google_cloud)
+        try:
+            yield self
+        finally:
+            ArquivoGoogleDocs.google_cloud = original
@@ -0,0 +1,322 @@
+"""
+Local HTTP stand-in for the Drive v3 and Docs v1 endpoints used by
+``example_app.models``, backed by a ``FakeDrive``.
+
+It serves the discovery documents, so ``googleapiclient.discovery.build``
+talks to it unchanged once ``settings.GOOGLE_API_ENDPOINT`` points here.
+Batch requests (``/batch/drive/v3``) and ``files.export`` are supported.
+Latency, quota errors and permission page size are configurable.
+
+    python -m example_app.fake_drive_server --port 8765 --latency 0.05
+
+    servidor = FakeDriveServer(latency=0.02, quota_every=50).start()
+    with override_settings(GOOGLE_API_ENDPOINT=servidor.url):
+        ...
+    servidor.http_requests, servidor.drive.calls
+    servidor.stop()
+"""
+import argparse
+import email.parser
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+from example_app.fake_drive import FakeDrive, FakeDriveError
+
+# resource -> method -> (http method, path, path params, query params, has body)
+DRIVE_METHODS = {
+    'files': {
+        'create': ('POST', 'files', [], ['fields'], True),
+        'get': ('GET', 'files/{fileId}', ['fileId'], ['fields'], False),
+        'copy': ('POST', 'files/{fileId}/copy', ['fileId'], ['fields'], True),
+        'delete': ('DELETE', 'files/{fileId}', ['fileId'], [], False),
+        'export': ('GET', 'files/{fileId}/export', ['fileId'], ['mimeType'], False),
+    },
+    'permissions': {
+        'create': ('POST', 'files/{fileId}/permissions', ['fileId'], ['fields', 'sendNotificationEmail'], True),
+        'update': ('PATCH', 'files/{fileId}/permissions/{permissionId}', ['fileId', 'permissionId'], ['fields'], True),
+        'delete': ('DELETE', 'files/{fileId}/permissions/{permissionId}', ['fileId', 'permissionId'], [], False),
+        'list': ('GET', 'files/{fileId}/permissions', ['fileId'], ['fields', 'pageSize', 'pageToken'], False),
+    },
+}
+
+DOCS_METHODS = {
+    'documents': {
+        'create': ('POST', 'v1/documents', [], [], True),
+        'get': ('GET', 'v1/documents/{documentId}', ['documentId'], [], False),
+        'batchUpdate': ('POST', 'v1/documents/{documentId}:batchUpdate', ['documentId'], [], True),
+    },
+}
+
+APIS = {
+    ('drive', 'v3'): ('drive/v3/', 'batch/drive/v3', DRIVE_METHODS),
+    ('docs', 'v1'): ('docs/', 'batch/docs/v1', DOCS_METHODS),
+}
+
+QUERY_TYPES = {'pageSize': 'integer', 'sendNotificationEmail': 'boolean'}
+
+
+def discovery_document(api, version, root_url):
+    service_path, batch_path, resources = APIS[(api, version)]
+    descricao = {
+        'kind': 'discovery#restDescription',
+        'discoveryVersion': 'v1',
+        'id': '{}:{}'.format(api, version),
+        'name': api,
+        'version': version,
+        'rootUrl': root_url,
+        'servicePath': service_path,
+        'baseUrl': root_url + service_path,
+        'batchPath': batch_path,
+        'protocol': 'rest',
+        'parameters': {
+            'alt': {'type': 'string', 'location': 'query', 'default': 'json'},
+            'fields': {'type': 'string', 'location': 'query'},
+        },
+        'schemas': {'Object': {'id': 'Object', 'type': 'object', 'additionalProperties': {'type': 'any'}}},
+        'resources': {},
+    }
+    for resource, methods in resources.items():
+        descricao['resources'][resource] = {'methods': {}}
+        for name, (http_method, path, path_params, query_params, has_body) in methods.items():
+            parameters = {param: {'type': 'string', 'required': True, 'location': 'path'} for param in path_params}
+            for param in query_params:
+                parameters[param] = {'type': QUERY_TYPES.get(param, 'string'), 'location': 'query'}
+            method = {
+                'id': '{}.{}.{}'.format(api, resource, name),
+                'path': path,
+                'httpMethod': http_method,
+                'parameters': parameters,
+                'parameterOrder': list(path_params),
+            }
+            if has_body:
+                method['request'] = {'$ref': 'Object'}
+            if http_method != 'DELETE':
+                method['response'] = {'$ref': 'Object'}
+            if name == 'export':
+                method['supportsMediaDownload'] = True
+                del method['response']
+            descricao['resources'][resource]['methods'][name] = method
+    return descricao
+
+
+def _pattern(path):
+    partes = re.split(r'\{(\w+)\}', path)
+    regex = ''.join(
+        re.escape(parte) if i % 2 == 0 else '(?P<{}>[^/:]+)'.format(parte) for i, parte in enumerate(partes)
+    )
+    return re.compile('^/{}$'.format(regex))
+
+
+def _routes():
+    rotas = []
+    for service_path, _, resources in APIS.values():
+        for resource, methods in resources.items():
+            for name, (http_method, path, _, _, _) in methods.items():
+                rotas.append((http_method, _pattern(service_path + path), '{}.{}'.format(resource, name)))
+    return rotas
+
+
+ROUTES = _routes()
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class FakeDriveServer(object):
+
+    def __init__(self, drive=None, host='127.0.0.1', port=0, latency=0.0, quota_every=None):
+        self.drive = drive or FakeDrive()
+        self.latency = latency
+        self.quota_every = quota_every
+        self.http_requests = Counter()
+        self.lock = threading.Lock()
+        self._chamadas = 0
+        self.httpd = _ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.fake = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.drive.calls.clear()
+            self.http_requests.clear()
+            self._chamadas = 0
+
+    def call(self, http_method, url, body):
+        """
+        Runs one API call and returns ``(status, content_type, payload)``.
+        """
+        parts = urlsplit(url)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        for method, pattern, operation in ROUTES:
+            match = pattern.match(parts.path)
+            if method == http_method and match:
+                break
+        else:
+            return 404, 'application/json', _error(404, 'notFound', 'No route for {} {}'.format(http_method, parts.path))
+
+        try:
+            with self.lock:
+                self._chamadas += 1
+                if self.quota_every and self._chamadas % self.quota_every == 0:
+                    raise QuotaExceeded()
+                result = self.execute(operation, match.groupdict(), query, json.loads(body or b'{}'))
+        except QuotaExceeded:
+            return 403, 'application/json', _error(403, 'userRateLimitExceeded', 'User Rate Limit Exceeded')
+        except FakeDriveError as e:
+            return e.status, 'application/json', _error(e.status, 'notFound', str(e))
+
+        if result is None:
+            return 204, 'application/json', b''
+        if isinstance(result, bytes):
+            return 200, 'application/pdf', result
+        return 200, 'application/json', json.dumps(result).encode('utf-8')
+
+    def execute(self, operation, path, query, body):
+        drive = self.drive
+        if operation == 'files.create':
+            return drive.files().create(body=body).execute()
+        if operation == 'files.get':
+            return drive.files().get(fileId=path['fileId']).execute()
+        if operation == 'files.copy':
+            return drive.files().copy(fileId=path['fileId'], body=body).execute()
+        if operation == 'files.delete':
+            return drive.files().delete(fileId=path['fileId']).execute()
+        if operation == 'files.export':
+            return drive.files().export_media(fileId=path['fileId'], mimeType=query.get('mimeType')).execute()
+        if operation == 'permissions.create':
+            return drive.permissions().create(fileId=path['fileId'], body=body).execute()
+        if operation == 'permissions.update':
+            return drive.permissions().update(fileId=path['fileId'], permissionId=path['permissionId'], body=body).execute()
+        if operation == 'permissions.delete':
+            return drive.permissions().delete(fileId=path['fileId'], permissionId=path['permissionId']).execute()
+        if operation == 'permissions.list':
+            page_size = int(query['pageSize']) if query.get('pageSize') else None
+            return drive.permissions().list(
+                fileId=path['fileId'], pageSize=page_size, pageToken=query.get('pageToken')
+            ).execute()
+        if operation == 'documents.create':
+            return drive.documents().create(body=body).execute()
+        if operation == 'documents.get':
+            return drive.documents().get(documentId=path['documentId']).execute()
+        if operation == 'documents.batchUpdate':
+            return drive.documents().batchUpdate(documentId=path['documentId'], body=body).execute()
+        raise FakeDriveError(404, operation)
+
+    def batch(self, content_type, body):
+        mensagem = email.parser.BytesParser().parsebytes(
+            b'Content-Type: ' + content_type.encode('ascii') + b'\r\n\r\n' + body
+        )
+        boundary = 'batch_' + uuid.uuid4().hex
+        respostas = []
+        for parte in mensagem.get_payload():
+            requisicao = parte.get_payload(decode=True) or parte.get_payload().encode('utf-8')
+            cabecalho, _, conteudo = requisicao.replace(b'\r\n', b'\n').partition(b'\n\n')
+            linha = cabecalho.split(b'\n')[0].decode('utf-8')
+            http_method, url = linha.split(' ')[:2]
+            status, tipo, payload = self.call(http_method, url, conteudo.strip())
+            respostas.append(
+                '--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{id}>\r\n\r\n'
+                'HTTP/1.1 {status} {reason}\r\nContent-Type: {tipo}\r\nContent-Length: {length}\r\n\r\n'.format(
+                    boundary=boundary, id=parte['Content-ID'].strip('<>'), status=status,
+                    reason=BaseHTTPRequestHandler.responses.get(status, ('',))[0], tipo=tipo, length=len(payload),
+                ).encode('utf-8') + payload + b'\r\n'
+            )
+        respostas.append('--{}--\r\n'.format(boundary).encode('ascii'))
+        return 'multipart/mixed; boundary={}'.format(boundary), b''.join(respostas)
+
+
+def _error(code, reason, message):
+    return json.dumps({'error': {
+        'code': code,
+        'message': message,
+        'errors': [{'domain': 'usageLimits' if code == 403 else 'global', 'reason': reason, 'message': message}],
+    }}).encode('utf-8')
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_any(self):
+        fake = self.server.fake
+        if fake.latency:
+            time.sleep(fake.latency)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        path = urlsplit(self.path).path
+
+        discovery = re.match(r'^/discovery/v1/apis/(\w+)/(\w+)/rest$', path)
+        if discovery and (discovery.group(1), discovery.group(2)) in APIS:
+            fake.http_requests['discovery'] += 1
+            root = 'http://{}/'.format(self.headers.get('Host'))
+            payload = json.dumps(discovery_document(discovery.group(1), discovery.group(2), root)).encode('utf-8')
+            return self.reply(200, 'application/json', payload)
+
+        if path.startswith('/batch/'):
+            fake.http_requests['batch'] += 1
+            content_type, payload = fake.batch(self.headers.get('Content-Type'), body)
+            return self.reply(200, content_type, payload)
+
+        fake.http_requests['api'] += 1
+        status, content_type, payload = fake.call(self.command, self.path, body)
+        self.reply(status, content_type, payload)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = handle_any
+
+    def reply(self, status, content_type, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every HTTP request')
+    parser.add_argument('--quota-every', type=int, help='Fail every Nth API call with 403 userRateLimitExceeded')
+    parser.add_argument('--page-size', type=int, default=100, help='Max permissions per permissions.list page')
+    args = parser.parse_args()
+
+    servidor = FakeDriveServer(
+        FakeDrive(page_size=args.page_size), args.host, args.port, args.latency, args.quota_every
+    )
+    print('Fake Google APIs em {} (GOOGLE_API_ENDPOINT)'.format(servidor.url))
+    try:
+        servidor.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
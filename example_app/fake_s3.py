@@ -0,0 +1,153 @@
+"""
+In-memory stand-in for the S3 multipart API as MinIO implements it, with the
+same method and argument names as a boto3 S3 client.
+
+    client = FakeS3Client(latency=0.01, bandwidth=50 * 2 ** 20)
+    uploads.set_client(client)
+
+``latency`` is added to every call and ``bandwidth`` (bytes/s) throttles
+uploads, so parallel part uploads behave like they would over a network.
+Parts other than the last must be at least ``min_part_size`` (5 MiB, as on
+S3 and MinIO). With ``keep_data=False`` only sizes and ETags are kept, so
+benchmarks don't measure the fake's own memory.
+"""
+import hashlib
+import io
+import itertools
+import threading
+import time
+from collections import Counter
+
+MIN_PART_SIZE = 5 * 2 ** 20
+
+
+class FakeS3Error(Exception):
+    """Same shape as ``botocore.exceptions.ClientError``."""
+
+    def __init__(self, code, message=''):
+        super(FakeS3Error, self).__init__('{}: {}'.format(code, message))
+        self.response = {'Error': {'Code': code, 'Message': message}}
+
+
+class FakeS3Client(object):
+
+    def __init__(self, latency=0.0, bandwidth=None, min_part_size=MIN_PART_SIZE, keep_data=True):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.min_part_size = min_part_size
+        self.keep_data = keep_data
+        self.objects = {}
+        self.uploads = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def _call(self, method, size=0):
+        with self.lock:
+            self.calls[method] += 1
+        atraso = self.latency + (size / self.bandwidth if self.bandwidth else 0)
+        if atraso:
+            time.sleep(atraso)
+
+    def _upload(self, Bucket, Key, UploadId):
+        upload = self.uploads.get(UploadId)
+        if upload is None or upload['key'] != (Bucket, Key):
+            raise FakeS3Error('NoSuchUpload', UploadId)
+        return upload
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._call('create_multipart_upload')
+        with self.lock:
+            upload_id = 'upload-{}'.format(next(self.ids))
+            self.uploads[upload_id] = {'key': (Bucket, Key), 'parts': {}, 'content_type': kwargs.get('ContentType')}
+        return {'Bucket': Bucket, 'Key': Key, 'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        data = Body if isinstance(Body, bytes) else Body.read()
+        self._call('upload_part', len(data))
+        if not 1 <= PartNumber <= 10000:
+            raise FakeS3Error('InvalidArgument', 'PartNumber {}'.format(PartNumber))
+        etag = '"{}"'.format(hashlib.md5(data).hexdigest())
+        with self.lock:
+            self._upload(Bucket, Key, UploadId)['parts'][PartNumber] = (etag, self._keep(data))
+        return {'ETag': etag}
+
+    def _keep(self, data):
+        return data if self.keep_data else len(data)
+
+    def list_parts(self, Bucket, Key, UploadId, MaxParts=1000, PartNumberMarker=0, **kwargs):
+        self._call('list_parts')
+        with self.lock:
+            parts = sorted(self._upload(Bucket, Key, UploadId)['parts'].items())
+        parts = [(number, part) for number, part in parts if number > PartNumberMarker]
+        page = parts[:MaxParts]
+        response = {
+            'Parts': [{'PartNumber': number, 'ETag': etag, 'Size': _size(data)} for number, (etag, data) in page],
+            'IsTruncated': len(parts) > MaxParts,
+        }
+        if response['IsTruncated']:
+            response['NextPartNumberMarker'] = page[-1][0]
+        return response
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._call('complete_multipart_upload')
+        with self.lock:
+            upload = self._upload(Bucket, Key, UploadId)
+            pedidas = MultipartUpload['Parts']
+            if [part['PartNumber'] for part in pedidas] != sorted(part['PartNumber'] for part in pedidas):
+                raise FakeS3Error('InvalidPartOrder')
+            dados = []
+            for i, part in enumerate(pedidas):
+                etag, data = upload['parts'].get(part['PartNumber'], (None, None))
+                if etag is None or etag != part['ETag']:
+                    raise FakeS3Error('InvalidPart', str(part['PartNumber']))
+                if i < len(pedidas) - 1 and _size(data) < self.min_part_size:
+                    raise FakeS3Error('EntityTooSmall', str(part['PartNumber']))
+                dados.append(data)
+            self.objects[(Bucket, Key)] = b''.join(dados) if self.keep_data else sum(dados)
+            del self.uploads[UploadId]
+        return {'Bucket': Bucket, 'Key': Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._call('abort_multipart_upload')
+        with self.lock:
+            self._upload(Bucket, Key, UploadId)
+            del self.uploads[UploadId]
+        return {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        # Like botocore, file bodies are streamed rather than read at once.
+        chunks = [Body] if isinstance(Body, bytes) else iter(lambda: Body.read(2 ** 20), b'')
+        md5, data, size = hashlib.md5(), [], 0
+        for chunk in chunks:
+            md5.update(chunk)
+            size += len(chunk)
+            if self.keep_data:
+                data.append(chunk)
+        self._call('put_object', size)
+        with self.lock:
+            self.objects[(Bucket, Key)] = b''.join(data) if self.keep_data else size
+        return {'ETag': '"{}"'.format(md5.hexdigest())}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._call('delete_object')
+        with self.lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call('head_object')
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error('404', Key)
+        return {'ContentLength': _size(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._call('get_object')
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error('NoSuchKey', Key)
+        data = self.objects[(Bucket, Key)]
+        return {'ContentLength': _size(data), 'Body': io.BytesIO(data if self.keep_data else b'')}
+
+
+def _size(data):
+    return data if isinstance(data, int) else len(data)
@@ -0,0 +1,217 @@
+"""
+Medição das chamadas às APIs do Google (Drive e Docs).
+
+``GoogleCloudCredential.build_service`` monta os clientes com
+``requestBuilder=requisicao_classe()`` e um ``HttpContador`` em volta do
+transporte autenticado. Cada ``execute()`` e cada ``next_chunk()`` de
+``download_classe()`` (que não passa por ``execute()``) registra:
+
+- ``google_api_requests_total{method,status,origin}``;
+- ``google_api_request_duration_seconds{method,origin}`` (inclui retries);
+- ``google_api_retries_total{method,origin}``: tentativas HTTP além da primeira;
+- ``google_api_quota_errors_total{method}``: 429 e 403 de rate limit/cota.
+
+``origin`` é o método de model (``Inscricao.save``,
+``Submissao.periodo_analise_perms``) ou receiver (``set_perms_for_membros``)
+mais externo de ``example_app.models`` na pilha; sem nenhum, a função mais
+externa de ``example_app``.
+
+``OrcamentoGoogleMiddleware`` conta as chamadas de cada requisição web e
+registra ``google_api_calls_per_request{view}``; acima de
+``GOOGLE_API_CALL_BUDGET`` chamadas, loga um aviso ou, com
+``GOOGLE_API_CALL_BUDGET_STRICT``, levanta ``OrcamentoExcedido``.
+"""
+import contextlib
+import functools
+import logging
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+from django_graphql_movies import metrics
+
+logger = logging.getLogger(__name__)
+
+MODULO_MODELS = 'example_app.models'
+PACOTE = 'example_app.'
+IGNORADOS = ('example_app.instrumentacao',)
+
+requisicoes = metrics.counter(
+    'google_api_requests_total', 'Chamadas às APIs do Google', ['method', 'status', 'origin']
+)
+duracao = metrics.histogram(
+    'google_api_request_duration_seconds', 'Duração das chamadas às APIs do Google', ['method', 'origin']
+)
+retries = metrics.counter(
+    'google_api_retries_total', 'Tentativas HTTP além da primeira', ['method', 'origin']
+)
+erros_cota = metrics.counter(
+    'google_api_quota_errors_total', 'Respostas de limite de taxa ou de cota', ['method']
+)
+chamadas_por_requisicao = metrics.histogram(
+    'google_api_calls_per_request', 'Chamadas às APIs do Google por requisição web', ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+orcamentos_excedidos = metrics.counter(
+    'google_api_budget_exceeded_total', 'Requisições web acima do orçamento de chamadas', ['view']
+)
+
+_estado = threading.local()
+
+
+class OrcamentoExcedido(Exception):
+    pass
+
+
+def origem_da_chamada(frame=None):
+    frame = frame or sys._getframe(1)
+    model = externa = None
+    while frame is not None:
+        modulo = frame.f_globals.get('__name__', '')
+        if modulo.startswith(PACOTE) and modulo not in IGNORADOS:
+            externa = frame
+            if modulo == MODULO_MODELS:
+                model = frame
+        frame = frame.f_back
+    frame = model or externa
+    if frame is None:
+        return 'desconhecida'
+    dono = frame.f_locals.get('self', frame.f_locals.get('cls'))
+    if dono is None:
+        return frame.f_code.co_name
+    classe = dono if isinstance(dono, type) else type(dono)
+    return '{}.{}'.format(classe.__name__, frame.f_code.co_name)
+
+
+def e_erro_de_cota(status, conteudo):
+    if status == 429:
+        return True
+    conteudo = (conteudo or b'').lower()
+    return status == 403 and (b'ratelimitexceeded' in conteudo or b'quotaexceeded' in conteudo)
+
+
+class HttpContador(object):
+    """Conta as tentativas HTTP feitas por ``execute()`` na thread atual."""
+
+    def __init__(self, http):
+        self.http = http
+
+    def request(self, *args, **kwargs):
+        _estado.tentativas = getattr(_estado, 'tentativas', 0) + 1
+        resposta, conteudo = self.http.request(*args, **kwargs)
+        _estado.status = resposta.status
+        return resposta, conteudo
+
+    def __getattr__(self, nome):
+        return getattr(self.http, nome)
+
+
+def http_instrumentado(credentials):
+    import google_auth_httplib2
+    from googleapiclient.http import build_http
+
+    return HttpContador(google_auth_httplib2.AuthorizedHttp(credentials, http=build_http()))
+
+
+def nome_do_metodo(requisicao):
+    return getattr(requisicao, 'methodId', None) or '{} {}'.format(requisicao.method, urlparse(requisicao.uri).path)
+
+
+@contextlib.contextmanager
+def medir(metodo):
+    """Registra como uma chamada as tentativas HTTP feitas dentro do bloco."""
+    from googleapiclient.errors import HttpError
+
+    origem = origem_da_chamada()
+    contar_no_orcamento(metodo, origem)
+    _estado.tentativas = 0
+    _estado.status = None
+    status = 'error'
+    inicio = time.perf_counter()
+    try:
+        yield
+        status = str(_estado.status or 200)
+    except HttpError as e:
+        status = str(e.resp.status)
+        if e_erro_de_cota(e.resp.status, e.content):
+            erros_cota.inc(method=metodo)
+        raise
+    finally:
+        registrar(metodo, status, origem, time.perf_counter() - inicio, _estado.tentativas)
+
+
+@functools.lru_cache(maxsize=None)
+def requisicao_classe():
+    from googleapiclient.http import HttpRequest
+
+    class RequisicaoInstrumentada(HttpRequest):
+
+        def execute(self, http=None, num_retries=0):
+            with medir(nome_do_metodo(self)):
+                return super(RequisicaoInstrumentada, self).execute(http=http, num_retries=num_retries)
+
+    return RequisicaoInstrumentada
+
+
+@functools.lru_cache(maxsize=None)
+def download_classe():
+    from googleapiclient.http import MediaIoBaseDownload
+
+    class DownloadInstrumentado(MediaIoBaseDownload):
+
+        def next_chunk(self, num_retries=0):
+            with medir(nome_do_metodo(self._request)):
+                return super(DownloadInstrumentado, self).next_chunk(num_retries=num_retries)
+
+    return DownloadInstrumentado
+
+
+def registrar(metodo, status, origem, segundos, tentativas):
+    requisicoes.inc(method=metodo, status=status, origin=origem)
+    duracao.observe(segundos, method=metodo, origin=origem)
+    if tentativas > 1:
+        retries.inc(tentativas - 1, method=metodo, origin=origem)
+    logger.debug('%s %s %.3fs origem=%s tentativas=%s', metodo, status, segundos, origem, tentativas)
+
+
+def iniciar_orcamento(limite=None, estrito=False):
+    _estado.orcamento = {'limite': limite, 'estrito': estrito, 'chamadas': 0, 'view': '', 'excedido': False}
+
+
+def nomear_orcamento(view):
+    orcamento = getattr(_estado, 'orcamento', None)
+    if orcamento is not None:
+        orcamento['view'] = view
+
+
+def encerrar_orcamento():
+    """Encerra o orçamento da thread e devolve quantas chamadas foram feitas."""
+    orcamento = getattr(_estado, 'orcamento', None)
+    _estado.orcamento = None
+    if orcamento is None:
+        return 0
+    chamadas_por_requisicao.observe(orcamento['chamadas'], view=orcamento['view'])
+    return orcamento['chamadas']
+
+
+def contar_no_orcamento(metodo, origem):
+    orcamento = getattr(_estado, 'orcamento', None)
+    if orcamento is None:
+        return
+    orcamento['chamadas'] += 1
+    limite = orcamento['limite']
+    if limite is None or orcamento['chamadas'] <= limite:
+        return
+    view = orcamento['view'] or 'sem view'
+    if not orcamento['excedido']:
+        orcamento['excedido'] = True
+        orcamentos_excedidos.inc(view=orcamento['view'])
+        if not orcamento['estrito']:
+            logger.warning(
+                'Requisição %s passou de %s chamadas às APIs do Google (%s em %s)', view, limite, metodo, origem
+            )
+    if orcamento['estrito']:
+        raise OrcamentoExcedido('Requisição {} passou de {} chamadas às APIs do Google ({} em {})'.format(
+            view, limite, metodo, origem
+        ))
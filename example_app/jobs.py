@@ -0,0 +1,260 @@
+"""
+Fila de tarefas em segundo plano guardada no próprio banco (``Job``).
+
+    @job(max_tentativas=5, backoff=30, concorrencia=2)
+    def criar_documento(modelo_ppc_id):
+        ...
+
+    criar_documento.delay(modelo.id)
+    criar_documento.apply_async(args=[modelo.id], countdown=60, prioridade=10, chave='criar:1')
+
+O job é gravado na mesma transação de quem o enfileira, então só fica
+visível para os workers se ela for confirmada. Os workers
+(``manage.py processar_jobs``) reservam jobs com ``SELECT ... FOR UPDATE
+SKIP LOCKED`` quando o banco suporta e, no SQLite, com um UPDATE atômico
+condicionado ao status. Falhas são repetidas com backoff exponencial até
+``max_tentativas``, a menos que já exista um job mais novo com a mesma
+chave: esse substitui o antigo, que é marcado como falho.
+"""
+import datetime
+import json
+import logging
+import os
+import socket
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def autodiscover():
+    """Importa o módulo ``tasks`` de cada app para registrar os jobs."""
+    autodiscover_modules('tasks')
+
+
+def worker_id():
+    return '{}:{}'.format(socket.gethostname(), os.getpid())
+
+
+class JobFunction(object):
+
+    def __init__(self, func, nome, max_tentativas, backoff, prioridade, concorrencia):
+        self.func = func
+        self.nome = nome
+        self.max_tentativas = max_tentativas
+        self.backoff = backoff
+        self.prioridade = prioridade
+        self.concorrencia = concorrencia
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, countdown=None, eta=None, prioridade=None, chave=None):
+        """
+        Enfileira o job e devolve o ``Job`` criado. Se houver um job pendente
+        com a mesma ``chave``, devolve esse em vez de criar outro.
+        """
+        from example_app.models import Job
+
+        if getattr(settings, 'JOBS_ALWAYS_EAGER', False):
+            self.func(*args, **(kwargs or {}))
+            return None
+
+        if eta is None:
+            eta = timezone.now() + datetime.timedelta(seconds=countdown or 0)
+        novo = Job(
+            nome=self.nome,
+            argumentos=json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+            chave=chave,
+            prioridade=self.prioridade if prioridade is None else prioridade,
+            max_tentativas=self.max_tentativas,
+            executar_em=eta,
+        )
+        if chave is None:
+            novo.save()
+            return novo
+
+        try:
+            with transaction.atomic(using=router.db_for_write(Job)):
+                novo.save()
+            return novo
+        except IntegrityError:
+            existente = Job.objects.filter(chave=chave, status=Job.PENDENTE).first()
+            if existente is None:
+                raise
+            return existente
+
+
+def job(nome=None, max_tentativas=3, backoff=30, prioridade=0, concorrencia=None):
+    """
+    Registra a função como job. ``backoff`` é o atraso em segundos antes da
+    primeira nova tentativa (dobra a cada falha); ``concorrencia`` limita
+    quantos jobs deste tipo executam ao mesmo tempo em todos os workers.
+    """
+    def decorator(func):
+        job_function = JobFunction(
+            func, nome or '{}.{}'.format(func.__module__, func.__name__),
+            max_tentativas, backoff, prioridade, concorrencia
+        )
+        registry[job_function.nome] = job_function
+        return job_function
+    return decorator
+
+
+def _substituidos(queryset):
+    """
+    Jobs de ``queryset`` que não devem voltar à fila porque outro job com a
+    mesma chave é mais novo ou já está pendente.
+    """
+    from example_app.models import Job
+
+    outros = Job.objects.filter(chave=OuterRef('chave')).exclude(id=OuterRef('id')).filter(
+        Q(id__gt=OuterRef('id')) | Q(status=Job.PENDENTE)
+    )
+    return queryset.filter(chave__isnull=False).annotate(substituido=Exists(outros)).filter(substituido=True)
+
+
+def liberar_travados(timeout=None):
+    """
+    Devolve à fila jobs reservados por workers que morreram no meio da
+    execução (reservados há mais de ``JOBS_LOCK_TIMEOUT`` segundos). Os que
+    já foram substituídos por outro job com a mesma chave são marcados como
+    falhos.
+    """
+    from example_app.models import Job
+
+    timeout = timeout or getattr(settings, 'JOBS_LOCK_TIMEOUT', 600)
+    agora = timezone.now()
+    travados = Job.objects.filter(status=Job.EXECUTANDO, reservado_em__lt=agora - datetime.timedelta(seconds=timeout))
+    substituidos = list(_substituidos(travados).values_list('id', flat=True))
+    if substituidos:
+        Job.objects.filter(id__in=substituidos).update(
+            status=Job.FALHOU, concluido_em=agora, reservado_por='', reservado_em=None,
+            ultimo_erro='Worker interrompido; substituído por um job mais novo com a mesma chave'
+        )
+    return travados.update(status=Job.PENDENTE, reservado_por='', reservado_em=None)
+
+
+def _bloqueados(nomes=None):
+    """Tipos de job que já atingiram o limite de concorrência."""
+    from example_app.models import Job
+
+    limitados = {nome: f.concorrencia for nome, f in registry.items() if f.concorrencia}
+    if nomes is not None:
+        limitados = {nome: limite for nome, limite in limitados.items() if nome in nomes}
+    if not limitados:
+        return set()
+    executando = dict(
+        Job.objects.filter(status=Job.EXECUTANDO, nome__in=limitados).order_by()
+        .values_list('nome').annotate(total=Count('id')).values_list('nome', 'total')
+    )
+    return {nome for nome, limite in limitados.items() if executando.get(nome, 0) >= limite}
+
+
+def reservar(worker=None, nomes=None):
+    """
+    Reserva o próximo job disponível (maior prioridade, mais antigo) e o
+    devolve já marcado como em execução, ou ``None`` se a fila estiver vazia.
+
+    O limite de concorrência é verificado antes da reserva; dois workers
+    podem ultrapassá-lo por um job numa corrida, nunca mais que isso.
+    """
+    from example_app.models import Job
+
+    worker = worker or worker_id()
+    agora = timezone.now()
+    fila = Job.objects.filter(status=Job.PENDENTE, executar_em__lte=agora)
+    if nomes is not None:
+        fila = fila.filter(nome__in=nomes)
+    bloqueados = _bloqueados(nomes)
+    if bloqueados:
+        fila = fila.exclude(nome__in=bloqueados)
+    fila = fila.order_by('-prioridade', 'executar_em', 'id')
+
+    alias = router.db_for_write(Job)
+    if connections[alias].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=alias):
+            reservado = fila.select_for_update(skip_locked=True).using(alias).first()
+            if reservado is None:
+                return None
+            reservado.status = Job.EXECUTANDO
+            reservado.reservado_por = worker
+            reservado.reservado_em = agora
+            reservado.tentativas += 1
+            reservado.save(update_fields=['status', 'reservado_por', 'reservado_em', 'tentativas'])
+            return reservado
+
+    for candidato in fila.using(alias).values_list('id', flat=True)[:10]:
+        atualizados = Job.objects.using(alias).filter(id=candidato, status=Job.PENDENTE).update(
+            status=Job.EXECUTANDO, reservado_por=worker, reservado_em=agora, tentativas=F('tentativas') + 1
+        )
+        if atualizados:
+            return Job.objects.using(alias).get(id=candidato)
+    return None
+
+
+def executar(job):
+    """Executa um job reservado e registra o resultado."""
+    from example_app.models import Job
+
+    funcao = registry.get(job.nome)
+    try:
+        if funcao is None:
+            raise LookupError('Job não registrado: {}'.format(job.nome))
+        argumentos = json.loads(job.argumentos)
+        funcao.func(*argumentos.get('args', []), **argumentos.get('kwargs', {}))
+    except Exception:
+        job.ultimo_erro = traceback.format_exc()
+        logger.exception('Job %s falhou (tentativa %s de %s)', job, job.tentativas, job.max_tentativas)
+        if (funcao is not None and job.tentativas < job.max_tentativas
+                and not _substituidos(Job.objects.filter(id=job.id)).exists()):
+            atraso = funcao.backoff * 2 ** (job.tentativas - 1)
+            job.status = Job.PENDENTE
+            job.executar_em = timezone.now() + datetime.timedelta(seconds=atraso)
+        else:
+            job.status = Job.FALHOU
+            job.concluido_em = timezone.now()
+    else:
+        job.status = Job.CONCLUIDO
+        job.concluido_em = timezone.now()
+        job.ultimo_erro = ''
+
+    job.reservado_por = ''
+    job.reservado_em = None
+    try:
+        with transaction.atomic(using=job._state.db):
+            job.save(update_fields=[
+                'status', 'executar_em', 'concluido_em', 'ultimo_erro', 'reservado_por', 'reservado_em'
+            ])
+    except IntegrityError:
+        # Já existe outro job pendente com a mesma chave; este é descartado.
+        Job.objects.filter(id=job.id).update(
+            status=Job.CONCLUIDO, concluido_em=timezone.now(), reservado_por='', reservado_em=None
+        )
+    return job
+
+
+def processar(worker=None, nomes=None, limite=None):
+    """
+    Executa jobs até a fila esvaziar (ou ``limite`` jobs) e devolve quantos
+    foram executados.
+    """
+    total = 0
+    while limite is None or total < limite:
+        reservado = reservar(worker, nomes)
+        if reservado is None:
+            break
+        executar(reservado)
+        total += 1
+    return total
@@ -0,0 +1,17 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from example_app import agendamento
+from example_app.models import Edital
+
+
+class Command(BaseCommand):
+    help = 'Refaz a agenda de transições de fase dos editais que ainda não terminaram.'
+
+    def handle(self, **options):
+        total = 0
+        for edital in Edital.objects.filter(fim_ajuste__gte=datetime.date.today() - datetime.timedelta(days=1)):
+            agendamento.agendar(edital)
+            total += 1
+        self.stdout.write('{} edital(is) agendado(s)'.format(total))
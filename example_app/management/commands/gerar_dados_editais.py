@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from example_app import sinteticos
+
+
+class Command(BaseCommand):
+    help = 'Gera editais, inscrições, submissões e avaliações sintéticas em volume de produção.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--editais', type=int, default=1000)
+        parser.add_argument('--inscricoes-por-edital', type=int, default=20)
+        parser.add_argument('--membros-por-inscricao', type=int, default=3)
+        parser.add_argument('--servidores', type=int, default=500)
+        parser.add_argument('--avaliadores-por-edital', type=int, default=30)
+        parser.add_argument('--quantidade-avaliadores', type=int, default=2, help='Avaliadores por submissão')
+        parser.add_argument('--taxa-submissao', type=float, default=0.8)
+        parser.add_argument('--taxa-avaliacao', type=float, default=0.7)
+        parser.add_argument('--solicitacoes-por-avaliacao', type=int, default=3)
+        parser.add_argument('--portarias', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, **options):
+        inicio = time.perf_counter()
+        totais = sinteticos.gerar(
+            editais=options['editais'],
+            inscricoes_por_edital=options['inscricoes_por_edital'],
+            membros_por_inscricao=options['membros_por_inscricao'],
+            servidores=options['servidores'],
+            avaliadores_por_edital=options['avaliadores_por_edital'],
+            quantidade_avaliadores=options['quantidade_avaliadores'],
+            taxa_submissao=options['taxa_submissao'],
+            taxa_avaliacao=options['taxa_avaliacao'],
+            solicitacoes_por_avaliacao=options['solicitacoes_por_avaliacao'],
+            portarias=options['portarias'],
+            seed=options['seed'],
+        )
+        for nome, total in totais.items():
+            self.stdout.write('{:14} {:>8}'.format(nome, total))
+        self.stdout.write(self.style.SUCCESS('Concluído em {:.1f}s'.format(time.perf_counter() - inicio)))
@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from example_app import uploads
+from example_app.models import UploadMultipart
+
+
+class Command(BaseCommand):
+    help = 'Aborta uploads retomáveis abandonados, liberando as partes guardadas no bucket.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=24, help='Idade mínima dos uploads abertos')
+
+    def handle(self, horas, **options):
+        limite = timezone.now() - datetime.timedelta(hours=horas)
+        total = 0
+        for upload in UploadMultipart.objects.filter(status=UploadMultipart.ABERTO, criado_em__lt=limite):
+            uploads.abortar(upload)
+            total += 1
+        self.stdout.write('{} upload(s) abortado(s)'.format(total))
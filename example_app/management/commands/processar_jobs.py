@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from example_app import jobs
+
+
+class Command(BaseCommand):
+    help = 'Executa os jobs enfileirados em example_app.jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nome', action='append', dest='nomes', help='Só executa jobs com este nome')
+        parser.add_argument('--once', action='store_true', help='Sai quando a fila estiver vazia')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Espera entre consultas à fila vazia')
+
+    def handle(self, nomes, once, sleep, **options):
+        jobs.autodiscover()
+        worker = jobs.worker_id()
+        self.stdout.write('Worker {} iniciado'.format(worker))
+        while True:
+            jobs.liberar_travados()
+            total = jobs.processar(worker, nomes)
+            if total:
+                self.stdout.write('{} job(s) executado(s)'.format(total))
+            if once:
+                break
+            if not total:
+                time.sleep(sleep)
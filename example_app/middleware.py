@@ -0,0 +1,27 @@
+from django.conf import settings
+
+from example_app import instrumentacao
+
+
+class OrcamentoGoogleMiddleware(object):
+    """
+    Limita as chamadas às APIs do Google feitas durante uma requisição web
+    (``GOOGLE_API_CALL_BUDGET``); veja ``example_app.instrumentacao``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        instrumentacao.iniciar_orcamento(
+            getattr(settings, 'GOOGLE_API_CALL_BUDGET', None),
+            getattr(settings, 'GOOGLE_API_CALL_BUDGET_STRICT', False),
+        )
+        try:
+            return self.get_response(request)
+        finally:
+            instrumentacao.encerrar_orcamento()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        instrumentacao.nomear_orcamento(match.view_name if match else request.path_info)
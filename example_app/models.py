@@ -1,29 +1,48 @@
 import datetime
 import io
 import json
+import uuid
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import signals
+from django.db.models import Index, Q, UniqueConstraint, signals
 from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.functional import cached_property
 from fernet_fields import EncryptedTextField
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 
 from djtoolbox.db.models import DocumentFileField
-from djtoolbox.decorators import cached_method
-from djtoolbox.storages import MinioMediaStorage
 from djtoolbox.storages.utils import UploadToGenerator
 from djtools.db import models
 from editais_ppc import querysets
+from example_app import credenciais
+from example_app.storages import LazyMinioMediaStorage
 from rh.models import Servidor
 
 MANGAE_OWNER_SCOPE = 'https://www.googleapis.com/auth/drive.file'
 
+PERMISSION_FIELDS = 'id,emailAddress,role'
+PERMISSION_LIST_FIELDS = 'nextPageToken,permissions({})'.format(PERMISSION_FIELDS)
+PERMISSION_PAGE_SIZE = 100
+
+
+class UpperPrefixIndex(Index):
+    """
+    Índice em ``UPPER(campo) varchar_pattern_ops`` no PostgreSQL, a forma que
+    o admin usa na busca por prefixo (``campo__istartswith`` vira
+    ``UPPER(campo) LIKE UPPER('x%')``). Nos outros bancos é um índice comum.
+    """
+
+    def create_sql(self, model, schema_editor, using=''):
+        statement = super(UpperPrefixIndex, self).create_sql(model, schema_editor, using=using)
+        if schema_editor.connection.vendor == 'postgresql':
+            statement.parts['columns'] = ', '.join(
+                'UPPER({}) {}'.format(schema_editor.quote_name(model._meta.get_field(name).column), opclass)
+                for (name, _), opclass in zip(self.fields_orders, self.opclasses)
+            )
+        return statement
+
 
 class CredentialsError(Exception):
     pass
@@ -40,44 +59,50 @@ class GoogleCloudCredential(models.ModelPlus):
     credentials_content = EncryptedTextField(verbose_name='Credentials Content', null=True, blank=True)
 
     def create_credentials(self):
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
         flow = InstalledAppFlow.from_client_config(
             json.loads(self.client_secret), [
                 MANGAE_OWNER_SCOPE
             ])
         creds = flow.run_console()
 
-        self.credentials_content = json.dumps({
-            'token': creds.token,
-            'refresh_token': creds.refresh_token,
-            'token_uri': creds.token_uri,
-            'client_id': creds.client_id,
-            'client_secret': creds.client_secret,
-            'scopes': creds.scopes,
-        })
+        self.credentials_content = credenciais.serializar(creds)
 
     @cached_property
     def credentials(self):
-        if not self.credentials_content:
-            raise CredentialsError()
+        return credenciais.obter(self)
 
-        info = json.loads(self.credentials_content)
-        credentials = Credentials(**info)
+    def build_service(self, api, version):
+        from googleapiclient.discovery import build
 
-        if not credentials.valid:
-            if credentials.expired and credentials.refresh_token:
-                credentials.refresh(Request())
-            else:
-                raise CredentialsError()
+        from example_app import instrumentacao
 
-        return credentials
+        kwargs = {
+            'http': instrumentacao.http_instrumentado(self.credentials),
+            'requestBuilder': instrumentacao.requisicao_classe(),
+        }
+        endpoint = getattr(settings, 'GOOGLE_API_ENDPOINT', None)
+        if endpoint:
+            kwargs.update(
+                cache_discovery=False,
+                discoveryServiceUrl=endpoint.rstrip('/') + '/discovery/v1/apis/{api}/{apiVersion}/rest'
+            )
+        return build(api, version, **kwargs)
 
     @cached_property
     def service(self):
-        return build('docs', 'v1', credentials=self.credentials)
+        return self.build_service('docs', 'v1')
 
     @cached_property
     def service_drive(self):
-        return build('drive', 'v3', credentials=self.credentials)
+        return self.build_service('drive', 'v3')
+
+
+@receiver(signals.post_save, sender=GoogleCloudCredential)
+@receiver(signals.post_delete, sender=GoogleCloudCredential)
+def invalidar_credenciais(sender, instance, **kwargs):
+    credenciais.invalidar(instance.pk)
 
 
 class ArquivoGoogleDocs(models.ModelPlus):
@@ -90,59 +115,81 @@ class ArquivoGoogleDocs(models.ModelPlus):
         return gcc
 
     def adicionar_permissao(self, email, role):
-        self.google_cloud.service_drive.permissions().create(
-            fileId=self.google_id, body={'role': role, 'type': 'user', 'emailAddress': email}
+        permissao = self.google_cloud.service_drive.permissions().create(
+            fileId=self.google_id, body={'role': role, 'type': 'user', 'emailAddress': email},
+            fields=PERMISSION_FIELDS
         ).execute()
+        if 'permissoes' in self.__dict__:
+            self.permissoes[email] = permissao
 
     def atualizar_permissao(self, email, role):
-        permissions = self.listar_permissoes()
-        for perm in permissions['permissions']:
-            if perm['emailAddress'] == email:
-                self.google_cloud.service_drive.permissions().update(
-                    fileId=self.google_id, permissionId=perm['id'], body={'role': role}
-                ).execute()
+        perm = self.permissoes.get(email)
+        if perm is not None:
+            self.atualizar_permissao_por_id(perm['id'], role)
 
     def atualizar_permissao_por_id(self, permission_id, role):
         self.google_cloud.service_drive.permissions().update(
             fileId=self.google_id, permissionId=permission_id, body={'role': role}
         ).execute()
+        for perm in self.__dict__.get('permissoes', {}).values():
+            if perm['id'] == permission_id:
+                perm['role'] = role
 
     def remover_permissao(self, email):
-        permissions = self.listar_permissoes()
-        for perm in permissions['permissions']:
-            if perm['emailAddress'] == email:
-                self.google_cloud.service_drive.permissions().delete(
-                    fileId=self.google_id, permissionId=perm['id'],
-                ).execute()
+        perm = self.permissoes.get(email)
+        if perm is not None:
+            self.google_cloud.service_drive.permissions().delete(
+                fileId=self.google_id, permissionId=perm['id'],
+            ).execute()
+            del self.permissoes[email]
 
     def remover_permissoes(self):
-        permissions = self.listar_permissoes()
-        for perm in permissions['permissions']:
+        # Lista tudo antes de alterar: mexer nas permissões durante a
+        # paginação desloca as páginas seguintes e pula entradas.
+        for perm in list(self.listar_permissoes()):
             if not perm['role'] == 'owner':
                 self.google_cloud.service_drive.permissions().delete(
                     fileId=self.google_id, permissionId=perm['id'],
                 ).execute()
+        self.__dict__.pop('permissoes', None)
 
     def atualizar_permissoes(self, role):
-        permissions = self.listar_permissoes()
-        for perm in permissions['permissions']:
+        for perm in list(self.listar_permissoes()):
             if not perm['role'] == 'owner':
                 self.google_cloud.service_drive.permissions().update(
                     fileId=self.google_id, permissionId=perm['id'], body={'role': role}
                 ).execute()
+        self.__dict__.pop('permissoes', None)
 
-    @cached_method
     def listar_permissoes(self):
-        permissions = self.google_cloud.service_drive.permissions().list(
-            fileId=self.google_id, fields='*'
-        ).execute()
-        return permissions
+        """
+        Percorre todas as páginas de ``permissions().list`` trazendo só os
+        campos usados aqui (id, emailAddress e role).
+        """
+        permissions = self.google_cloud.service_drive.permissions()
+        page_token = None
+        while True:
+            response = permissions.list(
+                fileId=self.google_id, fields=PERMISSION_LIST_FIELDS, pageSize=PERMISSION_PAGE_SIZE,
+                pageToken=page_token
+            ).execute()
+            for perm in response.get('permissions', []):
+                yield perm
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+
+    @cached_property
+    def permissoes(self):
+        """
+        Índice e-mail -> permissão, montado numa única listagem e mantido em
+        dia pelos métodos que alteram as permissões desta instância.
+        """
+        return {perm.get('emailAddress'): perm for perm in self.listar_permissoes()}
 
     def verificar_permissao(self, email, nivel_acesso):
-        for permissao in self.listar_permissoes()['permissions']:
-            if email == permissao['emailAddress'] and nivel_acesso == permissao['role']:
-                return True
-        return False
+        perm = self.permissoes.get(email)
+        return perm is not None and perm['role'] == nivel_acesso
 
     def clonar(self, nome):
         response = self.google_cloud.service_drive.files().copy(
@@ -155,13 +202,15 @@ class ArquivoGoogleDocs(models.ModelPlus):
         )
 
     def download(self):
+        from example_app.instrumentacao import download_classe
+
         gc = self.google_cloud
         request = gc.service_drive.files().export_media(
             fileId=self.google_id,
             mimeType='application/pdf'
         )
         fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
+        downloader = download_classe()(fh, request)
         done = False
         while done is False:
             status, done = downloader.next_chunk()
@@ -178,6 +227,12 @@ class ArquivoGoogleDocs(models.ModelPlus):
 class ModeloPPC(ArquivoGoogleDocs):
     nome = models.CharField(verbose_name='Nome', max_length=255, unique=True)
 
+    def criar_documento(self):
+        documento = self.google_cloud.service.documents().create(body={'title': self.nome}).execute()
+        self.google_id = documento['documentId']
+        self.url = 'https://docs.google.com/document/d/{}'.format(self.google_id)
+        self.save(update_fields=['google_id', 'url'])
+
     class Meta:
         verbose_name = u'Modelo de PPC'
         verbose_name_plural = u'Modelos de PPCs'
@@ -196,7 +251,7 @@ class Documento(models.ModelPlus):
         blank=True,
         null=True,
         upload_to=UploadToGenerator(['editais_ppc', 'documentos']),
-        storage=MinioMediaStorage()
+        storage=LazyMinioMediaStorage()
     )
 
     class Meta:
@@ -241,7 +296,7 @@ class Edital(models.ModelPlus):
         size=2,
         format=['pdf'],
         upload_to=UploadToGenerator(['editais_ppc', 'editais']),
-        storage=MinioMediaStorage()
+        storage=LazyMinioMediaStorage()
     )
     documentos = models.ManyToManyFieldPlus(
         Documento,
@@ -306,14 +361,69 @@ class Edital(models.ModelPlus):
         today = datetime.date.today()
         return self.data_resultado == today
 
+    def distribuir_avaliadores(self):
+        from example_app.distribuicao import distribuir_avaliadores
+        return distribuir_avaliadores(self)
+
+    def get_submissoes(self):
+        return Submissao.objects.filter(inscricao__edital=self).select_related('inscricao__ppc')
+
+    def get_submissoes_ajustaveis(self):
+        return self.get_submissoes().filter(avaliacoes__situacao__impeditiva=False).distinct()
+
+    def aplicar_permissoes_analise(self):
+        for submissao in self.get_submissoes().prefetch_related('avaliadores'):
+            ppc = submissao.inscricao.ppc
+            for avaliador in submissao.avaliadores.all():
+                if not ppc.verificar_permissao(avaliador.email_institucional, 'writer'):
+                    ppc.adicionar_permissao(avaliador.email_institucional, 'writer')
+
+    def aplicar_permissoes_pre_ajuste(self):
+        for submissao in self.get_submissoes():
+            submissao.inscricao.ppc.atualizar_permissoes('commenter')
+
+    def aplicar_permissoes_ajuste(self):
+        for submissao in self.get_submissoes_ajustaveis().prefetch_related('inscricao__membros', 'avaliadores'):
+            ppc = submissao.inscricao.ppc
+            for membro_inscricao in submissao.inscricao.membros.all():
+                ppc.atualizar_permissao(membro_inscricao.email_institucional, 'writer')
+            for avaliador in submissao.avaliadores.all():
+                ppc.atualizar_permissao(avaliador.email_institucional, 'commenter')
+
+    def aplicar_permissoes_pos_ajuste(self):
+        for submissao in self.get_submissoes_ajustaveis():
+            submissao.inscricao.ppc.atualizar_permissoes('commenter')
+
     class Meta:
         verbose_name = u'Edital'
         verbose_name_plural = u'Editais'
+        indexes = [
+            # Busca por prefixo no admin (UPPER(nome) LIKE UPPER('x%'))
+            UpperPrefixIndex(fields=['nome'], name='edital_nome_prefixo_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return '{self.nome} - {self.numero}/{self.ano}'.format(self=self)
 
 
+@receiver(signals.pre_save, sender=Edital)
+def guardar_datas_das_fases(sender, instance, update_fields=None, **kwargs):
+    from example_app import agendamento
+    agendamento.guardar_datas(instance, update_fields)
+
+
+@receiver(signals.post_save, sender=Edital)
+def agendar_transicoes(sender, instance, update_fields=None, **kwargs):
+    from example_app import agendamento
+    agendamento.agendar(instance, update_fields)
+
+
+@receiver(signals.post_delete, sender=Edital)
+def cancelar_transicoes(sender, instance, **kwargs):
+    from example_app import agendamento
+    agendamento.cancelar(instance.pk)
+
+
 class Inscricao(models.ModelPlus):
     edital = models.ForeignKey(
         Edital,
@@ -371,14 +481,21 @@ class Inscricao(models.ModelPlus):
             self.ppc = self.edital.modelo_ppc.clonar(self.edital.modelo_ppc.nome)
         super(Inscricao, self).save(*args, **kargs)
 
+    def conceder_permissoes_membros(self):
+        for membro in self.membros.all():
+            if not self.ppc.verificar_permissao(membro.email_institucional, 'writer'):
+                self.ppc.adicionar_permissao(membro.email_institucional, 'writer')
+
 
 @receiver(signals.m2m_changed, sender=Inscricao.membros.through)
 def set_perms_for_membros(sender, instance, action, **kargs):
+    from example_app import tasks
+
     inscricao = instance
     if action == 'post_add' and inscricao.edital.em_periodo_inscricao():
-        membros = inscricao.membros.all()
-        for membro in membros:
-            inscricao.ppc.adicionar_permissao(membro.email_institucional, 'writer')
+        tasks.conceder_permissoes_membros.apply_async(
+            args=[inscricao.id], chave='conceder_permissoes_membros:{}'.format(inscricao.id)
+        )
 
 
 class Submissao(models.ModelPlus):
@@ -411,39 +528,38 @@ class Submissao(models.ModelPlus):
     def __str__(self):
         return 'Submissão {}'.format(self.id)
 
+    def bloquear_edicao_membros(self):
+        for membro_inscricao in self.inscricao.membros.all():
+            self.inscricao.ppc.atualizar_permissao(membro_inscricao.email_institucional, 'reader')
+
     @classmethod
     def periodo_analise_perms(cls):
-        submissoes = Submissao.objects.all()
-        for submissao in submissoes:
-            if submissao.inscricao.edital.em_periodo_analise():
-                for avaliador in submissao.avaliadores.all():
-                    if not submissao.inscricao.ppc.verificar_permissao(avaliador.email_institucional, 'writer'):
-                        submissao.inscricao.ppc.adicionar_permissao(avaliador.email_institucional, 'writer')
-            elif submissao.inscricao.edital.em_periodo_pre_ajuste():
-                submissao.inscricao.ppc.atualizar_permissoes('commenter')
+        hoje = datetime.date.today()
+        for edital in Edital.objects.filter(inicio_analise__lte=hoje, fim_analise__gte=hoje):
+            edital.aplicar_permissoes_analise()
+        for edital in Edital.objects.filter(fim_analise__lt=hoje, inicio_ajuste__gt=hoje):
+            edital.aplicar_permissoes_pre_ajuste()
 
     @classmethod
     def periodo_ajuste_perms(cls):
-        submissoes = Submissao.objects.filter(avaliacoes__situacao__impeditiva=False)
-        for submissao in submissoes:
-            if submissao.inscricao.edital.em_periodo_ajuste():
-                for membro_inscricao in submissao.inscricao.membros.all():
-                    email = membro_inscricao.email_institucional
-                    submissao.inscricao.ppc.atualizar_permissao(email, 'writer')
-                for avaliador in submissao.inscricao.submissao.avaliadores.all():
-                    email = avaliador.email_institucional
-                    submissao.inscricao.ppc.atualizar_permissao(email, 'commenter')
-            if submissao.inscricao.edital.em_periodo_pos_ajuste:
-                submissao.inscricao.ppc.atualizar_permissoes('commenter')
+        hoje = datetime.date.today()
+        for edital in Edital.objects.filter(inicio_ajuste__lte=hoje, fim_ajuste__gte=hoje):
+            edital.aplicar_permissoes_ajuste()
+        # Só os que fecharam ontem; os demais já passaram pela transição
+        # agendada (agendamento) ou por uma execução anterior.
+        for edital in Edital.objects.filter(fim_ajuste=hoje - datetime.timedelta(days=1)):
+            edital.aplicar_permissoes_pos_ajuste()
 
 
 @receiver(signals.post_save, sender=Submissao)
 def submissao_perms(sender, created, instance, **kwargs):
+    from example_app import tasks
+
     submissao = instance
     if created and submissao.inscricao.edital.em_periodo_inscricao():
-        for membro_inscricao in submissao.inscricao.membros.all():
-            email = membro_inscricao.email_institucional
-            submissao.inscricao.ppc.atualizar_permissao(email, 'reader')
+        tasks.bloquear_edicao_membros.apply_async(
+            args=[submissao.id], chave='bloquear_edicao_membros:{}'.format(submissao.id)
+        )
 
 
 class SituacaoPPC(models.ModelPlus):
@@ -566,3 +682,99 @@ class SolicitacaoCorrecao(models.ModelPlus):
             self.EXCLUSAO: 'error',
         }
         return classes.get(self.tipo)
+
+
+class Job(models.ModelPlus):
+    """
+    Tarefa em segundo plano enfileirada por ``example_app.jobs``.
+    """
+    PENDENTE = 1
+    EXECUTANDO = 2
+    CONCLUIDO = 3
+    FALHOU = 4
+    STATUS_CHOICES = (
+        (PENDENTE, 'Pendente'),
+        (EXECUTANDO, 'Executando'),
+        (CONCLUIDO, 'Concluído'),
+        (FALHOU, 'Falhou'),
+    )
+    nome = models.CharField(verbose_name='Tarefa', max_length=255)
+    argumentos = models.TextField(verbose_name='Argumentos', default='{}')
+    chave = models.CharField(
+        verbose_name='Chave',
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text='Enquanto houver um job pendente com a mesma chave, novos pedidos são descartados'
+    )
+    status = models.PositiveSmallIntegerField(verbose_name='Situação', choices=STATUS_CHOICES, default=PENDENTE)
+    prioridade = models.SmallIntegerField(verbose_name='Prioridade', default=0)
+    tentativas = models.PositiveSmallIntegerField(verbose_name='Tentativas', default=0)
+    max_tentativas = models.PositiveSmallIntegerField(verbose_name='Máximo de tentativas', default=3)
+    executar_em = models.DateTimeField(verbose_name='Executar em', default=timezone.now)
+    reservado_por = models.CharField(verbose_name='Reservado por', max_length=255, blank=True)
+    reservado_em = models.DateTimeField(verbose_name='Reservado em', null=True, blank=True)
+    criado_em = models.DateTimeField(verbose_name='Criado em', auto_now_add=True)
+    concluido_em = models.DateTimeField(verbose_name='Concluído em', null=True, blank=True)
+    ultimo_erro = models.TextField(verbose_name='Último erro', blank=True)
+
+    class Meta:
+        verbose_name = u'Job'
+        verbose_name_plural = u'Jobs'
+        indexes = [
+            Index(fields=['status', 'executar_em'], name='job_fila_idx'),
+            Index(fields=['status', 'nome'], name='job_status_nome_idx'),
+        ]
+        constraints = [
+            # status=1 é Job.PENDENTE
+            UniqueConstraint(fields=['chave'], condition=Q(status=1), name='job_chave_pendente_unica'),
+        ]
+
+    def __str__(self):
+        return '{self.nome} #{self.id}'.format(self=self)
+
+
+class UploadMultipart(models.ModelPlus):
+    """
+    Upload retomável de arquivo de ``Edital``/``Documento`` em andamento no
+    bucket (``example_app.uploads``).
+    """
+    ABERTO = 1
+    CONCLUIDO = 2
+    ABORTADO = 3
+    STATUS_CHOICES = (
+        (ABERTO, 'Aberto'),
+        (CONCLUIDO, 'Concluído'),
+        (ABORTADO, 'Abortado'),
+    )
+    DESTINO_CHOICES = (
+        ('edital', 'Edital'),
+        ('documento', 'Documento'),
+    )
+    identificador = models.UUIDField(verbose_name='Identificador', default=uuid.uuid4, unique=True, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name='Usuário',
+        related_name='uploads_multipart',
+        on_delete=models.CASCADE
+    )
+    destino = models.CharField(verbose_name='Destino', max_length=20, choices=DESTINO_CHOICES)
+    nome_original = models.CharField(verbose_name='Nome do arquivo', max_length=255)
+    content_type = models.CharField(verbose_name='Tipo do conteúdo', max_length=255, blank=True)
+    chave = models.CharField(verbose_name='Chave no bucket', max_length=1024)
+    upload_id = models.CharField(verbose_name='Id do upload no S3', max_length=1024)
+    tamanho_parte = models.PositiveIntegerField(verbose_name='Tamanho máximo da parte')
+    tamanho = models.BigIntegerField(verbose_name='Tamanho', null=True, blank=True)
+    status = models.PositiveSmallIntegerField(verbose_name='Situação', choices=STATUS_CHOICES, default=ABERTO)
+    criado_em = models.DateTimeField(verbose_name='Criado em', auto_now_add=True)
+    concluido_em = models.DateTimeField(verbose_name='Concluído em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = u'Upload multipart'
+        verbose_name_plural = u'Uploads multipart'
+        indexes = [
+            Index(fields=['status', 'criado_em'], name='upload_status_criado_idx'),
+        ]
+
+    def __str__(self):
+        return self.nome_original
@@ -0,0 +1,235 @@
+"""
+Gera editais, inscrições, submissões, avaliações e solicitações de correção
+em volume de produção usando ``bulk_create``.
+
+Usado pelo comando ``gerar_dados_editais`` e como fixture em testes de
+desempenho. Os PPCs são clonados num ``FakeDrive`` em memória, com as mesmas
+permissões que os sinais de ``example_app.models`` teriam concedido.
+"""
+import datetime
+import random
+import uuid
+
+from django.db import transaction
+from django.db.models import Max
+
+from example_app import distribuicao
+from example_app.fake_drive import FakeDrive
+from example_app.models import (
+    ArquivoGoogleDocs, Avaliacao, Edital, Inscricao, ModeloPPC, SituacaoPPC, SolicitacaoCorrecao, Submissao,
+    TipoEdital,
+)
+from rh.models import Servidor
+
+BATCH_SIZE = 1000
+
+SITUACOES = (
+    ('Aprovado', False),
+    ('Aprovado com ajustes', False),
+    ('Reprovado', True),
+)
+
+
+def _servidores(quantidade):
+    servidores = list(Servidor.objects.order_by('id').values_list('id', 'email_institucional')[:quantidade])
+    faltam = quantidade - len(servidores)
+    if faltam > 0:
+        from model_mommy import mommy
+        novos = mommy.make('rh.Servidor', _quantity=faltam)
+        servidores.extend((servidor.id, servidor.email_institucional) for servidor in novos)
+    return servidores
+
+
+def _portarias(quantidade):
+    from documento_eletronico.models import DocumentoTexto
+
+    portarias = list(DocumentoTexto.objects.order_by('id').values_list('id', flat=True)[:quantidade])
+    faltam = quantidade - len(portarias)
+    if faltam > 0:
+        from model_mommy import mommy
+        portarias.extend(p.id for p in mommy.make('documento_eletronico.DocumentoTexto', _quantity=faltam))
+    return portarias
+
+
+def _datas(inicio):
+    dia = datetime.timedelta(days=1)
+    return {
+        'inicio_inscricao': inicio,
+        'fim_inscricao': inicio + 10 * dia,
+        'inicio_analise': inicio + 11 * dia,
+        'fim_analise': inicio + 20 * dia,
+        'inicio_ajuste': inicio + 22 * dia,
+        'fim_ajuste': inicio + 30 * dia,
+        'data_resultado': inicio + 35 * dia,
+    }
+
+
+def _ultimo_id(model):
+    # bulk_create só devolve as chaves no PostgreSQL; as linhas novas são
+    # relidas como as de id maior que o último existente antes da inserção.
+    return model.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+
+
+@transaction.atomic
+def gerar(editais=1000, inscricoes_por_edital=20, membros_por_inscricao=3, servidores=500,
+          avaliadores_por_edital=30, quantidade_avaliadores=2, taxa_submissao=0.8, taxa_avaliacao=0.7,
+          solicitacoes_por_avaliacao=3, portarias=50, seed=0, drive=None):
+    """
+    Gera a massa de dados e devolve um dicionário com o total de linhas
+    criadas por modelo. As datas dos editais são espalhadas em torno de hoje,
+    então há editais em todas as fases (inscrição, análise, ajuste, resultado).
+    """
+    rnd = random.Random(seed)
+    drive = drive or FakeDrive()
+    hoje = datetime.date.today()
+    lote = uuid.uuid4().hex[:8]
+
+    pool = _servidores(servidores)
+    emails = dict(pool)
+    servidor_ids = list(emails)
+    portaria_ids = _portarias(portarias)
+
+    tipo, _ = TipoEdital.objects.get_or_create(nome='Edital sintético')
+    situacoes = [
+        SituacaoPPC.objects.get_or_create(nome=nome, defaults={'impeditiva': impeditiva})[0]
+        for nome, impeditiva in SITUACOES
+    ]
+    original = drive.criar_arquivo('Modelo sintético {}'.format(lote))
+    modelo = ModeloPPC.objects.create(
+        nome='Modelo sintético {}'.format(lote),
+        google_id=original['id'],
+        url='https://docs.google.com/document/d/{}'.format(original['id']),
+    )
+
+    # Editais e seus avaliadores
+    inicio_base = hoje - datetime.timedelta(days=60)
+    ultimo = _ultimo_id(Edital)
+    Edital.objects.bulk_create([
+        Edital(
+            nome='Edital sintético {} #{}'.format(lote, i),
+            numero=i + 1,
+            ano=hoje.year,
+            tipo=tipo,
+            quantidade_avaliadores=quantidade_avaliadores,
+            modelo_ppc=modelo,
+            arquivo='editais_ppc/editais/sintetico.pdf',
+            **_datas(inicio_base + datetime.timedelta(days=rnd.randint(0, 90)))
+        )
+        for i in range(editais)
+    ], batch_size=BATCH_SIZE)
+    inicio_analise = dict(Edital.objects.filter(id__gt=ultimo).values_list('id', 'inicio_analise'))
+    edital_ids = sorted(inicio_analise)
+
+    avaliadores = {
+        edital_id: rnd.sample(servidor_ids, min(avaliadores_por_edital, len(servidor_ids)))
+        for edital_id in edital_ids
+    }
+    EditalAvaliadores = Edital.avaliadores.through
+    EditalAvaliadores.objects.bulk_create([
+        EditalAvaliadores(edital_id=edital_id, servidor_id=servidor_id)
+        for edital_id, ids in avaliadores.items() for servidor_id in ids
+    ], batch_size=BATCH_SIZE)
+
+    # Inscrições, cada uma com o seu clone do PPC
+    total_inscricoes = editais * inscricoes_por_edital
+    arquivos = [
+        drive.files().copy(fileId=modelo.google_id, body={'name': modelo.nome}).execute()['id']
+        for _ in range(total_inscricoes)
+    ]
+    ultimo = _ultimo_id(ArquivoGoogleDocs)
+    ArquivoGoogleDocs.objects.bulk_create([
+        ArquivoGoogleDocs(google_id=google_id, url='https://docs.google.com/document/d/{}'.format(google_id))
+        for google_id in arquivos
+    ], batch_size=BATCH_SIZE)
+    ppcs = dict(ArquivoGoogleDocs.objects.filter(id__gt=ultimo).values_list('google_id', 'id'))
+
+    donos = [(edital_id, arquivos[n * inscricoes_por_edital + k])
+             for n, edital_id in enumerate(edital_ids) for k in range(inscricoes_por_edital)]
+    ultimo = _ultimo_id(Inscricao)
+    Inscricao.objects.bulk_create([
+        Inscricao(edital_id=edital_id, ppc_id=ppcs[google_id], portaria_id=rnd.choice(portaria_ids))
+        for edital_id, google_id in donos
+    ], batch_size=BATCH_SIZE)
+    inscricoes = list(
+        Inscricao.objects.filter(id__gt=ultimo).order_by('id').values_list('id', 'edital_id', 'ppc__google_id')
+    )
+
+    membros = {}
+    for inscricao_id, edital_id, google_id in inscricoes:
+        membros[inscricao_id] = rnd.sample(servidor_ids, min(membros_por_inscricao, len(servidor_ids)))
+        for servidor_id in membros[inscricao_id]:
+            drive.permissions().create(
+                fileId=google_id, body={'type': 'user', 'role': 'writer', 'emailAddress': emails[servidor_id]}
+            ).execute()
+    InscricaoMembros = Inscricao.membros.through
+    InscricaoMembros.objects.bulk_create([
+        InscricaoMembros(inscricao_id=inscricao_id, servidor_id=servidor_id)
+        for inscricao_id, ids in membros.items() for servidor_id in ids
+    ], batch_size=BATCH_SIZE)
+
+    # Submissões e distribuição de avaliadores
+    submetidas = [inscricao for inscricao in inscricoes if rnd.random() < taxa_submissao]
+    ultimo = _ultimo_id(Submissao)
+    Submissao.objects.bulk_create([
+        Submissao(inscricao_id=inscricao_id, usuario_id=membros[inscricao_id][0])
+        for inscricao_id, _, _ in submetidas
+    ], batch_size=BATCH_SIZE)
+    submissoes = dict(
+        Submissao.objects.filter(id__gt=ultimo).values_list('inscricao_id', 'id')
+    )
+
+    pares = []
+    edital_da_submissao = {}
+    por_edital = {}
+    for inscricao_id, edital_id, _ in submetidas:
+        por_edital.setdefault(edital_id, []).append(inscricao_id)
+        edital_da_submissao[submissoes[inscricao_id]] = edital_id
+    for edital_id, inscricao_ids in por_edital.items():
+        pares.extend(distribuicao.distribuir(
+            [submissoes[inscricao_id] for inscricao_id in inscricao_ids],
+            avaliadores[edital_id],
+            quantidade_avaliadores,
+            conflitos={submissoes[inscricao_id]: set(membros[inscricao_id]) for inscricao_id in inscricao_ids},
+        ))
+    SubmissaoAvaliadores = Submissao.avaliadores.through
+    SubmissaoAvaliadores.objects.bulk_create([
+        SubmissaoAvaliadores(submissao_id=submissao_id, servidor_id=servidor_id)
+        for submissao_id, servidor_id in pares
+    ], batch_size=BATCH_SIZE)
+
+    # Avaliações só existem em editais que já entraram na análise
+    avaliados = [
+        (submissao_id, servidor_id) for submissao_id, servidor_id in pares
+        if inicio_analise[edital_da_submissao[submissao_id]] <= hoje and rnd.random() < taxa_avaliacao
+    ]
+    ultimo = _ultimo_id(Avaliacao)
+    Avaliacao.objects.bulk_create([
+        Avaliacao(
+            submissao_id=submissao_id,
+            avaliador_id=servidor_id,
+            situacao=rnd.choice(situacoes),
+            justificativa='Avaliação sintética',
+        )
+        for submissao_id, servidor_id in avaliados
+    ], batch_size=BATCH_SIZE)
+    avaliacao_ids = list(
+        Avaliacao.objects.filter(id__gt=ultimo).values_list('id', flat=True)
+    )
+
+    tipos = [tipo for tipo, _ in SolicitacaoCorrecao.TIPO_CHOICES]
+    solicitacoes = [
+        SolicitacaoCorrecao(avaliacao_id=avaliacao_id, tipo=rnd.choice(tipos), comentario='Correção sintética')
+        for avaliacao_id in avaliacao_ids
+        for _ in range(rnd.randint(0, solicitacoes_por_avaliacao))
+    ]
+    SolicitacaoCorrecao.objects.bulk_create(solicitacoes, batch_size=BATCH_SIZE)
+
+    return {
+        'editais': len(edital_ids),
+        'inscricoes': len(inscricoes),
+        'membros': sum(len(ids) for ids in membros.values()),
+        'submissoes': len(submissoes),
+        'avaliadores': len(pares),
+        'avaliacoes': len(avaliacao_ids),
+        'solicitacoes': len(solicitacoes),
+    }
@@ -0,0 +1,27 @@
+from django.utils.functional import LazyObject, empty
+
+
+class LazyMinioMediaStorage(LazyObject):
+    """
+    Defers importing and configuring the MinIO client until a file is
+    actually read or written, so loading the models stays cheap.
+    """
+
+    def _setup(self):
+        from djtoolbox.storages import MinioMediaStorage
+        self._wrapped = MinioMediaStorage()
+
+    def __bool__(self):
+        # FileField does ``storage or default_storage``; don't build the
+        # real storage just to answer that.
+        return True
+
+    def save(self, name, content, max_length=None):
+        # Files streamed by example_app.uploads are already in the bucket.
+        chave = getattr(content, 'chave_armazenada', None)
+        if chave is not None:
+            content.gravado = True
+            return chave
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped.save(name, content, max_length=max_length)
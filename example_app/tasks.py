@@ -1,2 +1,29 @@
-def criar_documento():
-    pass
\ No newline at end of file
+from example_app import models
+from example_app.jobs import job
+
+# Limite de chamadas simultâneas ao Drive por tipo de job, somando todos os workers.
+DRIVE_CONCORRENCIA = 4
+
+
+@job(max_tentativas=5, backoff=30, concorrencia=DRIVE_CONCORRENCIA)
+def criar_documento(modelo_ppc_id):
+    models.ModeloPPC.objects.get(id=modelo_ppc_id).criar_documento()
+
+
+@job(max_tentativas=5, backoff=30, concorrencia=DRIVE_CONCORRENCIA)
+def conceder_permissoes_membros(inscricao_id):
+    models.Inscricao.objects.select_related('ppc').get(id=inscricao_id).conceder_permissoes_membros()
+
+
+@job(max_tentativas=5, backoff=30, concorrencia=DRIVE_CONCORRENCIA)
+def bloquear_edicao_membros(submissao_id):
+    models.Submissao.objects.select_related('inscricao__ppc').get(id=submissao_id).bloquear_edicao_membros()
+
+
+@job(max_tentativas=5, backoff=60, prioridade=10, concorrencia=DRIVE_CONCORRENCIA)
+def transicao_fase(edital_id, fase):
+    from example_app import agendamento
+
+    edital = models.Edital.objects.filter(id=edital_id).first()
+    if edital is not None:
+        agendamento.executar(edital, fase)
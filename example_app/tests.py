@@ -1,20 +1,68 @@
+import asyncio
 import datetime
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
 
+import graphene
 import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.auth import AuthMiddlewareStack
+from channels.testing import HttpCommunicator, WebsocketCommunicator
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
+from django.contrib.admin import site
+from django.contrib.auth.models import Group as AuthGroup, Permission, User
+from django.contrib.contenttypes.models import ContentType
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db import connection, router, transaction
+from django.db.models import Index
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.backends.utils import CursorWrapper
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from faker import Faker
+from graphene_django import DjangoObjectType
 from google.oauth2.credentials import Credentials
 from model_mommy import mommy
 
+from django_graphql_movies import encoders, metrics, subscriptions, versions
+from django_graphql_movies.consumers import AsyncGraphQLConsumer, GraphQLSubscriptionConsumer
+from django_graphql_movies.db import routing
+from django_graphql_movies.loaders import RootFieldCacheMiddleware
+from django_graphql_movies.management.commands.importtime import parse_importtime
+from django_graphql_movies.middleware import REPLICA_PIN_COOKIE, CompressionMiddleware, ReplicaRoutingMiddleware
+from django_graphql_movies.pubsub import InMemoryBroker, set_broker
+from django_graphql_movies.views import GraphQLView
 from djtoolbox.tests import SuapTestCase, Group
 from editais_ppc import models, forms
+from example_app import agendamento, credenciais, distribuicao, instrumentacao, jobs, sinteticos, tasks, uploads
+from example_app import models as example_models
+from example_app.fake_drive import FakeDrive
+from example_app.fake_drive_server import FakeDriveServer
+from example_app.fake_s3 import FakeS3Client, FakeS3Error
+from example_app.middleware import OrcamentoGoogleMiddleware
+from example_app.storages import LazyMinioMediaStorage
 from expedicao.utils import proximo_dia
 from rh.tests import recipes as rh_recipes
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import psycopg2.pool
+except ImportError:
+    psycopg2 = None
+
 fake = Faker(locale=settings.LANGUAGE_CODE)
 
 credentials_mock = mock.MagicMock(spec=Credentials)
@@ -270,3 +318,1310 @@ class SubmissaoTesteCase(SuapTestCase):
             response,
             url
         )
+
+
+class DistribuicaoAvaliadoresTestCase(TestCase):
+
+    def test_distribui_pelo_menos_carregado(self):
+        pares = distribuicao.distribuir([1, 2, 3, 4], [10, 20], 1, carga={10: 1})
+        self.assertEqual(pares, [(1, 20), (2, 10), (3, 20), (4, 10)])
+
+    def test_respeita_conflitos_e_atuais(self):
+        pares = distribuicao.distribuir(
+            [1, 2], [10, 20, 30], 2,
+            conflitos={1: {10}},
+            atuais={2: {30}}
+        )
+        self.assertNotIn((1, 10), pares)
+        self.assertEqual(len([p for p in pares if p[0] == 1]), 2)
+        self.assertEqual([p for p in pares if p[0] == 2], [(2, 10)])
+
+    def test_avaliadores_insuficientes(self):
+        with self.assertRaises(distribuicao.AvaliadoresInsuficientesError):
+            distribuicao.distribuir([1], [10, 20], 2, conflitos={1: {20}})
+
+
+@unittest.skipUnless('replica' in settings.DATABASES, 'use django_graphql_movies.test_settings')
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTestCase(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super(ReplicaRoutingTestCase, self).setUp()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+        User.objects.using('default').create(username='primario')
+        User.objects.using('replica').create(username='replica')
+
+    def usernames(self):
+        return sorted(User.objects.values_list('username', flat=True))
+
+    def get_response(self, request):
+        self.lidos = self.usernames()
+        if 'mutation' in request.body.decode() or request.GET.get('escrever'):
+            User.objects.create(username='novo')
+            self.lidos_apos_escrita = self.usernames()
+        return HttpResponse()
+
+    def graphql(self, query, **extra):
+        return self.factory.post(
+            reverse('graphql'), json.dumps({'query': query}), content_type='application/json', **extra
+        )
+
+    def test_query_le_da_replica(self):
+        response = self.middleware(self.graphql('{ movies { id } }'))
+        self.assertEqual(self.lidos, ['replica'])
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_mutation_fica_no_primario(self):
+        response = self.middleware(self.graphql('mutation { createActor(input: {name: "x"}) { ok } }'))
+        self.assertEqual(self.lidos, ['primario'])
+        self.assertEqual(self.lidos_apos_escrita, ['novo', 'primario'])
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_escrita_fixa_o_restante_da_requisicao_no_primario(self):
+        response = self.middleware(self.factory.get(reverse('admin:auth_user_changelist'), {'escrever': 1}))
+        self.assertEqual(self.lidos, ['replica'])
+        self.assertEqual(self.lidos_apos_escrita, ['novo', 'primario'])
+        self.assertFalse(User.objects.using('replica').filter(username='novo').exists())
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_pedir_o_alias_de_escrita_nao_fixa_no_primario(self):
+        def get_response(request):
+            router.db_for_write(User)
+            self.lidos = self.usernames()
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(get_response)(self.graphql('{ movies { id } }'))
+        self.assertEqual(self.lidos, ['replica'])
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_leitura_apos_escrita_fica_no_primario(self):
+        request = self.graphql('{ movies { id } }', HTTP_COOKIE='{}={}'.format(
+            REPLICA_PIN_COOKIE, int(time.time() + 60)
+        ))
+        self.middleware(request)
+        self.assertEqual(self.lidos, ['primario'])
+
+    def test_changelist_do_admin_le_da_replica(self):
+        self.middleware(self.factory.get(reverse('admin:auth_user_changelist')))
+        self.assertEqual(self.lidos, ['replica'])
+
+    def test_fora_de_requisicao_usa_primario(self):
+        self.assertEqual(self.usernames(), ['primario'])
+
+
+class ContentTypeNode(DjangoObjectType):
+    class Meta:
+        model = ContentType
+        only_fields = ('app_label', 'model')
+
+
+class PermissionNode(DjangoObjectType):
+    class Meta:
+        model = Permission
+        only_fields = ('codename', 'content_type')
+
+
+class GroupNode(DjangoObjectType):
+    class Meta:
+        model = AuthGroup
+        only_fields = ('name',)
+
+
+class CriarUsuario(graphene.Mutation):
+    class Arguments:
+        username = graphene.String(required=True)
+
+    ok = graphene.Boolean()
+
+    def mutate(root, info, username):
+        User.objects.create(username=username)
+        return CriarUsuario(ok=True)
+
+
+class ConsultaDeTeste(graphene.ObjectType):
+    usuario = graphene.String()
+    usuarios = graphene.List(graphene.String)
+    permissoes = graphene.List(PermissionNode)
+    texto = graphene.String(tamanho=graphene.Int())
+    grupo = graphene.Field(GroupNode, id=graphene.Int(required=True))
+
+    def resolve_usuario(root, info):
+        return info.context.user.username
+
+    def resolve_usuarios(root, info):
+        return User.objects.order_by('username').values_list('username', flat=True)
+
+    def resolve_permissoes(root, info):
+        return Permission.objects.filter(codename__startswith='add_').order_by('id')[:3]
+
+    def resolve_texto(root, info, tamanho):
+        return 'x' * tamanho
+
+    def resolve_grupo(root, info, id):
+        return info.context.loaders.load(AuthGroup, id)
+
+
+class MutacaoDeTeste(graphene.ObjectType):
+    criar_usuario = CriarUsuario.Field()
+
+
+class SubscricaoDeTeste(graphene.ObjectType):
+    grupo_changed = graphene.Field(subscriptions.ChangeEvent, id=graphene.ID())
+
+    def resolve_grupo_changed(root, info, id=None):
+        return subscriptions.observe('auth.group', id=id)
+
+
+class GraphQLViewDeTeste(GraphQLView):
+    schema = graphene.Schema(query=ConsultaDeTeste, mutation=MutacaoDeTeste, subscription=SubscricaoDeTeste)
+
+
+class ConsumerDeTeste(AsyncGraphQLConsumer):
+    view_class = GraphQLViewDeTeste
+
+
+class SubscriptionConsumerDeTeste(GraphQLSubscriptionConsumer):
+    view_class = GraphQLViewDeTeste
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class AsyncGraphQLConsumerTestCase(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def graphql(self, query, headers=()):
+        communicator = HttpCommunicator(
+            AuthMiddlewareStack(ConsumerDeTeste), 'POST', reverse('graphql'),
+            body=json.dumps({'query': query}).encode(),
+            headers=[(b'content-type', b'application/json')] + list(headers),
+        )
+        response = async_to_sync(communicator.get_response)()
+        response['headers'] = dict(response['headers'])
+        return response
+
+    def test_contexto_tem_usuario_da_sessao(self):
+        usuario = User.objects.create(username='fulano')
+        self.client.force_login(usuario)
+        cookie = '{}={}'.format(settings.SESSION_COOKIE_NAME, self.client.cookies[settings.SESSION_COOKIE_NAME].value)
+
+        response = self.graphql('{ usuario }', headers=[(b'cookie', cookie.encode())])
+        self.assertEqual(json.loads(response['body']), {'data': {'usuario': 'fulano'}})
+
+        response = self.graphql('{ usuario }')
+        self.assertEqual(json.loads(response['body']), {'data': {'usuario': ''}})
+
+    def test_query_le_da_replica(self):
+        User.objects.using('default').create(username='primario')
+        User.objects.using('replica').create(username='replica')
+
+        response = self.graphql('{ usuarios }')
+        self.assertEqual(json.loads(response['body']), {'data': {'usuarios': ['replica']}})
+        self.assertNotIn(b'Set-Cookie', response['headers'])
+
+    def test_mutation_fica_no_primario_e_fixa_o_cliente(self):
+        response = self.graphql('mutation { criarUsuario(username: "novo") { ok } }')
+        self.assertEqual(json.loads(response['body']), {'data': {'criarUsuario': {'ok': True}}})
+        self.assertTrue(User.objects.using('default').filter(username='novo').exists())
+        self.assertFalse(User.objects.using('replica').filter(username='novo').exists())
+        self.assertIn(REPLICA_PIN_COOKIE.encode(), response['headers'][b'Set-Cookie'])
+
+    def test_relacoes_resolvidas_fora_do_event_loop(self):
+        threads = []
+        execute = CursorWrapper.execute
+
+        def registrar_thread(cursor, sql, params=None):
+            threads.append(threading.current_thread().name)
+            return execute(cursor, sql, params)
+
+        with mock.patch.object(CursorWrapper, 'execute', registrar_thread), \
+                override_settings(DATABASE_REPLICAS=[]):
+            response = self.graphql('{ permissoes { codename contentType { model } } }')
+
+        permissoes = json.loads(response['body'])['data']['permissoes']
+        self.assertEqual(len(permissoes), 3)
+        self.assertTrue(all(permissao['contentType']['model'] for permissao in permissoes))
+        self.assertEqual(len(threads), 4)
+        self.assertTrue(all(nome.startswith('graphql-orm') for nome in threads), threads)
+
+    @override_settings(COMPRESSION_MIN_SIZE=100)
+    def test_resposta_comprimida(self):
+        response = self.graphql('{ texto(tamanho: 5000) }', headers=[(b'accept-encoding', b'gzip')])
+        self.assertEqual(response['headers'][b'Content-Encoding'], b'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response['body'])), {'data': {'texto': 'x' * 5000}})
+
+
+class GraphQLBatchTestCase(TestCase):
+
+    def setUp(self):
+        super(GraphQLBatchTestCase, self).setUp()
+        self.view = GraphQLViewDeTeste.as_view(middleware=[RootFieldCacheMiddleware()])
+        self.factory = RequestFactory()
+
+    def graphql(self, data):
+        response = self.view(self.factory.post('/graphql/', json.dumps(data), content_type='application/json'))
+        return response.status_code, json.loads(response.content)
+
+    def test_lote_responde_em_ordem(self):
+        status, resultado = self.graphql([
+            {'id': 'a', 'query': '{ texto(tamanho: 1) }'},
+            {'id': 'b', 'query': '{ texto(tamanho: 2) }'},
+            {'id': 'c', 'query': '{ naoExiste }'},
+        ])
+        self.assertEqual(status, 400)
+        self.assertEqual(resultado[:2], [
+            {'id': 'a', 'status': 200, 'data': {'texto': 'x'}},
+            {'id': 'b', 'status': 200, 'data': {'texto': 'xx'}},
+        ])
+        self.assertEqual((resultado[2]['id'], resultado[2]['status']), ('c', 400))
+        self.assertIn('errors', resultado[2])
+
+    def test_operacao_unica_continua_sem_lote(self):
+        status, resultado = self.graphql({'query': '{ texto(tamanho: 3) }'})
+        self.assertEqual((status, resultado), (200, {'data': {'texto': 'xxx'}}))
+
+    @override_settings(GRAPHQL_MAX_BATCH_SIZE=2)
+    def test_lote_acima_do_limite(self):
+        status, resultado = self.graphql([{'query': '{ texto(tamanho: 1) }'}] * 3)
+        self.assertEqual(status, 400)
+        self.assertEqual(resultado['errors'][0]['message'], 'Batch requests are limited to 2 operations.')
+
+    def test_lote_vazio(self):
+        status, resultado = self.graphql([])
+        self.assertEqual(status, 400)
+        self.assertEqual(resultado['errors'][0]['message'], 'Received an empty list in the batch request.')
+
+    def test_lote_com_entrada_que_nao_e_objeto(self):
+        status, resultado = self.graphql([{'query': '{ texto(tamanho: 1) }'}, 1])
+        self.assertEqual(status, 400)
+        self.assertEqual(resultado['errors'][0]['message'], 'Every batch entry must be a JSON query.')
+
+    def test_campo_raiz_repetido_resolvido_uma_vez(self):
+        grupo = AuthGroup.objects.create(name='avaliadores')
+        consulta = {'query': '{ grupo(id: %d) { name } }' % grupo.pk}
+
+        with CaptureQueriesContext(connection) as consultas:
+            status, resultado = self.graphql([consulta, consulta, consulta])
+
+        self.assertEqual([item['data'] for item in resultado], [{'grupo': {'name': 'avaliadores'}}] * 3)
+        self.assertEqual(len(consultas), 1)
+
+    def test_mutation_limpa_o_cache(self):
+        grupo = AuthGroup.objects.create(name='avaliadores')
+        consulta = {'query': '{ grupo(id: %d) { name } }' % grupo.pk}
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.graphql([consulta, {'query': 'mutation { criarUsuario(username: "novo") { ok } }'}, consulta])
+
+        selects = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('SELECT') and 'auth_group' in q['sql']]
+        self.assertEqual(len(selects), 2)
+
+
+class GraphQLConditionalGetTestCase(SimpleTestCase):
+    consulta = {'query': '{ texto(tamanho: 1) }'}
+
+    def setUp(self):
+        super(GraphQLConditionalGetTestCase, self).setUp()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        cache_compartilhado = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': diretorio.name,
+        }})
+        cache_compartilhado.enable()
+        self.addCleanup(cache_compartilhado.disable)
+        self.view = GraphQLViewDeTeste.as_view()
+        self.factory = RequestFactory()
+        execucao = mock.patch.object(
+            GraphQLViewDeTeste, 'execute_graphql_request', autospec=True,
+            side_effect=GraphQLViewDeTeste.execute_graphql_request
+        )
+        self.execute_graphql_request = execucao.start()
+        self.addCleanup(execucao.stop)
+
+    def get(self, **extra):
+        return self.view(self.factory.get('/graphql/', self.consulta, **extra))
+
+    def test_get_recebe_etag(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], versions.compute_etag(self.consulta['query'], None, None))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_if_none_match_igual_responde_304_sem_executar(self):
+        etag = self.get()['ETag']
+        self.execute_graphql_request.reset_mock()
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        self.execute_graphql_request.assert_not_called()
+
+    def test_etag_comprimido_e_fraco_tambem_valem(self):
+        etag = self.get()['ETag']
+        for tag in (etag[:-1] + '-gzip"', etag[:-1] + '-br"', 'W/' + etag, '"outro", ' + etag[:-1] + '-gzip"'):
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=tag).status_code, 304, tag)
+
+    def test_nova_versao_invalida_o_etag(self):
+        etag = self.get()['ETag']
+        versions.bump(versions.VERSIONED_MODELS[0])
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_sem_etag_com_cache_local_do_processo(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            response = self.get(HTTP_IF_NONE_MATCH='"qualquer"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.execute_graphql_request.assert_called_once()
+
+    def test_post_ignora_if_none_match(self):
+        etag = self.get()['ETag']
+        self.execute_graphql_request.reset_mock()
+
+        response = self.view(self.factory.post(
+            '/graphql/', json.dumps(self.consulta), content_type='application/json', HTTP_IF_NONE_MATCH=etag
+        ))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.execute_graphql_request.assert_called_once()
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200)
+class CompressionMiddlewareTestCase(SimpleTestCase):
+    conteudo = json.dumps({'data': {'texto': 'x' * 1000}}).encode()
+
+    def setUp(self):
+        super(CompressionMiddlewareTestCase, self).setUp()
+        self.factory = RequestFactory()
+
+    def comprimir(self, accept_encoding, conteudo=None, content_type='application/json', caminho='/graphql/',
+                  **headers):
+        response = HttpResponse(self.conteudo if conteudo is None else conteudo, content_type=content_type)
+        for nome, valor in headers.items():
+            response[nome] = valor
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(self.factory.get(caminho, HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_negociacao_do_accept_encoding(self):
+        preferido = 'br' if brotli is not None else 'gzip'
+        casos = {
+            'gzip': 'gzip',
+            'gzip, deflate, br': preferido,
+            '*': preferido,
+            'br;q=0, gzip': 'gzip',
+            'gzip;q=0': None,
+            '*;q=0': None,
+            'deflate': None,
+            '': None,
+        }
+        for accept_encoding, esperado in casos.items():
+            response = self.comprimir(accept_encoding)
+            self.assertEqual(response.get('Content-Encoding'), esperado, accept_encoding)
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_gzip_preserva_o_conteudo(self):
+        response = self.comprimir('gzip')
+        self.assertEqual(gzip.decompress(response.content), self.conteudo)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+
+    @unittest.skipIf(brotli is None, 'brotli não instalado')
+    def test_brotli_preserva_o_conteudo(self):
+        response = self.comprimir('br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.conteudo)
+
+    def test_abaixo_do_limite_nao_comprime(self):
+        response = self.comprimir('gzip', conteudo=self.conteudo[:199])
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_tipo_nao_comprimivel_ou_ja_codificado(self):
+        self.assertFalse(self.comprimir('gzip', content_type='image/png').has_header('Content-Encoding'))
+        response = self.comprimir('gzip', **{'Content-Encoding': 'identity'})
+        self.assertEqual(response['Content-Encoding'], 'identity')
+        self.assertEqual(response.content, self.conteudo)
+
+    def test_so_comprime_json_do_graphql(self):
+        html = b'<input name="csrfmiddlewaretoken" value="x">' * 100
+        self.assertFalse(self.comprimir('gzip', conteudo=html, content_type='text/html').has_header('Content-Encoding'))
+        for caminho in ('/admin/', '/admin/login/'):
+            response = self.comprimir('gzip', conteudo=html, content_type='text/html', caminho=caminho)
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertFalse(self.comprimir('gzip', caminho=caminho).has_header('Content-Encoding'))
+
+    def test_conteudo_que_nao_diminui_fica_como_esta(self):
+        aleatorio = os.urandom(1000)
+        response = self.comprimir('gzip', conteudo=aleatorio)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, aleatorio)
+
+    def test_etag_forte_recebe_a_codificacao(self):
+        self.assertEqual(self.comprimir('gzip', ETag='"abc"')['ETag'], '"abc-gzip"')
+        self.assertEqual(self.comprimir('gzip', ETag='W/"abc"')['ETag'], 'W/"abc"')
+
+
+class EncodersTestCase(SimpleTestCase):
+    dados = {'data': {'quando': datetime.date(2024, 3, 1), 'nome': 'Edital nº 1'}}
+
+    def setUp(self):
+        super(EncodersTestCase, self).setUp()
+        encoder = mock.patch.object(encoders, '_encoder', None)
+        encoder.start()
+        self.addCleanup(encoder.stop)
+
+    def test_auto_prefere_orjson(self):
+        esperado = encoders.OrjsonEncoder if encoders.orjson is not None else encoders.StdlibEncoder
+        self.assertIsInstance(encoders.get_encoder(), esperado)
+
+    @override_settings(GRAPHQL_RESPONSE_ENCODER='django_graphql_movies.encoders.StdlibEncoder')
+    def test_encoder_configurado(self):
+        encoder = encoders.get_encoder()
+        self.assertIsInstance(encoder, encoders.StdlibEncoder)
+        self.assertEqual(encoder.encode(self.dados), '{"data":{"quando":"2024-03-01","nome":"Edital nº 1"}}'.encode())
+
+    @unittest.skipIf(encoders.orjson is None, 'orjson não instalado')
+    def test_encoders_produzem_o_mesmo_json(self):
+        for pretty in (False, True):
+            self.assertEqual(
+                json.loads(encoders.OrjsonEncoder().encode(self.dados, pretty=pretty)),
+                json.loads(encoders.StdlibEncoder().encode(self.dados, pretty=pretty)),
+            )
+
+    def test_saida_formatada_so_com_debug(self):
+        view = GraphQLViewDeTeste.as_view()
+        factory = RequestFactory()
+
+        def consultar():
+            request = factory.post('/graphql/?pretty=1', json.dumps({'query': '{ texto(tamanho: 1) }'}),
+                                   content_type='application/json')
+            return view(request).content
+
+        self.assertEqual(consultar(), b'{"data":{"texto":"x"}}')
+        with override_settings(DEBUG=True):
+            self.assertEqual(json.loads(consultar()), {'data': {'texto': 'x'}})
+            self.assertIn(b'\n  ', consultar())
+
+
+class PubSubTestCase(SimpleTestCase):
+
+    def setUp(self):
+        super(PubSubTestCase, self).setUp()
+        self.broker = InMemoryBroker()
+        set_broker(self.broker)
+        self.addCleanup(set_broker, None)
+
+    def test_observe_filtra_por_argumentos(self):
+        recebidos = []
+        handle = subscriptions.observe('example_app.avaliacao', submissao=7).subscribe(recebidos.append)
+
+        self.broker.publish('example_app.avaliacao', {'id': '1', 'action': 'updated', 'changes': {}, 'keys': {'submissao': '8'}})
+        self.broker.publish('example_app.avaliacao', {'id': '2', 'action': 'updated', 'changes': {}, 'keys': {'submissao': '7'}})
+        handle.dispose()
+        self.broker.publish('example_app.avaliacao', {'id': '3', 'action': 'updated', 'changes': {}, 'keys': {'submissao': '7'}})
+
+        self.assertEqual([evento['id'] for evento in recebidos], ['2'])
+        self.assertEqual(self.broker.subscriber_count('example_app.avaliacao'), 0)
+
+
+class SubscriptionsTestCase(TransactionTestCase):
+
+    def setUp(self):
+        super(SubscriptionsTestCase, self).setUp()
+        self.broker = InMemoryBroker()
+        set_broker(self.broker)
+        self.addCleanup(set_broker, None)
+        rastreados = mock.patch.dict(subscriptions.TRACKED_MODELS, {'auth.Group': (), 'auth.Permission': ('content_type',)})
+        rastreados.start()
+        self.addCleanup(rastreados.stop)
+        subscriptions.connect_signals()
+        self.addCleanup(subscriptions.disconnect_signals)
+        self.eventos = []
+        self.addCleanup(self.broker.subscribe('auth.group', self.eventos.append))
+
+    def test_criacao_publica_todos_os_campos(self):
+        grupo = AuthGroup.objects.create(name='avaliadores')
+        self.assertEqual(self.eventos, [{
+            'id': str(grupo.pk), 'action': 'created', 'changes': {'id': str(grupo.pk), 'name': 'avaliadores'}, 'keys': {},
+        }])
+
+    def test_atualizacao_publica_so_o_que_mudou(self):
+        eventos = []
+        self.addCleanup(self.broker.subscribe('auth.permission', eventos.append))
+        permissao = Permission.objects.order_by('pk').first()
+
+        permissao.name = 'Pode avaliar'
+        permissao.save()
+        permissao.save()
+
+        self.assertEqual(eventos, [{
+            'id': str(permissao.pk), 'action': 'updated', 'changes': {'name': 'Pode avaliar'},
+            'keys': {'content_type': str(permissao.content_type_id)},
+        }])
+
+    def test_campos_adiados_nao_consultam_o_banco(self):
+        pk = AuthGroup.objects.create(name='avaliadores').pk
+        del self.eventos[:]
+
+        with self.assertNumQueries(1):
+            grupo = AuthGroup.objects.only('id').get(pk=pk)
+        grupo.name = 'comissão'
+        grupo.save()
+
+        self.assertEqual([evento['changes'] for evento in self.eventos], [{'name': 'comissão'}])
+
+    def test_publica_apenas_apos_o_commit(self):
+        with transaction.atomic():
+            grupo = AuthGroup.objects.create(name='avaliadores')
+            grupo.delete()
+            self.assertEqual(self.eventos, [])
+        self.assertEqual([evento['action'] for evento in self.eventos], ['created', 'deleted'])
+
+        with self.assertRaises(ZeroDivisionError):
+            with transaction.atomic():
+                AuthGroup.objects.create(name='descartado')
+                1 / 0
+        self.assertEqual(len(self.eventos), 2)
+
+    def test_consumer_entrega_eventos_da_subscription(self):
+        async def cenario():
+            communicator = WebsocketCommunicator(SubscriptionConsumerDeTeste, '/graphql/', subprotocols=['graphql-ws'])
+            await communicator.connect()
+            await communicator.send_json_to({'type': 'connection_init'})
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'connection_ack'})
+
+            await communicator.send_json_to({
+                'type': 'start', 'id': '1', 'payload': {'query': 'subscription { grupoChanged { action changes } }'},
+            })
+            while self.broker.subscriber_count('auth.group') < 2:
+                await asyncio.sleep(0.01)
+
+            await sync_to_async(AuthGroup.objects.create)(name='avaliadores')
+            mensagem = await communicator.receive_json_from(timeout=5)
+
+            await communicator.send_json_to({'type': 'stop', 'id': '1'})
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'complete', 'id': '1'})
+            await communicator.disconnect()
+            return mensagem
+
+        mensagem = async_to_sync(cenario)()
+
+        self.assertEqual(mensagem['type'], 'data')
+        self.assertEqual(mensagem['payload']['data']['grupoChanged']['action'], 'created')
+        self.assertEqual(mensagem['payload']['data']['grupoChanged']['changes']['name'], 'avaliadores')
+        self.assertEqual(self.broker.subscriber_count('auth.group'), 1)
+
+
+class DadosSinteticosTestCase(TestCase):
+
+    def setUp(self):
+        super(DadosSinteticosTestCase, self).setUp()
+        google = mock.patch.object(
+            example_models.GoogleCloudCredential, 'build_service',
+            side_effect=AssertionError('chamada à API real do Google')
+        )
+        self.build_service = google.start()
+        self.addCleanup(google.stop)
+
+    def test_gera_massa_de_dados(self):
+        drive = FakeDrive()
+        totais = sinteticos.gerar(
+            editais=3, inscricoes_por_edital=4, membros_por_inscricao=2, servidores=10,
+            avaliadores_por_edital=5, portarias=2, drive=drive
+        )
+
+        self.assertEqual(totais['editais'], 3)
+        self.assertEqual(totais['inscricoes'], 12)
+        self.assertEqual(totais['membros'], 24)
+        self.assertEqual(totais['avaliadores'], totais['submissoes'] * 2)
+        self.assertEqual(example_models.Inscricao.objects.count(), 12)
+        self.assertEqual(drive.calls['files.copy'], 12)
+        self.assertEqual(drive.calls['permissions.create'], 24)
+        self.build_service.assert_not_called()
+        for inscricao in example_models.Inscricao.objects.select_related('ppc').prefetch_related('membros'):
+            permissoes = drive.permissoes(inscricao.ppc.google_id)
+            for membro in inscricao.membros.all():
+                self.assertEqual(permissoes[membro.email_institucional], 'writer')
+
+    def test_fake_drive_no_lugar_do_google_cloud(self):
+        drive = FakeDrive(page_size=2)
+        original = drive.criar_arquivo('Modelo')
+        arquivo = example_models.ArquivoGoogleDocs(google_id=original['id'])
+
+        with drive.instalar():
+            arquivo.adicionar_permissao('a@example.com', 'writer')
+            arquivo.adicionar_permissao('b@example.com', 'reader')
+            clone = arquivo.clonar('Clone')
+
+        self.assertEqual(drive.calls, {'permissions.create': 2, 'files.copy': 1})
+        self.build_service.assert_not_called()
+        self.assertEqual(drive.permissoes(arquivo.google_id)['b@example.com'], 'reader')
+        self.assertIn('nextPageToken', drive.permissions().list(fileId=arquivo.google_id).execute())
+        self.assertIn(clone.google_id, drive.arquivos)
+
+
+class FakeDriveServerTestCase(TestCase):
+
+    def setUp(self):
+        super(FakeDriveServerTestCase, self).setUp()
+        self.servidor = FakeDriveServer(FakeDrive(page_size=2)).start()
+        self.addCleanup(self.servidor.stop)
+        settings_override = override_settings(GOOGLE_API_ENDPOINT=self.servidor.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        example_models.GoogleCloudCredential.objects.create(
+            service_name='fake', credentials_content=json.dumps({'token': 'fake'})
+        )
+        original = self.servidor.drive.criar_arquivo('Modelo')
+        self.modelo = example_models.ModeloPPC.objects.create(nome='Modelo', google_id=original['id'])
+
+    def test_contagem_de_chamadas(self):
+        clone = self.modelo.clonar('Clone')
+        clone.adicionar_permissao('a@example.com', 'writer')
+        self.assertTrue(clone.download().startswith(b'%PDF'))
+
+        self.assertEqual(self.servidor.drive.calls, {'files.copy': 1, 'permissions.create': 1, 'files.export': 1})
+        self.assertEqual(self.servidor.http_requests['api'], 3)
+        self.assertGreaterEqual(self.servidor.http_requests['discovery'], 1)
+        self.assertEqual(self.servidor.drive.permissoes(clone.google_id)['a@example.com'], 'writer')
+
+    def test_erro_de_cota(self):
+        from googleapiclient.errors import HttpError
+
+        self.servidor.quota_every = 1
+        with self.assertRaises(HttpError) as contexto:
+            self.modelo.adicionar_permissao('a@example.com', 'writer')
+        self.assertEqual(contexto.exception.resp.status, 403)
+        self.assertEqual(self.servidor.http_requests['api'], 1)
+        self.assertNotIn('permissions.create', self.servidor.drive.calls)
+        self.assertNotIn('a@example.com', self.servidor.drive.permissoes(self.modelo.google_id))
+
+
+class PermissoesPaginadasTestCase(SimpleTestCase):
+
+    def setUp(self):
+        super(PermissoesPaginadasTestCase, self).setUp()
+        self.drive = FakeDrive(page_size=2)
+        original = self.drive.criar_arquivo('PPC')
+        for i in range(4):
+            self.drive.permissions().create(
+                fileId=original['id'], body={'role': 'writer', 'emailAddress': 'm{}@example.com'.format(i)}
+            ).execute()
+        self.drive.calls.clear()
+        self.arquivo = example_models.ArquivoGoogleDocs(google_id=original['id'])
+        instalacao = self.drive.instalar()
+        instalacao.__enter__()
+        self.addCleanup(instalacao.__exit__, None, None, None)
+
+    def test_percorre_todas_as_paginas(self):
+        emails = [perm['emailAddress'] for perm in self.arquivo.listar_permissoes()]
+        self.assertEqual(len(emails), 5)
+        self.assertEqual(self.drive.calls['permissions.list'], 3)
+
+    def test_indice_lista_uma_vez(self):
+        self.assertTrue(self.arquivo.verificar_permissao('m3@example.com', 'writer'))
+        self.arquivo.atualizar_permissao('m3@example.com', 'commenter')
+        self.arquivo.remover_permissao('m0@example.com')
+        self.arquivo.adicionar_permissao('novo@example.com', 'reader')
+
+        self.assertTrue(self.arquivo.verificar_permissao('m3@example.com', 'commenter'))
+        self.assertFalse(self.arquivo.verificar_permissao('m0@example.com', 'writer'))
+        self.assertTrue(self.arquivo.verificar_permissao('novo@example.com', 'reader'))
+        self.assertEqual(self.drive.calls['permissions.list'], 3)
+        self.assertEqual(self.drive.permissoes(self.arquivo.google_id)['m3@example.com'], 'commenter')
+
+    def test_remover_permissoes_remove_todas_as_paginas(self):
+        self.arquivo.remover_permissoes()
+        permissoes = self.drive.permissoes(self.arquivo.google_id)
+        self.assertNotIn('m1@example.com', permissoes)
+        self.assertEqual(list(permissoes.values()), ['owner'])
+        self.assertEqual(self.drive.calls['permissions.delete'], 4)
+
+    def test_atualizar_permissoes_atualiza_todas_as_paginas(self):
+        self.arquivo.atualizar_permissoes('reader')
+        permissoes = self.drive.permissoes(self.arquivo.google_id)
+        self.assertEqual(sorted(permissoes.values()), ['owner', 'reader', 'reader', 'reader', 'reader'])
+
+
+class AdminChangelistTestCase(TestCase):
+
+    def setUp(self):
+        super(AdminChangelistTestCase, self).setUp()
+        usuario = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.force_login(usuario)
+
+    def consultas(self, url):
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(capturadas)
+
+    def test_consultas_nao_crescem_com_a_pagina(self):
+        sinteticos.gerar(editais=1, inscricoes_por_edital=2, servidores=10, avaliadores_por_edital=5, portarias=1)
+        pequenas = {
+            nome: self.consultas(reverse('admin:example_app_{}_changelist'.format(nome)))
+            for nome in ('inscricao', 'submissao', 'avaliacao')
+        }
+        sinteticos.gerar(editais=3, inscricoes_por_edital=10, servidores=10, avaliadores_por_edital=5, portarias=1)
+        for nome, quantidade in pequenas.items():
+            url = reverse('admin:example_app_{}_changelist'.format(nome))
+            self.assertEqual(self.consultas(url), quantidade, nome)
+            self.assertLessEqual(quantidade, 10, nome)
+
+    def test_busca_por_id_e_prefixo(self):
+        sinteticos.gerar(editais=2, inscricoes_por_edital=2, servidores=10, avaliadores_por_edital=5, portarias=1)
+        inscricao = example_models.Inscricao.objects.select_related('edital').first()
+        admin_inscricao = site._registry[example_models.Inscricao]
+
+        queryset, _ = admin_inscricao.get_search_results(None, example_models.Inscricao.objects.all(), str(inscricao.id))
+        self.assertIn(inscricao, queryset)
+        for prefixo in (inscricao.edital.nome[:10], inscricao.edital.nome[:10].upper()):
+            queryset, _ = admin_inscricao.get_search_results(None, example_models.Inscricao.objects.all(), prefixo)
+            self.assertIn(inscricao, queryset)
+        self.assertEqual([lookup.lookup_name for lookup in queryset.query.where.children], ['istartswith'])
+
+    def test_indice_do_prefixo_usa_upper_no_postgresql(self):
+        indice = example_models.Edital._meta.indexes[0]
+        schema_editor = mock.MagicMock()
+        schema_editor.connection.vendor = 'postgresql'
+        schema_editor.quote_name.side_effect = '"{}"'.format
+        with mock.patch.object(Index, 'create_sql', return_value=mock.Mock(parts={'columns': '"nome"'})):
+            statement = indice.create_sql(example_models.Edital, schema_editor)
+        self.assertEqual(statement.parts['columns'], 'UPPER("nome") varchar_pattern_ops')
+
+
+@jobs.job(nome='testes.falha', max_tentativas=2, backoff=60, concorrencia=1)
+def job_que_falha():
+    raise ValueError('falhou')
+
+
+@jobs.job(nome='testes.registra', prioridade=5)
+def job_que_registra(valor):
+    JobsTestCase.executados.append(valor)
+
+
+class JobsTestCase(TestCase):
+    executados = []
+
+    def setUp(self):
+        super(JobsTestCase, self).setUp()
+        JobsTestCase.executados = []
+
+    def test_prioridade_e_chave(self):
+        job_que_registra.apply_async(args=[1], prioridade=0)
+        primeiro = job_que_registra.apply_async(args=[2], chave='dois')
+        repetido = job_que_registra.apply_async(args=[2], chave='dois')
+
+        self.assertEqual(primeiro.id, repetido.id)
+        self.assertEqual(jobs.processar(), 2)
+        self.assertEqual(JobsTestCase.executados, [2, 1])
+        self.assertEqual(example_models.Job.objects.filter(status=example_models.Job.CONCLUIDO).count(), 2)
+
+    def test_nova_tentativa_com_backoff(self):
+        job = job_que_falha.delay()
+        jobs.processar()
+        job.refresh_from_db()
+        self.assertEqual(job.status, example_models.Job.PENDENTE)
+        self.assertEqual(job.tentativas, 1)
+        self.assertGreater(job.executar_em, timezone.now() + datetime.timedelta(seconds=50))
+        self.assertIn('ValueError', job.ultimo_erro)
+
+        example_models.Job.objects.filter(id=job.id).update(executar_em=timezone.now())
+        jobs.processar()
+        job.refresh_from_db()
+        self.assertEqual(job.status, example_models.Job.FALHOU)
+
+    def test_liberar_travados_respeita_chave_pendente(self):
+        antigo = timezone.now() - datetime.timedelta(hours=1)
+        travado = job_que_registra.apply_async(args=[1], chave='um')
+        sem_chave = job_que_registra.delay(2)
+        example_models.Job.objects.filter(id__in=[travado.id, sem_chave.id]).update(
+            status=example_models.Job.EXECUTANDO, reservado_em=antigo
+        )
+        novo = job_que_registra.apply_async(args=[1], chave='um')
+
+        self.assertEqual(jobs.liberar_travados(), 1)
+        status = dict(example_models.Job.objects.values_list('id', 'status'))
+        self.assertEqual(status[travado.id], example_models.Job.FALHOU)
+        self.assertEqual(status[sem_chave.id], example_models.Job.PENDENTE)
+        self.assertEqual(status[novo.id], example_models.Job.PENDENTE)
+
+    def test_falha_de_job_substituido_nao_volta_a_fila(self):
+        antigo = job_que_falha.apply_async(chave='falha')
+        reservado = jobs.reservar('worker-1')
+        novo = job_que_falha.apply_async(chave='falha')
+        jobs.executar(reservado)
+
+        antigo.refresh_from_db()
+        self.assertEqual(antigo.status, example_models.Job.FALHOU)
+        self.assertEqual(list(
+            example_models.Job.objects.filter(status=example_models.Job.PENDENTE).values_list('id', flat=True)
+        ), [novo.id])
+
+    def test_limite_de_concorrencia(self):
+        job_que_falha.delay()
+        job_que_falha.delay()
+        self.assertIsNotNone(jobs.reservar('worker-1'))
+        self.assertIsNone(jobs.reservar('worker-2'))
+
+    def test_criar_documento_fora_da_requisicao(self):
+        drive = FakeDrive()
+        modelo = example_models.ModeloPPC.objects.create(nome='Modelo')
+        tasks.criar_documento.delay(modelo.id)
+        self.assertEqual(drive.calls['documents.create'], 0)
+
+        with drive.instalar():
+            jobs.processar()
+        modelo.refresh_from_db()
+        self.assertEqual(drive.calls['documents.create'], 1)
+        self.assertIn(modelo.google_id, drive.arquivos)
+
+
+class AgendamentoTestCase(TestCase):
+
+    def edital(self, inicio_analise):
+        dia = datetime.timedelta(days=1)
+        return mommy.make(
+            example_models.Edital,
+            inicio_inscricao=inicio_analise - 10 * dia,
+            fim_inscricao=inicio_analise - dia,
+            inicio_analise=inicio_analise,
+            fim_analise=inicio_analise + 5 * dia,
+            inicio_ajuste=inicio_analise + 7 * dia,
+            fim_ajuste=inicio_analise + 10 * dia,
+            data_resultado=inicio_analise + 12 * dia,
+        )
+
+    def pendentes(self, edital):
+        return dict(
+            example_models.Job.objects.filter(chave__startswith=agendamento.chave(edital.id))
+            .values_list('chave', 'executar_em')
+        )
+
+    def test_agenda_transicoes_futuras(self):
+        edital = self.edital(datetime.date.today() + datetime.timedelta(days=3))
+        pendentes = self.pendentes(edital)
+
+        self.assertEqual(set(pendentes), {agendamento.chave(edital.id, fase) for fase in agendamento.METODOS})
+        self.assertEqual(
+            timezone.localtime(pendentes[agendamento.chave(edital.id, 'pre_ajuste')]).date(),
+            edital.fim_analise + datetime.timedelta(days=1)
+        )
+
+    def test_salvar_refaz_agenda_e_aplica_fase_atual(self):
+        edital = self.edital(datetime.date.today() + datetime.timedelta(days=3))
+        edital.inicio_analise = datetime.date.today()
+        edital.save()
+        pendentes = self.pendentes(edital)
+
+        self.assertEqual(len(pendentes), 4)
+        self.assertLessEqual(pendentes[agendamento.chave(edital.id, 'analise')], timezone.now())
+
+    def test_salvar_sem_mudar_datas_nao_enfileira(self):
+        edital = self.edital(datetime.date.today() + datetime.timedelta(days=3))
+        antes = list(example_models.Job.objects.order_by('id').values_list('id', 'executar_em'))
+        edital.nome = 'Outro nome'
+        edital.save()
+        edital.save(update_fields=['nome'])
+
+        self.assertEqual(list(example_models.Job.objects.order_by('id').values_list('id', 'executar_em')), antes)
+
+    def test_ultima_fase_aplicada_nao_e_reenfileirada(self):
+        edital = self.edital(datetime.date.today() - datetime.timedelta(days=30))
+        self.assertEqual(list(self.pendentes(edital)), [agendamento.chave(edital.id, 'pos_ajuste')])
+        jobs.processar()
+
+        edital.fim_analise -= datetime.timedelta(days=1)
+        edital.save()
+        self.assertFalse(example_models.Job.objects.filter(status=example_models.Job.PENDENTE).exists())
+
+    def test_periodo_ajuste_perms_so_aplica_pos_ajuste_de_quem_fechou_ontem(self):
+        hoje = datetime.date.today()
+        fechou_ontem = self.edital(hoje - datetime.timedelta(days=11))
+        self.edital(hoje - datetime.timedelta(days=60))
+
+        with mock.patch.object(example_models.Edital, 'aplicar_permissoes_pos_ajuste', autospec=True) as pos_ajuste:
+            example_models.Submissao.periodo_ajuste_perms()
+
+        pos_ajuste.assert_called_once_with(fechou_ontem)
+
+    def test_transicao_processa_so_o_edital(self):
+        drive = FakeDrive()
+        sinteticos.gerar(editais=2, inscricoes_por_edital=2, servidores=10, avaliadores_por_edital=5,
+                         portarias=1, taxa_submissao=1, drive=drive)
+        edital = example_models.Edital.objects.earliest('id')
+        drive.calls.clear()
+
+        with drive.instalar():
+            tasks.transicao_fase(edital.id, 'analise')
+
+        self.assertEqual(drive.calls['permissions.list'], 2)
+        self.assertEqual(drive.calls['permissions.create'], 4)
+
+
+@override_settings(UPLOADS_BUCKET='testes', UPLOADS_PART_SIZE=5 * 2 ** 20, UPLOADS_PARALLEL_PARTS=2)
+class UploadsTestCase(TestCase):
+    parte = 5 * 2 ** 20
+
+    def setUp(self):
+        super(UploadsTestCase, self).setUp()
+        self.s3 = FakeS3Client()
+        uploads.set_client(self.s3)
+        self.addCleanup(uploads.set_client, None)
+        self.usuario = User.objects.create_superuser('uploader', 'uploader@example.com', 'senha')
+        self.client.force_login(self.usuario)
+
+    def test_multipart_upload_envia_partes_de_tamanho_fixo(self):
+        conteudo = bytes(range(256)) * (12 * 2 ** 20 // 256)
+        upload = uploads.MultipartUpload(self.s3, 'testes', 'editais_ppc/editais/a.pdf')
+        for inicio in range(0, len(conteudo), 64 * 1024):
+            upload.write(conteudo[inicio:inicio + 64 * 1024])
+        upload.concluir()
+
+        self.assertEqual(self.s3.objects[('testes', 'editais_ppc/editais/a.pdf')], conteudo)
+        self.assertEqual(self.s3.calls['upload_part'], 3)
+        self.assertEqual(self.s3.uploads, {})
+
+    def test_handler_envia_arquivo_durante_a_requisicao(self):
+        conteudo = b'%PDF-1.4 ' + b'x' * (6 * 2 ** 20)
+        request = RequestFactory().post('/', {'arquivo': SimpleUploadedFile('edital final.pdf', conteudo)})
+        request.upload_handlers = [uploads.S3MultipartUploadHandler(request, 'editais_ppc/editais')]
+
+        arquivo = request.FILES['arquivo']
+        self.assertIsInstance(arquivo, uploads.ArquivoEnviado)
+        self.assertEqual(arquivo.size, len(conteudo))
+        self.assertTrue(arquivo.chave_armazenada.startswith('editais_ppc/editais/'))
+        self.assertTrue(arquivo.chave_armazenada.endswith('/edital_final.pdf'))
+        self.assertEqual(self.s3.objects[('testes', arquivo.chave_armazenada)], conteudo)
+        self.assertEqual(arquivo.read(9), b'%PDF-1.4 ')
+
+        storage = LazyMinioMediaStorage()
+        self.assertEqual(storage.save('editais_ppc/editais/outro.pdf', arquivo), arquivo.chave_armazenada)
+        self.assertEqual(self.s3.calls['put_object'], 0)
+
+    def test_upload_retomavel(self):
+        documento = example_models.Documento.objects.create(nome='Regimento')
+        resposta = self.client.post(
+            reverse('uploads:iniciar'), json.dumps({'destino': 'documento', 'nome': 'regimento.pdf'}),
+            content_type='application/json'
+        )
+        self.assertEqual(resposta.status_code, 201)
+        identificador = resposta.json()['id']
+        partes = [b'a' * self.parte, b'b' * 1000]
+
+        # Fora de ordem; a primeira parte é reenviada como depois de uma queda.
+        for numero in (2, 1, 1):
+            resposta = self.client.put(
+                reverse('uploads:parte', args=[identificador, numero]), partes[numero - 1],
+                content_type='application/octet-stream'
+            )
+            self.assertEqual(resposta.status_code, 200)
+
+        estado = self.client.get(reverse('uploads:upload', args=[identificador])).json()
+        self.assertEqual([parte['numero'] for parte in estado['partes']], [1, 2])
+        self.assertEqual(estado['recebido'], self.parte + 1000)
+
+        resposta = self.client.post(
+            reverse('uploads:concluir', args=[identificador]), json.dumps({'objeto': documento.id}),
+            content_type='application/json'
+        )
+        self.assertEqual(resposta.status_code, 200)
+        documento.refresh_from_db()
+        self.assertEqual(documento.arquivo.name, resposta.json()['chave'])
+        self.assertEqual(self.s3.objects[('testes', documento.arquivo.name)], b''.join(partes))
+
+    def test_upload_retomavel_recusa_formato_e_partes_faltando(self):
+        resposta = self.client.post(
+            reverse('uploads:iniciar'), json.dumps({'destino': 'edital', 'nome': 'edital.docx'}),
+            content_type='application/json'
+        )
+        self.assertEqual(resposta.status_code, 400)
+
+        upload = uploads.iniciar(self.usuario, 'edital', 'edital.pdf')
+        self.client.put(
+            reverse('uploads:parte', args=[upload.identificador, 2]), b'x', content_type='application/octet-stream'
+        )
+        resposta = self.client.post(reverse('uploads:concluir', args=[upload.identificador]))
+        self.assertEqual(resposta.status_code, 400)
+
+        resposta = self.client.delete(reverse('uploads:upload', args=[upload.identificador]))
+        self.assertEqual(resposta.json()['status'], 'Abortado')
+        self.assertEqual(self.s3.uploads, {})
+
+    def test_upload_retomavel_recusa_parte_intermediaria_pequena(self):
+        upload = uploads.iniciar(self.usuario, 'edital', 'edital.pdf')
+        for numero, parte in ((1, b'a' * 1000), (2, b'b' * 10)):
+            self.client.put(
+                reverse('uploads:parte', args=[upload.identificador, numero]), parte,
+                content_type='application/octet-stream'
+            )
+        resposta = self.client.post(reverse('uploads:concluir', args=[upload.identificador]))
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('[1]', resposta.json()['erro'])
+        self.assertEqual(self.s3.calls['complete_multipart_upload'], 0)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, example_models.UploadMultipart.ABERTO)
+
+    def test_erros_do_s3_viram_400_ou_502(self):
+        upload = uploads.iniciar(self.usuario, 'edital', 'edital.pdf')
+        with mock.patch.object(self.s3, 'upload_part', side_effect=FakeS3Error('InternalError')):
+            resposta = self.client.put(
+                reverse('uploads:parte', args=[upload.identificador, 1]), b'x',
+                content_type='application/octet-stream'
+            )
+        self.assertEqual(resposta.status_code, 502)
+
+        self.s3.uploads.clear()
+        resposta = self.client.get(reverse('uploads:upload', args=[upload.identificador]))
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('NoSuchUpload', resposta.json()['erro'])
+
+    def test_admin_apaga_arquivo_de_formulario_invalido(self):
+        url = reverse('admin:example_app_documento_add')
+        resposta = self.client.post(url, {'arquivo': SimpleUploadedFile('regimento.pdf', b'%PDF-1.4 x')})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(self.s3.calls['complete_multipart_upload'], 1)
+        self.assertEqual(self.s3.objects, {})
+
+        self.client.post(url, {'nome': 'Regimento', 'arquivo': SimpleUploadedFile('regimento.pdf', b'%PDF-1.4 x')})
+        documento = example_models.Documento.objects.get(nome='Regimento')
+        self.assertEqual(list(self.s3.objects), [('testes', documento.arquivo.name)])
+
+
+class CredenciaisTestCase(TestCase):
+
+    def setUp(self):
+        super(CredenciaisTestCase, self).setUp()
+        metrics.reset()
+        self.addCleanup(credenciais.invalidar)
+        expirado = (datetime.datetime.utcnow() - datetime.timedelta(hours=1)).strftime(credenciais.FORMATO_EXPIRY)
+        self.credencial = example_models.GoogleCloudCredential.objects.create(
+            service_name='drive', credentials_content=json.dumps({
+                'token': 'velho', 'refresh_token': 'refresh', 'token_uri': 'https://oauth2.example.com/token',
+                'client_id': 'id', 'client_secret': 'segredo', 'scopes': None, 'expiry': expirado,
+            })
+        )
+
+    def renovar(self, credentials, request):
+        credentials.token = 'novo'
+        credentials.expiry = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+
+    def instancia(self):
+        return example_models.GoogleCloudCredential.objects.get(pk=self.credencial.pk)
+
+    def test_uma_renovacao_e_token_gravado(self):
+        with mock.patch.object(Credentials, 'refresh', autospec=True, side_effect=self.renovar) as refresh:
+            primeira = self.instancia().credentials
+            segunda = self.instancia().credentials
+            # Outro processo: cache vazio e instância com o token antigo.
+            credenciais.invalidar()
+            terceira = self.credencial.credentials
+
+        self.assertEqual(refresh.call_count, 1)
+        self.assertIs(primeira, segunda)
+        self.assertEqual(terceira.token, 'novo')
+        self.assertEqual(json.loads(self.instancia().credentials_content)['token'], 'novo')
+        self.assertEqual(credenciais.renovacoes.value(service='drive', result='refreshed'), 1)
+        self.assertEqual(credenciais.renovacoes.value(service='drive', result='reused'), 1)
+        self.assertEqual(credenciais.consultas.value(result='hit'), 1)
+        self.assertIn('google_credentials_refresh_total{service="drive",result="refreshed"} 1', metrics.render())
+
+    def test_salvar_invalida_cache(self):
+        with mock.patch.object(Credentials, 'refresh', autospec=True, side_effect=self.renovar):
+            antiga = self.instancia().credentials
+        credencial = self.instancia()
+        credencial.credentials_content = json.dumps({'token': 'reautorizado'})
+        credencial.save()
+
+        self.assertIsNot(self.instancia().credentials, antiga)
+        self.assertEqual(self.instancia().credentials.token, 'reautorizado')
+
+
+class InstrumentacaoTestCase(TestCase):
+
+    def setUp(self):
+        super(InstrumentacaoTestCase, self).setUp()
+        metrics.reset()
+        self.servidor = FakeDriveServer(FakeDrive()).start()
+        self.addCleanup(self.servidor.stop)
+        settings_override = override_settings(GOOGLE_API_ENDPOINT=self.servidor.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        example_models.GoogleCloudCredential.objects.create(
+            service_name='fake', credentials_content=json.dumps({'token': 'fake'})
+        )
+        original = self.servidor.drive.criar_arquivo('Modelo')
+        self.modelo = example_models.ModeloPPC.objects.create(nome='Modelo', google_id=original['id'])
+
+    def test_metodo_status_e_origem(self):
+        clone = self.modelo.clonar('Clone')
+        clone.adicionar_permissao('a@example.com', 'writer')
+
+        requisicoes = instrumentacao.requisicoes
+        self.assertEqual(requisicoes.value(method='drive.files.copy', status='200', origin='ModeloPPC.clonar'), 1)
+        self.assertEqual(requisicoes.value(
+            method='drive.permissions.create', status='200', origin='ModeloPPC.adicionar_permissao'
+        ), 1)
+        self.assertEqual(instrumentacao.duracao.count(method='drive.files.copy', origin='ModeloPPC.clonar'), 1)
+        self.assertIn('google_api_request_duration_seconds_bucket{method="drive.files.copy"', metrics.render())
+
+    def test_download_e_medido_e_conta_no_orcamento(self):
+        instrumentacao.iniciar_orcamento()
+        self.assertTrue(self.modelo.download().startswith(b'%PDF'))
+
+        self.assertEqual(instrumentacao.encerrar_orcamento(), 1)
+        self.assertEqual(instrumentacao.requisicoes.value(
+            method='drive.files.export', status='200', origin='ModeloPPC.download'
+        ), 1)
+        self.assertEqual(instrumentacao.duracao.count(method='drive.files.export', origin='ModeloPPC.download'), 1)
+
+    def test_erro_de_cota(self):
+        from googleapiclient.errors import HttpError
+
+        self.servidor.quota_every = 1
+        with self.assertRaises(HttpError):
+            self.modelo.adicionar_permissao('a@example.com', 'writer')
+        self.assertEqual(instrumentacao.erros_cota.value(method='drive.permissions.create'), 1)
+        self.assertEqual(instrumentacao.requisicoes.value(
+            method='drive.permissions.create', status='403', origin='ModeloPPC.adicionar_permissao'
+        ), 1)
+
+    def test_orcamento_por_requisicao(self):
+        def view(request):
+            for i in range(3):
+                self.modelo.adicionar_permissao('{}@example.com'.format(i), 'reader')
+            return HttpResponse()
+
+        middleware = OrcamentoGoogleMiddleware(view)
+        request = RequestFactory().post('/')
+        with override_settings(GOOGLE_API_CALL_BUDGET=2):
+            with self.assertLogs('example_app.instrumentacao', 'WARNING'):
+                middleware(request)
+        self.assertEqual(instrumentacao.chamadas_por_requisicao.sum(view=''), 3)
+        self.assertEqual(instrumentacao.orcamentos_excedidos.value(view=''), 1)
+
+        with override_settings(GOOGLE_API_CALL_BUDGET=2, GOOGLE_API_CALL_BUDGET_STRICT=True):
+            with self.assertRaises(instrumentacao.OrcamentoExcedido):
+                middleware(request)
+        self.assertEqual(self.servidor.drive.calls['permissions.create'], 5)
+
+
+class PragmasSQLiteTestCase(SimpleTestCase):
+
+    def test_pragmas_aplicados_na_conexao(self):
+        diretorio = tempfile.mkdtemp()
+        settings_dict = dict(
+            connection.settings_dict, NAME=os.path.join(diretorio, 'pragmas.sqlite3'),
+            PRAGMAS={'journal_mode': 'WAL', 'busy_timeout': 1234}
+        )
+        wrapper = SQLiteDatabaseWrapper(settings_dict, alias='pragmas')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+
+class PoolDeTeste(object):
+    falhas = 0
+    conexoes = ()
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.falhas = PoolDeTeste.falhas
+        self.conexoes = list(PoolDeTeste.conexoes)
+        self.devolvidas = []
+        self.descartadas = []
+
+    def getconn(self):
+        if self.falhas:
+            self.falhas -= 1
+            raise psycopg2.pool.PoolError('connection pool exhausted')
+        if self.conexoes:
+            return self.conexoes.pop(0)
+        return mock.MagicMock(isolation_level=1, closed=0)
+
+    def putconn(self, conn, close=False):
+        (self.descartadas if close else self.devolvidas).append(conn)
+
+    def closeall(self):
+        pass
+
+
+@unittest.skipIf(psycopg2 is None, 'psycopg2 não instalado')
+class PoolPostgreSQLTestCase(SimpleTestCase):
+
+    def wrapper(self, alias, falhas, timeout, conexoes=(), health_checks=False):
+        from django_graphql_movies.db.backends.postgresql_pool import base
+
+        PoolDeTeste.falhas = falhas
+        PoolDeTeste.conexoes = conexoes
+        self.addCleanup(setattr, PoolDeTeste, 'conexoes', ())
+        self.addCleanup(base.close_pools)
+        return base.DatabaseWrapper({
+            'ENGINE': 'django_graphql_movies.db.backends.postgresql_pool', 'NAME': 'teste', 'USER': '',
+            'PASSWORD': '', 'HOST': '', 'PORT': '', 'CONN_MAX_AGE': 0, 'AUTOCOMMIT': True, 'TIME_ZONE': None,
+            'ATOMIC_REQUESTS': False, 'TEST': {}, 'CONN_HEALTH_CHECKS': health_checks,
+            'OPTIONS': {'POOL': {'CLASS': 'example_app.tests.PoolDeTeste', 'TIMEOUT': timeout}},
+        }, alias=alias)
+
+    def test_espera_conexao_livre(self):
+        wrapper = self.wrapper('pool_espera', falhas=2, timeout=1)
+        conexao = wrapper.get_new_connection(wrapper.get_connection_params())
+        self.assertEqual(wrapper.pool.falhas, 0)
+        wrapper.connection = conexao
+        wrapper._close()
+        self.assertEqual(wrapper.pool.devolvidas, [conexao])
+
+    def test_conexao_quebrada_e_descartada_no_checkout(self):
+        fechada = mock.MagicMock(isolation_level=1, closed=1)
+        morta = mock.MagicMock(isolation_level=1, closed=0)
+        morta.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError
+        boa = mock.MagicMock(isolation_level=1, closed=0)
+        wrapper = self.wrapper('pool_saude', falhas=0, timeout=1, conexoes=[fechada, morta, boa], health_checks=True)
+
+        self.assertIs(wrapper.get_new_connection(wrapper.get_connection_params()), boa)
+        self.assertEqual(wrapper.pool.descartadas, [fechada, morta])
+        boa.cursor.return_value.__enter__.return_value.execute.assert_called_once_with('SELECT 1')
+        boa.rollback.assert_called_once_with()
+
+    def test_pool_esgotado_levanta_erro(self):
+        wrapper = self.wrapper('pool_esgotado', falhas=1000, timeout=0.1)
+        with self.assertRaises(psycopg2.pool.PoolError):
+            wrapper.get_new_connection(wrapper.get_connection_params())
+
+
+class ImporttimeTestCase(SimpleTestCase):
+    saida = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       209 |        209 |   _io\n'
+        'import time:       432 |       1307 | _frozen_importlib_external\n'
+        'import time:        62 |         62 |     _codecs\n'
+        'import time:       397 |        458 |   codecs\n'
+        'import time:       813 |       1797 | encodings\n'
+        'Traceback (most recent call last):\n'
+        '  File "<string>", line 1, in <module>\n'
+        "ModuleNotFoundError: No module named 'naoexiste'\n"
+    )
+
+    def test_linhas_viram_modulo_tempos_e_profundidade(self):
+        self.assertEqual(parse_importtime(self.saida), [
+            ('_io', 209, 209, 1),
+            ('_frozen_importlib_external', 432, 1307, 0),
+            ('_codecs', 62, 62, 2),
+            ('codecs', 397, 458, 1),
+            ('encodings', 813, 1797, 0),
+        ])
+
+    def test_saida_sem_importtime(self):
+        self.assertEqual(parse_importtime(''), [])
+        self.assertEqual(parse_importtime('import time: self [us] | cumulative | imported package'), [])
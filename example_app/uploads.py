@@ -0,0 +1,466 @@
+"""
+Envio de arquivos grandes direto para o MinIO com multipart upload do S3.
+
+Dois caminhos, ambos sem gravar o arquivo inteiro em memória ou em disco:
+
+- ``S3MultipartUploadHandler`` substitui os upload handlers do Django em
+  formulários comuns (``streaming_uploads``/``StreamingUploadsAdminMixin``):
+  os pedaços do corpo da requisição vão sendo agrupados em partes de
+  ``UPLOADS_PART_SIZE`` bytes e enviadas em paralelo enquanto o resto do
+  arquivo ainda está chegando. O ``ArquivoEnviado`` resultante já está no
+  bucket, e ``LazyMinioMediaStorage.save`` só grava a chave no model.
+
+- Uploads retomáveis (``UploadMultipart`` + ``example_app.views``): o
+  cliente abre o upload, envia as partes com ``PUT`` (em qualquer ordem, em
+  paralelo, repetindo as que falharem), consulta as partes recebidas para
+  retomar depois de uma queda e conclui anexando o arquivo a um ``Edital``
+  ou ``Documento``. As partes recebidas são sempre lidas do S3.
+
+A memória usada por arquivo é limitada a ``UPLOADS_PART_SIZE`` vezes
+(``UPLOADS_PARALLEL_PARTS`` + 1).
+"""
+import io
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.module_loading import import_string
+from django.utils.text import get_valid_filename
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+MIN_PART_SIZE = 5 * 2 ** 20
+
+# Códigos de erro do S3 causados pelo pedido do cliente (400); os demais
+# são falhas do armazenamento (502).
+ERROS_DO_CLIENTE = {'NoSuchUpload', 'InvalidPart', 'InvalidPartOrder', 'EntityTooSmall', 'InvalidArgument'}
+
+# destino -> (model, campo, prefixo da chave no bucket)
+DESTINOS = {
+    'edital': ('Edital', 'arquivo', 'editais_ppc/editais'),
+    'documento': ('Documento', 'arquivo', 'editais_ppc/documentos'),
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def part_size():
+    return max(getattr(settings, 'UPLOADS_PART_SIZE', 8 * 2 ** 20), MIN_PART_SIZE)
+
+
+def parallel_parts():
+    return getattr(settings, 'UPLOADS_PARALLEL_PARTS', 4)
+
+
+def _storage():
+    from example_app.models import Edital
+
+    return Edital._meta.get_field('arquivo').storage
+
+
+def get_client():
+    """
+    Cliente S3 (boto3 ou compatível). ``UPLOADS_S3_CLIENT`` aponta para uma
+    função que cria o cliente; sem ela é usado o da storage de mídia.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                factory = getattr(settings, 'UPLOADS_S3_CLIENT', None)
+                _client = import_string(factory)() if factory else _storage().connection.meta.client
+    return _client
+
+
+def set_client(client):
+    global _client
+    _client = client
+
+
+def get_bucket():
+    return getattr(settings, 'UPLOADS_BUCKET', None) or _storage().bucket_name
+
+
+def codigo_do_erro(exc):
+    """Código do erro do S3 (``botocore.exceptions.ClientError``) ou ``None``."""
+    resposta = getattr(exc, 'response', None)
+    if not isinstance(resposta, dict):
+        return None
+    return resposta.get('Error', {}).get('Code')
+
+
+def gerar_chave(prefixo, nome):
+    return '{}/{}/{}'.format(prefixo.strip('/'), uuid.uuid4().hex, get_valid_filename(os.path.basename(nome)))
+
+
+class MultipartUpload(object):
+    """
+    Recebe bytes com ``write`` e os envia como partes de um multipart upload,
+    até ``paralelas`` partes ao mesmo tempo; ``write`` bloqueia quando todas
+    estão ocupadas, o que limita a memória usada.
+    """
+
+    def __init__(self, client, bucket, chave, content_type=None, tamanho_parte=None, paralelas=None):
+        self.client = client
+        self.bucket = bucket
+        self.chave = chave
+        self.tamanho_parte = tamanho_parte or part_size()
+        paralelas = paralelas or parallel_parts()
+        kwargs = {'ContentType': content_type} if content_type else {}
+        self.upload_id = client.create_multipart_upload(Bucket=bucket, Key=chave, **kwargs)['UploadId']
+        self.executor = ThreadPoolExecutor(max_workers=paralelas)
+        self.vagas = threading.BoundedSemaphore(paralelas)
+        self.pedacos = []
+        self.acumulado = 0
+        self.futures = []
+        self.tamanho = 0
+
+    def write(self, data):
+        self.tamanho += len(data)
+        while data:
+            falta = self.tamanho_parte - self.acumulado
+            pedaco, data = data[:falta], data[falta:]
+            self.pedacos.append(pedaco)
+            self.acumulado += len(pedaco)
+            if self.acumulado == self.tamanho_parte:
+                self._enviar()
+
+    def _enviar(self):
+        for future in self.futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+        # Espera uma vaga antes de juntar os pedaços: no máximo uma parte
+        # além das que estão sendo enviadas fica em memória.
+        self.vagas.acquire()
+        dados = b''.join(self.pedacos)
+        self.pedacos = []
+        self.acumulado = 0
+        future = self.executor.submit(self._enviar_parte, len(self.futures) + 1, dados)
+        future.add_done_callback(lambda future: self.vagas.release())
+        self.futures.append(future)
+
+    def _enviar_parte(self, numero, dados):
+        resposta = self.client.upload_part(
+            Bucket=self.bucket, Key=self.chave, UploadId=self.upload_id, PartNumber=numero, Body=dados
+        )
+        return {'PartNumber': numero, 'ETag': resposta['ETag']}
+
+    def concluir(self):
+        if self.pedacos or not self.futures:
+            self._enviar()
+        try:
+            partes = [future.result() for future in self.futures]
+        finally:
+            self.executor.shutdown()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.chave, UploadId=self.upload_id, MultipartUpload={'Parts': partes}
+        )
+        return self.chave
+
+    def abortar(self):
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown()
+        self.pedacos = []
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.chave, UploadId=self.upload_id)
+
+
+class _ObjetoRemoto(io.RawIOBase):
+    """Leitura preguiçosa do objeto já enviado, para validadores que abrem o arquivo."""
+
+    def __init__(self, chave):
+        self.chave = chave
+        self._body = None
+        self._posicao = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._body is None:
+            self._body = get_client().get_object(Bucket=get_bucket(), Key=self.chave)['Body']
+        dados = self._body.read(len(buffer))
+        buffer[:len(dados)] = dados
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # Só volta ao início (File.chunks e validadores fazem seek(0)).
+        if (offset, whence) == (0, io.SEEK_CUR):
+            return self._posicao
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('seek')
+        if self._body is not None:
+            self._body.close()
+        self._body = None
+        self._posicao = 0
+        return 0
+
+
+class ArquivoEnviado(UploadedFile):
+    """
+    Arquivo que já está no bucket, na chave ``chave_armazenada``.
+    ``gravado`` passa a ser verdadeiro quando a storage grava a chave num
+    model.
+    """
+
+    def __init__(self, chave, name, content_type, size, charset=None, content_type_extra=None):
+        super(ArquivoEnviado, self).__init__(
+            io.BufferedReader(_ObjetoRemoto(chave)), name, content_type, size, charset, content_type_extra
+        )
+        self.chave_armazenada = chave
+        self.gravado = False
+
+
+def descartar(arquivos):
+    """Apaga do bucket os ``ArquivoEnviado`` que não serão usados."""
+    for arquivo in arquivos:
+        get_client().delete_object(Bucket=get_bucket(), Key=arquivo.chave_armazenada)
+
+
+class S3MultipartUploadHandler(FileUploadHandler):
+    """
+    Envia cada arquivo do formulário para o bucket enquanto ele é recebido.
+    Deve ser o único handler de upload da requisição.
+    """
+    chunk_size = 256 * 2 ** 10
+
+    def __init__(self, request=None, prefixo='editais_ppc/uploads'):
+        super(S3MultipartUploadHandler, self).__init__(request)
+        self.prefixo = prefixo
+        self.upload = None
+        self.enviados = []
+
+    def new_file(self, *args, **kwargs):
+        super(S3MultipartUploadHandler, self).new_file(*args, **kwargs)
+        self.upload = MultipartUpload(
+            get_client(), get_bucket(), gerar_chave(self.prefixo, self.file_name), self.content_type
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        try:
+            self.upload.write(raw_data)
+        except Exception:
+            self.upload_interrupted()
+            raise
+
+    def file_complete(self, file_size):
+        try:
+            chave = self.upload.concluir()
+        except Exception:
+            self.upload_interrupted()
+            raise
+        self.upload = None
+        arquivo = ArquivoEnviado(
+            chave, self.file_name, self.content_type, file_size, self.charset, self.content_type_extra
+        )
+        self.enviados.append(arquivo)
+        return arquivo
+
+    def upload_complete(self):
+        # O corpo terminou sem fechar o arquivo (StopUpload, SkipFile).
+        self.upload_interrupted()
+
+    def upload_interrupted(self):
+        if self.upload is not None:
+            upload, self.upload = self.upload, None
+            upload.abortar()
+
+
+def streaming_uploads(prefixo='editais_ppc/uploads'):
+    """
+    Decorator de view: arquivos do formulário vão direto para o bucket. O
+    token CSRF só pode ser verificado depois de trocar os handlers, porque
+    a verificação lê ``request.POST``.
+    """
+    def decorator(view):
+        protegida = csrf_protect(view)
+
+        @csrf_exempt
+        def wrapper(request, *args, **kwargs):
+            request.upload_handlers = [S3MultipartUploadHandler(request, prefixo)]
+            return protegida(request, *args, **kwargs)
+        wrapper.__name__ = getattr(view, '__name__', 'wrapper')
+        wrapper.__doc__ = view.__doc__
+        return wrapper
+    return decorator
+
+
+class StreamingUploadsAdminMixin(object):
+    """
+    ``add_view``/``change_view`` do ModelAdmin com ``S3MultipartUploadHandler``.
+    ``changeform_view`` continua verificando o CSRF (``csrf_protect_m``).
+
+    Arquivos enviados que não foram gravados no objeto (formulário inválido,
+    requisição interrompida, erro ao salvar) são apagados do bucket.
+    """
+    upload_prefixo = 'editais_ppc/uploads'
+
+    def _com_streaming(self, request, view, *args):
+        handler = S3MultipartUploadHandler(request, self.upload_prefixo)
+        request.upload_handlers = [handler]
+        try:
+            resposta = view(request, *args)
+        except Exception:
+            # changeform_view é atômica: nada do que foi gravado ficou no banco.
+            descartar(handler.enviados)
+            raise
+        descartar([arquivo for arquivo in handler.enviados if not arquivo.gravado])
+        return resposta
+
+    @method_decorator(csrf_exempt)
+    def add_view(self, request, form_url='', extra_context=None):
+        view = super(StreamingUploadsAdminMixin, self).add_view
+        return self._com_streaming(request, view, form_url, extra_context)
+
+    @method_decorator(csrf_exempt)
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        view = super(StreamingUploadsAdminMixin, self).change_view
+        return self._com_streaming(request, view, object_id, form_url, extra_context)
+
+
+# Uploads retomáveis
+
+def _destino(nome):
+    from django.apps import apps
+
+    try:
+        model, campo, prefixo = DESTINOS[nome]
+    except KeyError:
+        raise ValidationError('Destino inválido: {}'.format(nome))
+    model = apps.get_model('example_app', model)
+    return model, model._meta.get_field(campo), prefixo
+
+
+def _validar_extensao(field, nome):
+    formatos = getattr(field, 'format', None)
+    extensao = os.path.splitext(nome)[1].lstrip('.').lower()
+    if formatos and extensao not in formatos:
+        raise ValidationError('Formato não permitido: {}. Use {}.'.format(extensao, ', '.join(formatos)))
+
+
+def iniciar(usuario, destino, nome, content_type=None):
+    """Abre o multipart upload no bucket e devolve o ``UploadMultipart``."""
+    from example_app.models import UploadMultipart
+
+    _, field, prefixo = _destino(destino)
+    _validar_extensao(field, nome)
+    chave = gerar_chave(prefixo, nome)
+    kwargs = {'ContentType': content_type} if content_type else {}
+    resposta = get_client().create_multipart_upload(Bucket=get_bucket(), Key=chave, **kwargs)
+    return UploadMultipart.objects.create(
+        usuario=usuario,
+        destino=destino,
+        nome_original=os.path.basename(nome),
+        content_type=content_type or '',
+        chave=chave,
+        upload_id=resposta['UploadId'],
+        tamanho_parte=part_size(),
+    )
+
+
+def _aberto(upload):
+    from example_app.models import UploadMultipart
+
+    if upload.status != UploadMultipart.ABERTO:
+        raise ValidationError('O upload já foi {}.'.format(upload.get_status_display().lower()))
+
+
+def enviar_parte(upload, numero, stream, tamanho):
+    """
+    Envia a parte ``numero`` lendo ``tamanho`` bytes de ``stream``. Reenviar
+    uma parte substitui a anterior, então é seguro repetir após uma falha.
+    """
+    _aberto(upload)
+    if not 1 <= numero <= 10000:
+        raise ValidationError('O número da parte deve estar entre 1 e 10000.')
+    if tamanho > upload.tamanho_parte:
+        raise ValidationError('A parte excede {} bytes.'.format(upload.tamanho_parte))
+    dados = stream.read(tamanho)
+    if len(dados) != tamanho:
+        raise ValidationError('Parte incompleta: {} de {} bytes.'.format(len(dados), tamanho))
+    resposta = get_client().upload_part(
+        Bucket=get_bucket(), Key=upload.chave, UploadId=upload.upload_id, PartNumber=numero, Body=dados
+    )
+    return {'PartNumber': numero, 'ETag': resposta['ETag'], 'Size': tamanho}
+
+
+def partes(upload):
+    """Partes já recebidas pelo bucket, em ordem."""
+    recebidas, marcador = [], 0
+    while True:
+        resposta = get_client().list_parts(
+            Bucket=get_bucket(), Key=upload.chave, UploadId=upload.upload_id, PartNumberMarker=marcador
+        )
+        recebidas.extend(
+            {'PartNumber': p['PartNumber'], 'ETag': p['ETag'], 'Size': p['Size']} for p in resposta.get('Parts', [])
+        )
+        if not resposta.get('IsTruncated'):
+            return recebidas
+        marcador = resposta['NextPartNumberMarker']
+
+
+def concluir(upload, usuario, objeto_id=None):
+    """
+    Junta as partes recebidas e, com ``objeto_id``, grava a chave no campo
+    ``arquivo`` do ``Edital``/``Documento``. As partes precisam ser
+    contíguas a partir de 1 e, exceto a última, ter pelo menos
+    ``MIN_PART_SIZE`` bytes.
+    """
+    from example_app.models import UploadMultipart
+
+    _aberto(upload)
+    model, field, _ = _destino(upload.destino)
+    objeto = None
+    if objeto_id is not None:
+        objeto = model.objects.get(pk=objeto_id)
+        opts = model._meta
+        if not usuario.has_perm('{}.change_{}'.format(opts.app_label, opts.model_name)):
+            raise PermissionDenied
+
+    recebidas = partes(upload)
+    numeros = [parte['PartNumber'] for parte in recebidas]
+    if not numeros or numeros != list(range(1, len(numeros) + 1)):
+        raise ValidationError('Faltam partes: recebidas {}.'.format(numeros))
+    pequenas = [parte['PartNumber'] for parte in recebidas[:-1] if parte['Size'] < MIN_PART_SIZE]
+    if pequenas:
+        raise ValidationError(
+            'Só a última parte pode ter menos de {} bytes: partes {}.'.format(MIN_PART_SIZE, pequenas)
+        )
+    get_client().complete_multipart_upload(
+        Bucket=get_bucket(), Key=upload.chave, UploadId=upload.upload_id,
+        MultipartUpload={'Parts': [{'PartNumber': p['PartNumber'], 'ETag': p['ETag']} for p in recebidas]}
+    )
+    upload.tamanho = sum(parte['Size'] for parte in recebidas)
+    upload.status = UploadMultipart.CONCLUIDO
+    upload.concluido_em = timezone.now()
+    upload.save(update_fields=['tamanho', 'status', 'concluido_em'])
+
+    if objeto is not None:
+        setattr(objeto, field.attname, upload.chave)
+        objeto.save(update_fields=[field.attname])
+    return upload
+
+
+def abortar(upload):
+    from example_app.models import UploadMultipart
+
+    _aberto(upload)
+    get_client().abort_multipart_upload(Bucket=get_bucket(), Key=upload.chave, UploadId=upload.upload_id)
+    upload.status = UploadMultipart.ABORTADO
+    upload.concluido_em = timezone.now()
+    upload.save(update_fields=['status', 'concluido_em'])
+    return upload
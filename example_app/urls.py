@@ -0,0 +1,12 @@
+from django.urls import path
+
+from example_app import views
+
+app_name = 'uploads'
+
+urlpatterns = [
+    path('', views.iniciar_upload, name='iniciar'),
+    path('<uuid:identificador>/', views.upload, name='upload'),
+    path('<uuid:identificador>/partes/<int:numero>/', views.enviar_parte, name='parte'),
+    path('<uuid:identificador>/concluir/', views.concluir_upload, name='concluir'),
+]
@@ -1,3 +1,107 @@
-from django.shortcuts import render
+"""
+API JSON dos uploads retomáveis (``example_app.uploads``):
 
-# Create your views here.
+    POST   /uploads/                       {"destino", "nome", "content_type"}
+    GET    /uploads/<id>/                  partes já recebidas
+    PUT    /uploads/<id>/partes/<numero>/  corpo = bytes da parte
+    POST   /uploads/<id>/concluir/         {"objeto": id do Edital/Documento}
+    DELETE /uploads/<id>/
+"""
+import json
+
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods
+
+from example_app import uploads
+from example_app.models import UploadMultipart
+
+
+def _json(request):
+    try:
+        return json.loads(request.body.decode('utf-8') or '{}')
+    except ValueError:
+        raise ValidationError('JSON inválido.')
+
+
+def _erros(view):
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'erro': 'Autenticação necessária.'}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except ValidationError as e:
+            return JsonResponse({'erro': ' '.join(e.messages)}, status=400)
+        except PermissionDenied:
+            return JsonResponse({'erro': 'Permissão negada.'}, status=403)
+        except Exception as e:
+            codigo = uploads.codigo_do_erro(e)
+            if codigo is None:
+                raise
+            status = 400 if codigo in uploads.ERROS_DO_CLIENTE else 502
+            return JsonResponse({'erro': 'Erro do armazenamento: {}.'.format(codigo)}, status=status)
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return wrapper
+
+
+def _serializar(upload, partes=None):
+    dados = {
+        'id': str(upload.identificador),
+        'destino': upload.destino,
+        'nome': upload.nome_original,
+        'status': upload.get_status_display(),
+        'tamanho_parte': upload.tamanho_parte,
+        'chave': upload.chave,
+    }
+    if partes is not None:
+        dados['partes'] = [{'numero': p['PartNumber'], 'tamanho': p['Size']} for p in partes]
+        dados['recebido'] = sum(p['Size'] for p in partes)
+    return dados
+
+
+def _upload(request, identificador):
+    return get_object_or_404(UploadMultipart, identificador=identificador, usuario=request.user)
+
+
+@require_http_methods(['POST'])
+@_erros
+def iniciar_upload(request):
+    dados = _json(request)
+    if not dados.get('nome'):
+        raise ValidationError('Informe o nome do arquivo.')
+    upload = uploads.iniciar(request.user, dados.get('destino'), dados['nome'], dados.get('content_type'))
+    return JsonResponse(_serializar(upload), status=201)
+
+
+@require_http_methods(['GET', 'DELETE'])
+@_erros
+def upload(request, identificador):
+    upload = _upload(request, identificador)
+    if request.method == 'DELETE':
+        return JsonResponse(_serializar(uploads.abortar(upload)))
+    abertos = upload.status == UploadMultipart.ABERTO
+    return JsonResponse(_serializar(upload, uploads.partes(upload) if abertos else None))
+
+
+@require_http_methods(['PUT'])
+@_erros
+def enviar_parte(request, identificador, numero):
+    upload = _upload(request, identificador)
+    try:
+        tamanho = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        raise ValidationError('Content-Length inválido.')
+    parte = uploads.enviar_parte(upload, numero, request, tamanho)
+    return JsonResponse({'numero': parte['PartNumber'], 'tamanho': parte['Size'], 'etag': parte['ETag']})
+
+
+@require_http_methods(['POST'])
+@_erros
+def concluir_upload(request, identificador):
+    upload = _upload(request, identificador)
+    upload = uploads.concluir(upload, request.user, _json(request).get('objeto'))
+    dados = _serializar(upload)
+    dados['tamanho'] = upload.tamanho
+    return JsonResponse(dados)
@@ -5,6 +5,8 @@ import sys
 
 
 def main():
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_graphql_movies.test_settings')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_graphql_movies.settings')
     try:
         from django.core.management import execute_from_command_line